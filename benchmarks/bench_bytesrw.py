@@ -0,0 +1,154 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark BytesRW reads
+#
+# - 1M mixed fields (UInt4, Float8, UShort, PStr): compare scalar reads with
+#   precompiled struct codecs against previous implementation (struct format
+#   string built for each read), and bulk reads with readStruct()
+# - 1M fixed size records (UInt4, Float8): compare readStruct() per record
+#   against a single readArray() call
+# - large strings (readPStr4()): compare previous implementation (bytes copy
+#   then decode) against decode from internal buffer
+#
+# Usage, from repository root:
+#       python benchmarks/bench_bytesrw.py
+# -----------------------------------------------------------------------------
+
+import struct
+
+import benchutils
+
+from bulipy.pktk.modules.bytesrw import BytesRW
+
+NB_FIELDS = 1000000
+# fields per record
+NB_RECORD_FIELDS = 4
+NB_RECORDS = NB_FIELDS // NB_RECORD_FIELDS
+
+NB_ARRAY_RECORDS = 1000000
+
+NB_STRINGS = 100
+STRING_SIZE = 1000000
+
+
+class BytesRWFormatString(BytesRW):
+    """Scalar reads as implemented before precompiled struct codecs: struct
+    format string is built and parsed for each read
+    """
+
+    def readUShort(self):
+        b = self.read(1)
+        if len(b) == 1:
+            return struct.unpack(f'{self.byteOrder()}B', b)[0]
+        return None
+
+    def readUInt4(self):
+        b = self.read(4)
+        if len(b) == 4:
+            return struct.unpack(f'{self.byteOrder()}I', b)[0]
+        return None
+
+    def readFloat8(self):
+        b = self.read(8)
+        if len(b) == 8:
+            return struct.unpack(f'{self.byteOrder()}d', b)[0]
+        return None
+
+    def readPStr(self, encoding='utf-8', errors='strict'):
+        size = self.readUShort()
+        if size > 0:
+            b = self.read(size)
+            return b.decode(encoding, errors)
+        return ''
+
+    def readPStr4(self, encoding='utf-8', errors='strict'):
+        size = self.readUInt4()
+        if size > 0:
+            return self.read(size).decode(encoding, errors)
+        return ''
+
+
+def readScalars(data, readerClass=BytesRW):
+    """Read records, field by field"""
+    reader = readerClass(data)
+    return [(reader.readUInt4(), reader.readFloat8(), reader.readUShort(), reader.readPStr()) for index in range(NB_RECORDS)]
+
+
+def readStructs(data):
+    """Read records, fixed size fields with one readStruct() call"""
+    reader = BytesRW(data)
+    returned = []
+    for index in range(NB_RECORDS):
+        uint4, float8, ushort = reader.readStruct('IdB')
+        returned.append((uint4, float8, ushort, reader.readPStr()))
+    return returned
+
+
+def readArrayStructs(data):
+    """Read fixed size records, one readStruct() call per record"""
+    reader = BytesRW(data)
+    return [reader.readStruct('Id') for index in range(NB_ARRAY_RECORDS)]
+
+
+def readArray(data):
+    """Read fixed size records with one readArray() call"""
+    return BytesRW(data).readArray('Id', NB_ARRAY_RECORDS)
+
+
+def readStrings(data, readerClass=BytesRW):
+    """Read large pascal strings"""
+    reader = readerClass(data)
+    return [reader.readPStr4() for index in range(NB_STRINGS)]
+
+
+if __name__ == '__main__':
+    writer = BytesRW()
+    for index in range(NB_RECORDS):
+        writer.writeUInt4(index)
+        writer.writeFloat8(index / 3)
+        writer.writeUShort(index % 256)
+        writer.writePStr(f'field-{index % 1000}')
+    data = writer.getvalue()
+    writer.close()
+
+    reference = readScalars(data, BytesRWFormatString)
+    assert readScalars(data) == reference
+    assert readStructs(data) == reference
+
+    benchutils.report(f"Read {NB_FIELDS} fields ({len(data)} bytes)",
+                      ('previous scalar reads (format string)', benchutils.timeit(lambda: readScalars(data, BytesRWFormatString))),
+                      ('BytesRW scalar reads', benchutils.timeit(lambda: readScalars(data))),
+                      ('BytesRW readStruct()', benchutils.timeit(lambda: readStructs(data))))
+
+    writer = BytesRW()
+    writer.writeArray('Id', [(index, index / 3) for index in range(NB_ARRAY_RECORDS)])
+    dataArray = writer.getvalue()
+    writer.close()
+
+    assert readArray(dataArray) == readArrayStructs(dataArray)
+
+    benchutils.report(f"Read {NB_ARRAY_RECORDS} fixed size records ({len(dataArray)} bytes)",
+                      ('BytesRW readStruct() per record', benchutils.timeit(lambda: readArrayStructs(dataArray))),
+                      ('BytesRW readArray()', benchutils.timeit(lambda: readArray(dataArray))))
+
+    writer = BytesRW()
+    for index in range(NB_STRINGS):
+        writer.writePStr4(chr(ord('a') + index % 26) * STRING_SIZE)
+    dataStrings = writer.getvalue()
+    writer.close()
+
+    assert readStrings(dataStrings) == readStrings(dataStrings, BytesRWFormatString)
+
+    benchutils.report(f"Read {NB_STRINGS} strings of {STRING_SIZE} bytes",
+                      ('previous readPStr4() (copy)', benchutils.timeit(lambda: readStrings(dataStrings, BytesRWFormatString), 5)),
+                      ('BytesRW readPStr4()', benchutils.timeit(lambda: readStrings(dataStrings), 5)))
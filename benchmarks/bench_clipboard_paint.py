@@ -0,0 +1,134 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark clipboard docker items paint while scrolling a list of 5000 items
+# of 8 lines of python code
+#
+# Viewport is scrolled by SCROLL_STEP pixels per frame, through the whole list
+# down then up; for each frame, only items visible in viewport are painted, as
+# made by list view
+#
+# Compare previous item delegate (content formatted and drawn on each paint)
+# with BPDockWidgetClipboardItemDelegate (content rendered once in a cached
+# pixmap, with a bounded cache)
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_clipboard_paint.py
+# -----------------------------------------------------------------------------
+
+import benchutils
+
+from PyQt5.Qt import *
+
+# widgets modules build pixmaps when imported, QApplication must exist
+app = QApplication([])
+
+from bulipy.bp.bpdwclipboard import (
+        BPDockWidgetClipboard,
+        BPDockWidgetClipboardItemDelegate
+    )
+from bulipy.bp.bplanguagedef import BPLanguageDefPython
+
+NB_ITEMS = 5000
+NB_ITEM_LINES = 8
+ITEM_SIZE = QSize(600, 8 * 16)
+VIEWPORT_SIZE = QSize(600, 800)
+SCROLL_STEP = 96
+
+
+class PreviousItemDelegate(BPDockWidgetClipboardItemDelegate):
+    """Previous implementation: content is formatted and drawn on each paint"""
+
+    def paint(self, painter, option, index):
+        self.initStyleOption(option, index)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(option.palette.color(QPalette.Text)))
+        painter.fillRect(option.rect, option.backgroundBrush)
+
+        text = index.data(Qt.DisplayRole)
+        tokens = index.data(BPDockWidgetClipboard.ROLE_TOKENS)
+        languageDef = index.data(BPDockWidgetClipboard.ROLE_LANGUAGE)
+        foundText = index.data(BPDockWidgetClipboard.ROLE_FOUNDTEXT)
+
+        painter.save()
+        painter.setClipRect(option.rect)
+        painter.translate(QPointF(option.rect.topLeft()))
+
+        textDocument = BPDockWidgetClipboard.asDocument(text, languageDef, tokens, foundText, QTextCharFormat())
+        textDocument.setDocumentMargin(1)
+        textDocument.setDefaultFont(option.font)
+        textDocument.setPageSize(QSizeF(option.rect.size()))
+        textDocument.drawContents(painter, QRectF())
+
+        painter.restore()
+        painter.restore()
+
+
+def buildModel():
+    """Return a model with NB_ITEMS clipboard items made from plugin source code"""
+    languageDef = BPLanguageDefPython()
+    lines = '\n'.join(benchutils.sourceFiles(200)).split('\n')
+
+    model = QStandardItemModel()
+    for itemNumber in range(NB_ITEMS):
+        firstLine = (itemNumber * NB_ITEM_LINES) % (len(lines) - NB_ITEM_LINES)
+        # items content must be different, as rendered content is cached by content hash
+        text = f"# item {itemNumber}\n" + '\n'.join(lines[firstLine:firstLine + NB_ITEM_LINES - 1])
+        item = QStandardItem(text)
+        item.setData(hash(text), BPDockWidgetClipboard.ROLE_HASH)
+        item.setData(languageDef.tokenizer().tokenize(text), BPDockWidgetClipboard.ROLE_TOKENS)
+        item.setData(languageDef, BPDockWidgetClipboard.ROLE_LANGUAGE)
+        item.setData(None, BPDockWidgetClipboard.ROLE_FOUNDTEXT)
+        item.setData(0, BPDockWidgetClipboard.ROLE_MISSING_LINES)
+        model.appendRow(item)
+    return model
+
+
+def scrollFrames(delegate, model):
+    """Scroll viewport down then up, painting visible items for each frame
+
+    Return number of painted frames
+    """
+    image = QImage(VIEWPORT_SIZE, QImage.Format_ARGB32_Premultiplied)
+    option = QStyleOptionViewItem()
+    option.font = QApplication.font()
+    option.palette = QApplication.palette()
+
+    positions = list(range(0, NB_ITEMS * ITEM_SIZE.height() - VIEWPORT_SIZE.height(), SCROLL_STEP))
+    positions += reversed(positions)
+
+    painter = QPainter()
+    painter.begin(image)
+    for position in positions:
+        firstRow = position // ITEM_SIZE.height()
+        lastRow = min(NB_ITEMS - 1, (position + VIEWPORT_SIZE.height()) // ITEM_SIZE.height())
+        for row in range(firstRow, lastRow + 1):
+            option.rect = QRect(QPoint(0, row * ITEM_SIZE.height() - position), ITEM_SIZE)
+            delegate.paint(painter, option, model.index(row, 0))
+    painter.end()
+    return len(positions)
+
+
+if __name__ == '__main__':
+    model = buildModel()
+    # delegate modifies given font
+    previousDelegate = PreviousItemDelegate(16, QFont(QApplication.font()))
+    delegate = BPDockWidgetClipboardItemDelegate(16, QFont(QApplication.font()))
+
+    nbFrames = scrollFrames(delegate, model)
+
+    benchutils.report(f"Scroll {NB_ITEMS} clipboard items ({NB_ITEM_LINES} lines) down then up, {nbFrames} frames, per frame",
+                      ('previous delegate', benchutils.timeit(lambda: scrollFrames(previousDelegate, model), 1) / nbFrames),
+                      ('cached delegate, empty cache', benchutils.timeit(lambda: (delegate.invalidateCache(), scrollFrames(delegate, model)), 1) / nbFrames),
+                      ('cached delegate, filled cache', benchutils.timeit(lambda: scrollFrames(delegate, model), 1) / nbFrames))
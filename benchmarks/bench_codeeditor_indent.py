@@ -0,0 +1,202 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark WCodeEditor indent, dedent and toggle comment on a 50k lines
+# selection
+#
+# No editor widget is created: WCodeEditor methods are executed on a
+# QTextDocument through a minimal editor interface (DocumentEditor)
+#
+# Compare with previous implementation (cursor moved from document start for
+# each line); previous indent is quadratic with number of lines, and takes
+# several minutes for 50k lines
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_codeeditor_indent.py [number of lines]
+# -----------------------------------------------------------------------------
+
+import re
+import sys
+
+import benchutils
+
+from PyQt5.Qt import *
+
+from bulipy.pktk.widgets.wcodeeditor import WCodeEditor
+
+NB_LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+
+class DocumentEditor:
+    """Minimal editor interface on a QTextDocument, used to execute WCodeEditor
+    indent/dedent/toggle comment methods without editor widget
+    """
+    _WCodeEditor__optionIndentWidth = 4
+    _WCodeEditor__optionCommentChar = '#'
+
+    _WCodeEditor__selectedBlocks = WCodeEditor._WCodeEditor__selectedBlocks
+    _WCodeEditor__calculateIndent = WCodeEditor._WCodeEditor__calculateIndent
+    _WCodeEditor__calculateDedent = WCodeEditor._WCodeEditor__calculateDedent
+    _WCodeEditor__updateCommentRegEx = WCodeEditor._WCodeEditor__updateCommentRegEx
+
+    doIndent = WCodeEditor.doIndent
+    doDedent = WCodeEditor.doDedent
+    doToggleComment = WCodeEditor.doToggleComment
+
+    def __init__(self, text):
+        self.__document = QTextDocument()
+        self.__document.setPlainText(text)
+        # select all document
+        self.__cursor = QTextCursor(self.__document)
+        self.__cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        self._WCodeEditor__updateCommentRegEx()
+
+    def document(self):
+        return self.__document
+
+    def textCursor(self):
+        return QTextCursor(self.__cursor)
+
+
+class PreviousDocumentEditor(DocumentEditor):
+    """Previous implementation of indent/dedent/toggle comment methods"""
+
+    def __isEmptyBlock(self, blockNumber):
+        """Check is line for current block is empty or not"""
+        # get block text
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.Start)
+        cursor.movePosition(QTextCursor.NextBlock, n=blockNumber)
+        cursor.movePosition(QTextCursor.StartOfLine)
+        cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.KeepAnchor)
+        text = cursor.selectedText()
+        if text.strip() == "":
+            return True
+        else:
+            return False
+
+    def __selection(self, cursor, selectionStart, selectionEnd, forceLastBlock):
+        """Return first block number, last block number and last block flag"""
+        cursor.setPosition(selectionStart)
+        startBlock = cursor.blockNumber()
+
+        cursor.setPosition(selectionEnd)
+        endBlock = cursor.blockNumber()
+
+        processLastBlock = cursor.selectionStart()
+        cursor.movePosition(QTextCursor.StartOfLine)
+        processLastBlock -= cursor.selectionStart()
+        if processLastBlock > 0 or forceLastBlock:
+            processLastBlock = 1
+
+        cursor.movePosition(QTextCursor.Start)
+        cursor.movePosition(QTextCursor.NextBlock, n=startBlock)
+        return (startBlock, endBlock, processLastBlock)
+
+    def doIndent(self):
+        cursor = self.textCursor()
+        startBlock, endBlock, processLastBlock = self.__selection(cursor, cursor.selectionStart(), cursor.selectionEnd(), False)
+
+        cursor.beginEditBlock()
+        for blockNumber in range(startBlock, endBlock+processLastBlock):
+            if not self.__isEmptyBlock(blockNumber):
+                # empty lines are not indented
+                nbChar = len(cursor.block().text()) - len(cursor.block().text().lstrip())
+                cursor.movePosition(QTextCursor.StartOfLine)
+                cursor.insertText(" " * self._WCodeEditor__calculateIndent(nbChar))
+
+            cursor.movePosition(QTextCursor.NextBlock)
+        cursor.endEditBlock()
+
+    def doDedent(self):
+        cursor = self.textCursor()
+        selectionStart = cursor.selectionStart()
+        selectionEnd = cursor.selectionEnd()
+        startBlock, endBlock, processLastBlock = self.__selection(cursor, selectionStart, selectionEnd, selectionStart == selectionEnd)
+
+        cursor.beginEditBlock()
+        for blockNumber in range(startBlock, endBlock + processLastBlock):
+            nbChar = self._WCodeEditor__calculateDedent(len(cursor.block().text()) - len(cursor.block().text().lstrip()))
+            if nbChar > 0:
+                cursor.movePosition(QTextCursor.StartOfLine)
+                cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, nbChar)
+                cursor.removeSelectedText()
+
+            cursor.movePosition(QTextCursor.NextBlock)
+        cursor.endEditBlock()
+
+    def doToggleComment(self):
+        cursor = self.textCursor()
+        selectionStart = cursor.selectionStart()
+        selectionEnd = cursor.selectionEnd()
+        startBlock, endBlock, processLastBlock = self.__selection(cursor, selectionStart, selectionEnd, selectionStart == selectionEnd)
+        commentChar = self._WCodeEditor__optionCommentChar
+
+        hasUncommented = False
+        for blockNumber in range(startBlock, endBlock + processLastBlock):
+            blockText = cursor.block().text()
+
+            if re.match(r'^\s*'+re.escape(commentChar), blockText) is None:
+                hasUncommented = True
+                break
+            cursor.movePosition(QTextCursor.NextBlock)
+
+        cursor.movePosition(QTextCursor.Start)
+        cursor.movePosition(QTextCursor.NextBlock, n=startBlock)
+
+        cursor.beginEditBlock()
+        for blockNumber in range(startBlock, endBlock + processLastBlock):
+            blockText = cursor.block().text()
+
+            commentPosition = len(blockText) - len(blockText.lstrip())
+            cursor.movePosition(QTextCursor.StartOfLine)
+            cursor.movePosition(QTextCursor.Right, QTextCursor.MoveAnchor, commentPosition)
+
+            if hasUncommented:
+                cursor.insertText(commentChar+' ')
+            else:
+                hashtag = re.search(fr'({re.escape(commentChar)}+[\s]*)', blockText)
+
+                cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, len(hashtag.groups()[0]))
+                cursor.removeSelectedText()
+
+            cursor.movePosition(QTextCursor.NextBlock)
+        cursor.endEditBlock()
+
+
+def sourceText(nbLines):
+    """Return python source code with `nbLines` lines"""
+    lines = '\n'.join(benchutils.sourceFiles(100)).split('\n')
+    return '\n'.join(lines[index % len(lines)] for index in range(nbLines))
+
+
+if __name__ == '__main__':
+    app = QGuiApplication([])
+    text = sourceText(NB_LINES)
+
+    for action in ('doIndent', 'doDedent', 'doToggleComment'):
+        editor = DocumentEditor(text)
+        previousEditor = PreviousDocumentEditor(text)
+
+        benchutils.report(f"{action}, {NB_LINES} lines selected",
+                          ('previous implementation', benchutils.timeit(getattr(previousEditor, action), 1)),
+                          ('WCodeEditor', benchutils.timeit(getattr(editor, action), 1)))
+
+        # previous implementation moves cursor by characters (grapheme clusters):
+        # on lines where leading spaces are followed by a combining character,
+        # dedent also removed the combining character and comment was inserted
+        # after it
+        lines = editor.document().toPlainText().split('\n')
+        previousLines = previousEditor.document().toPlainText().split('\n')
+        nbDiff = sum(1 for line, previousLine in zip(lines, previousLines) if line != previousLine)
+        if nbDiff or len(lines) != len(previousLines):
+            print(f"  {nbDiff} line(s) differ from previous implementation")
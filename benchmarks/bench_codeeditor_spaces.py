@@ -0,0 +1,84 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark leading/trailing spaces calculation made by WCodeEditor.paintEvent()
+# for each visible block, on a 50k lines QTextDocument
+#
+# Compare previous implementation (regular expressions, executed on each
+# frame) with WCodeEditorBlockUserData.spaces() (calculated once per block
+# revision)
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_codeeditor_spaces.py
+# -----------------------------------------------------------------------------
+
+import re
+
+import benchutils
+
+from PyQt5.Qt import *
+
+from bulipy.pktk.widgets.wcodeeditor import WCodeEditorBlockUserData
+
+NB_LINES = 50000
+
+
+def blocks(document):
+    """Return a generator on document blocks"""
+    block = document.firstBlock()
+    while block.isValid():
+        yield block
+        block = block.next()
+
+
+def spacesRegEx(document):
+    """Previous implementation: leading/trailing spaces from regular expressions"""
+    returned = []
+    for block in blocks(document):
+        result = re.search(r"(\s*)$", block.text())
+        posSpacesRight = 0
+        nbSpacesLeft = len(re.match(r"(\s*)", block.text()).groups()[0])
+        nbSpacesRight = len(result.groups()[0])
+        if nbSpacesRight > 0:
+            posSpacesRight = result.start()
+        returned.append((nbSpacesLeft, posSpacesRight, nbSpacesRight))
+    return returned
+
+
+def spacesUserData(document):
+    """Leading/trailing spaces from WCodeEditorBlockUserData.spaces()"""
+    returned = []
+    for block in blocks(document):
+        userData = block.userData()
+        if not userData:
+            userData = WCodeEditorBlockUserData()
+            block.setUserData(userData)
+        textLength, nbSpacesLeft, posSpacesRight, nbSpacesRight = userData.spaces(block)
+        returned.append((nbSpacesLeft, posSpacesRight if nbSpacesRight > 0 else 0, nbSpacesRight))
+    return returned
+
+
+if __name__ == '__main__':
+    app = QGuiApplication([])
+
+    lines = '\n'.join(benchutils.sourceFiles(100)).split('\n')
+    document = QTextDocument()
+    document.setPlainText('\n'.join(lines[index % len(lines)] for index in range(NB_LINES)))
+
+    referenceDuration = benchutils.timeit(lambda: spacesRegEx(document), 1)
+    firstDuration = benchutils.timeit(lambda: spacesUserData(document), 1)
+    assert spacesUserData(document) == spacesRegEx(document)
+
+    benchutils.report(f"Leading/trailing spaces, {NB_LINES} blocks",
+                      ('regular expressions (each frame)', referenceDuration),
+                      ('spaces(), first frame', firstDuration),
+                      ('spaces(), next frames', benchutils.timeit(lambda: spacesUserData(document))))
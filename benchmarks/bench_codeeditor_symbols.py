@@ -0,0 +1,92 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark WCodeEditor symbols index on a 50k lines python document
+#
+# - index build: symbols are indexed while blocks are highlighted; loading
+#   document with index is compared to loading document without index
+# - cost per edit: a character is typed and a new line is inserted in middle
+#   of document; ordered symbols list (symbols()) has to be rebuilt when line
+#   numbers change, outline docker rebuild it once symbolsChanged signal is
+#   emitted (500ms after last modification)
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_codeeditor_symbols.py
+# -----------------------------------------------------------------------------
+
+import benchutils
+
+from PyQt5.Qt import *
+
+from bulipy.pktk.pktk import PkTk
+from bulipy.pktk.modules.uitheme import UITheme
+from bulipy.pktk.widgets.wcodeeditor import WCodeEditor
+from bulipy.bp.bplanguagedef import BPLanguageDefPython
+
+NB_LINES = 50000
+NB_EDITS = 50
+
+
+def loadDocument(editor, languageDef, text):
+    """Load `text` in editor; blocks are highlighted (and symbols indexed)
+
+    Tokenizer cache is cleared, to measure the same tokenization work for
+    each load
+    """
+    languageDef.tokenizer().clearCache(True)
+    editor.setPlainText(text)
+    QApplication.processEvents()
+
+
+def editDocument(editor, editFunction):
+    """Apply `editFunction` NB_EDITS times on a cursor in middle of document"""
+    cursor = QTextCursor(editor.document().findBlockByNumber(NB_LINES // 2))
+    for index in range(NB_EDITS):
+        editFunction(cursor)
+
+
+if __name__ == '__main__':
+    app = QApplication([])
+    # initialise theme without Krita (see UITheme.load())
+    UITheme._UITheme__themes[PkTk.PATH_RESOURCES] = UITheme(PkTk.PATH_RESOURCES, False)
+
+    lines = '\n'.join(benchutils.sourceFiles(100)).split('\n')
+    text = '\n'.join(lines[index % len(lines)] for index in range(NB_LINES))
+
+    languageDef = BPLanguageDefPython()
+
+    # reference: no symbol token type, nothing is indexed
+    editor = WCodeEditor(languageDef=languageDef)
+    editor._WCodeEditor__symbolTokenTypes = {}
+    loadReference = benchutils.timeit(lambda: loadDocument(editor, languageDef, text), 1)
+    typeCharReference = benchutils.timeit(lambda: editDocument(editor, lambda cursor: cursor.insertText('x')))
+    insertBlockReference = benchutils.timeit(lambda: editDocument(editor, lambda cursor: cursor.insertBlock()))
+
+    editor = WCodeEditor(languageDef=languageDef)
+    loadIndexed = benchutils.timeit(lambda: loadDocument(editor, languageDef, text), 1)
+    buildList = benchutils.timeit(lambda: (editor._WCodeEditor__symbolsUpdated(), editor.symbols()), 1)
+    nbSymbols = len(editor.symbols())
+    typeChar = benchutils.timeit(lambda: editDocument(editor, lambda cursor: cursor.insertText('x')))
+    insertBlock = benchutils.timeit(lambda: editDocument(editor, lambda cursor: cursor.insertBlock()))
+    insertBlockList = benchutils.timeit(lambda: editDocument(editor, lambda cursor: (cursor.insertBlock(), editor.symbols())), 1)
+
+    benchutils.report(f"Symbols index, {NB_LINES} lines, {nbSymbols} symbols",
+                      ('load document, no index', loadReference),
+                      ('load document, with index', loadIndexed),
+                      ('symbols() ordered list', buildList))
+
+    benchutils.report(f"Symbols index, cost per edit (average of {NB_EDITS} edits)",
+                      ('type a character, no index', typeCharReference / NB_EDITS),
+                      ('type a character, with index', typeChar / NB_EDITS),
+                      ('insert a new line, no index', insertBlockReference / NB_EDITS),
+                      ('insert a new line, with index', insertBlock / NB_EDITS),
+                      ('insert a new line + symbols()', insertBlockList / NB_EDITS))
@@ -0,0 +1,63 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark imgutils.combineChannels(): interleave 4 channels of a 2048x2048
+# image (1 byte per channel)
+#
+# Compare with previous implementation (one loop iteration per pixel)
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_combinechannels.py
+# -----------------------------------------------------------------------------
+
+import os
+
+import benchutils
+
+from bulipy.pktk.modules import imgutils
+
+IMAGE_SIZE = 2048
+NB_CHANNELS = 4
+
+
+def combineChannelsPerPixel(bytesPerChannel, *channels):
+    """Previous implementation: one loop iteration per pixel
+
+    Only first byte of a channel value is copied, then result is valid only
+    for `bytesPerChannel` = 1
+    """
+    channelSize = len(channels[0])
+    channelCount = len(channels)
+    offsetTargetInc = channelCount*bytesPerChannel
+    target = bytearray(channelSize*offsetTargetInc)
+
+    channelNumber = 0
+    for channel in channels:
+        offsetTarget = channelNumber*bytesPerChannel
+        offsetSource = 0
+        for index in range(channelSize//bytesPerChannel):
+            target[offsetTarget] = channel[offsetSource]
+            offsetTarget += offsetTargetInc
+            offsetSource += bytesPerChannel
+        channelNumber += 1
+
+    return target
+
+
+if __name__ == '__main__':
+    channels = [os.urandom(IMAGE_SIZE * IMAGE_SIZE) for channelNumber in range(NB_CHANNELS)]
+
+    assert imgutils.combineChannels(1, *channels) == combineChannelsPerPixel(1, *channels)
+
+    benchutils.report(f"Combine {NB_CHANNELS} channels, {IMAGE_SIZE}x{IMAGE_SIZE} pixels ({'NumPy' if imgutils.numpy is not None else 'no NumPy'})",
+                      ('previous implementation (per pixel)', benchutils.timeit(lambda: combineChannelsPerPixel(1, *channels), 1)),
+                      ('combineChannels()', benchutils.timeit(lambda: imgutils.combineChannels(1, *channels))))
@@ -0,0 +1,129 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark WSetupManager load/save of a NB_SETUPS setups library
+#
+# Each setup has an embedded (base64) icon and some data
+#
+# - load: a single json document (format 1.00) is fully decoded (icons and
+#   data included) before tree is displayed; records file (format 2.00) only
+#   header record is decoded, setups records are decoded on first access
+# - save: a single json document has to encode all setups; when saved as a
+#   records file, only setups modified since loading are encoded again
+#
+# wsetupmanager imports Krita API (through wtextedit/wcolorselector); Krita
+# API is not used to load/save setups, and a minimal `krita` module is
+# declared by benchutils when not executed from Krita
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_setupmanager_records.py
+# -----------------------------------------------------------------------------
+
+import json
+import os.path
+import tempfile
+
+import benchutils
+
+from PyQt5.Qt import *
+
+from bulipy.pktk.modules.utils import JsonQObjectEncoder
+from bulipy.pktk.modules.imgutils import QIconPickable
+
+NB_SETUPS = 5000
+ICON_SIZE = 64
+
+
+def buildJsonFile(fileName):
+    """Build a setups file (format 1.00, single json document) with NB_SETUPS setups"""
+    pixmap = QPixmap(ICON_SIZE, ICON_SIZE)
+    pixmap.fill(QColor('#4080c0'))
+    iconB64 = QIconPickable(QIcon(pixmap)).toB64()
+
+    setups = []
+    for index in range(NB_SETUPS):
+        setup = SetupManagerSetup({'name': f'Setup {index}',
+                                   'comments': f'<p>Setup <b>{index}</b></p>',
+                                   'data': {'options': [index, index * 2, index * 3],
+                                            'text': f'Some text for setup {index} ' * 10,
+                                            'flags': {f'flag{flag}': (index + flag) % 2 == 0 for flag in range(10)}}
+                                   })
+        data = setup.exportData()
+        data['iconUri'] = f'/tmp/icons/icon{index}.png'
+        data['icon'] = iconB64
+        setups.append(data)
+
+    data = {WSetupManager.FILE_KEY_PKTKSM: {
+                WSetupManager.FILE_KEY_PKTKSM_VERSION: '1.00',
+                WSetupManager.FILE_KEY_PKTKSM_DESCRIPTION: '',
+                WSetupManager.FILE_KEY_PKTKSM_DATA: {'setups': setups, 'groups': [], 'nodes': []}
+            },
+            WSetupManager.FILE_KEY_STOREDD_FMT: {
+                WSetupManager.FILE_KEY_STOREDD_FMT_ID: '',
+                WSetupManager.FILE_KEY_STOREDD_FMT_VERSION: ''
+            }
+        }
+
+    with open(fileName, 'w') as fHandle:
+        fHandle.write(json.dumps(data, cls=JsonQObjectEncoder))
+
+
+def loadFile(fileName):
+    """Load `fileName` in a new WSetupManager, return it"""
+    setupManager = WSetupManager()
+    setupManager._WSetupManager__loadSetupsFile(fileName, {'openMode': 'replace'})
+    return setupManager
+
+
+def encodeJson(setupManager):
+    """Encode all setups as a single json document, as saved in format 1.00"""
+    data = setupManager._WSetupManager__model.exportData()
+    data['setups'] = [setup.exportData() for setup in data['setups']]
+    return json.dumps({WSetupManager.FILE_KEY_PKTKSM: {WSetupManager.FILE_KEY_PKTKSM_DATA: data}}, cls=JsonQObjectEncoder)
+
+
+if __name__ == '__main__':
+    app = QApplication([])
+    # widgets modules build pixmaps when imported, QApplication must exist
+    from bulipy.pktk.widgets.wsetupmanager import (WSetupManager, SetupManagerSetup)
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        jsonFileName = os.path.join(tmpDir, 'setups-json.pktksm')
+        recordsFileName = os.path.join(tmpDir, 'setups-records.pktksm')
+        buildJsonFile(jsonFileName)
+
+        loadJson = benchutils.timeit(lambda: loadFile(jsonFileName))
+
+        # first save of a json file: all setups are encoded as records
+        setupManager = loadFile(jsonFileName)
+        saveFirst = benchutils.timeit(lambda: setupManager._WSetupManager__saveSetupsFile(recordsFileName, {'saveMode': 'all', 'description': ''}), 1)
+
+        loadRecords = benchutils.timeit(lambda: loadFile(recordsFileName))
+
+        setupManager = loadFile(recordsFileName)
+        setups = setupManager._WSetupManager__model.exportData()['setups']
+
+        def saveAfterEdit():
+            setups[0].setData({'edit': setups[0].data()})
+            setupManager._WSetupManager__saveSetupsFile(recordsFileName, {'saveMode': 'all', 'description': ''})
+
+        saveEdit = benchutils.timeit(saveAfterEdit)
+        encodeFull = benchutils.timeit(lambda: encodeJson(setupManager))
+
+        benchutils.report(f"Setups library, {NB_SETUPS} setups, load",
+                          ('load, json (format 1.00)', loadJson),
+                          ('load, records (format 2.00)', loadRecords))
+
+        benchutils.report(f"Setups library, {NB_SETUPS} setups, save",
+                          ('full json encode (format 1.00)', encodeFull),
+                          ('first save as records', saveFirst),
+                          ('save after one edit, records', saveEdit))
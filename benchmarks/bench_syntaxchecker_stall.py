@@ -0,0 +1,87 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark main thread stall while BPSyntaxChecker check a 50k lines python
+# document
+#
+# A timer ticks every TICK_INTERVAL milliseconds on main thread while check is
+# running; the longest interval between two ticks is the time during which UI
+# can't process events
+#
+# compile() and pyflakes hold the GIL: with BACKEND_THREAD, main thread is
+# blocked while code is checked; with BACKEND_PROCESS, only document snapshot
+# (toPlainText()) is executed on main thread
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_syntaxchecker_stall.py
+# -----------------------------------------------------------------------------
+
+import time
+
+import benchutils
+
+from PyQt5.Qt import *
+
+from bulipy.pktk.modules.workers import WorkerPool
+from bulipy.bp.bpsyntaxcheck import checkSyntax
+
+NB_LINES = 50000
+TICK_INTERVAL = 5
+
+
+def measureStall(pool, document):
+    """Take a snapshot of `document` and check it with given `pool`
+
+    Return a tuple (check duration, longest main thread stall), in seconds
+    """
+    ticks = [time.perf_counter()]
+    timer = QTimer()
+    timer.setInterval(TICK_INTERVAL)
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start()
+    QTest.qWait(50)
+
+    # same as BPSyntaxChecker.startCheck(); result is provided by processed signal
+    results = []
+    pool.signals.processed.connect(lambda processed: results.append(processed[1]))
+    item = (document.revision(), document.toPlainText())
+    pool.submit([item], checkSyntax).wait()
+    ticks.append(time.perf_counter())
+    timer.stop()
+    pool.signals.processed.disconnect()
+
+    revision, problems, duration = results[0]
+    return (duration, max(ticks[index] - ticks[index - 1] for index in range(1, len(ticks))))
+
+
+if __name__ == '__main__':
+    app = QApplication([])
+
+    lines = '\n'.join(benchutils.sourceFiles(100)).split('\n')
+    document = QTextDocument()
+    document.setPlainText('\n'.join(lines[index % len(lines)] for index in range(NB_LINES)))
+
+    poolThread = WorkerPool(1, WorkerPool.BACKEND_THREAD)
+    poolProcess = WorkerPool(1, WorkerPool.BACKEND_PROCESS)
+    # start worker process before measure
+    poolProcess.map([(0, '')], checkSyntax)
+    print(f"Process backend: {'BACKEND_PROCESS' if poolProcess.backend() == WorkerPool.BACKEND_PROCESS else 'BACKEND_THREAD (fallback)'}")
+
+    durations = []
+    for label, pool in (('BACKEND_THREAD', poolThread), ('BACKEND_PROCESS', poolProcess)):
+        results = [measureStall(pool, document) for index in range(3)]
+        durations.append((f'{label}, check', min(result[0] for result in results)))
+        durations.append((f'{label}, main thread stall', min(result[1] for result in results)))
+
+    benchutils.report(f"Syntax check, {NB_LINES} lines", *durations)
+
+    poolProcess.shutdown()
@@ -0,0 +1,59 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark WorkerPool map(), mapNoNone() and aggregate() on 1M items with a
+# trivial callback: measure pool overhead per item
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_workers_map.py
+# -----------------------------------------------------------------------------
+
+import benchutils
+
+from PyQt5.Qt import QCoreApplication
+
+from bulipy.pktk.modules.workers import WorkerPool
+
+NB_ITEMS = 1000000
+
+
+def square(itemIndex, item):
+    """Return square value of item"""
+    return item * item
+
+
+def squareOdd(itemIndex, item):
+    """Return square value of odd items, None for even items"""
+    if item % 2:
+        return item * item
+    return None
+
+
+def squareSum(itemIndex, item):
+    """Return square value of item, to aggregate"""
+    return {'sum': item * item}
+
+
+if __name__ == '__main__':
+    app = QCoreApplication([])
+    items = list(range(NB_ITEMS))
+    pool = WorkerPool()
+
+    assert pool.map(items, square) == [square(index, item) for index, item in enumerate(items)]
+    assert pool.mapNoNone(items, squareOdd) == [item * item for item in items if item % 2]
+    assert pool.aggregate(items, {'sum': 0}, squareSum) == {'sum': sum(item * item for item in items)}
+
+    benchutils.report(f"Process {NB_ITEMS} items",
+                      ('list comprehension (reference)', benchutils.timeit(lambda: [square(index, item) for index, item in enumerate(items)])),
+                      ('WorkerPool.map()', benchutils.timeit(lambda: pool.map(items, square))),
+                      ('WorkerPool.mapNoNone()', benchutils.timeit(lambda: pool.mapNoNone(items, squareOdd))),
+                      ('WorkerPool.aggregate()', benchutils.timeit(lambda: pool.aggregate(items, {'sum': 0}, squareSum))))
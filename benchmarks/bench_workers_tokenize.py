@@ -0,0 +1,65 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# Benchmark WorkerPool backends: tokenize 500 python files with
+# BACKEND_THREAD and BACKEND_PROCESS
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/bench_workers_tokenize.py
+# -----------------------------------------------------------------------------
+
+import benchutils
+
+from PyQt5.Qt import QCoreApplication
+
+from bulipy.pktk.modules.workers import WorkerPool
+from bulipy.bp.bplanguagedef import BPLanguageDefPython
+
+NB_FILES = 500
+
+# tokenizer is created once per process
+__tokenizer = None
+
+
+def tokenize(itemIndex, item):
+    """Tokenize given python source code and return number of tokens
+
+    Module level function, executed in worker threads or worker processes
+    Tokenizer cache is cleared, to measure tokenization and not cache lookup
+    """
+    global __tokenizer
+    if __tokenizer is None:
+        __tokenizer = BPLanguageDefPython().tokenizer()
+    __tokenizer.clearCache(True)
+    return __tokenizer.tokenize(item).length()
+
+
+if __name__ == '__main__':
+    app = QCoreApplication([])
+    sources = benchutils.sourceFiles(NB_FILES)
+
+    poolThread = WorkerPool(backend=WorkerPool.BACKEND_THREAD)
+    poolProcess = WorkerPool(backend=WorkerPool.BACKEND_PROCESS)
+    # start worker processes before measure
+    poolProcess.map(sources[:4], tokenize)
+    print(f"Process backend: {'BACKEND_PROCESS' if poolProcess.backend() == WorkerPool.BACKEND_PROCESS else 'BACKEND_THREAD (fallback)'}")
+
+    results = {}
+    durations = (('single thread', benchutils.timeit(lambda: results.update(single=[tokenize(index, source) for index, source in enumerate(sources)]), 1)),
+                 ('WorkerPool BACKEND_THREAD', benchutils.timeit(lambda: results.update(thread=poolThread.map(sources, tokenize)), 1)),
+                 ('WorkerPool BACKEND_PROCESS', benchutils.timeit(lambda: results.update(process=poolProcess.map(sources, tokenize)), 1)))
+    assert results['single'] == results['thread'] == results['process']
+
+    benchutils.report(f"Tokenize {NB_FILES} files ({sum(len(source) for source in sources)} characters, {sum(results['single'])} tokens)",
+                      *durations)
+
+    poolProcess.shutdown()
@@ -0,0 +1,130 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# The benchutils module provides helpers for benchmarks scripts
+#
+# Benchmarks are executed outside Krita: plugin modules that don't use Krita
+# API are imported from source tree, without executing plugin package
+# initialisation (bulipy/__init__.py needs Krita)
+#
+# Modules importing Krita API without using it in benchmarked code (widgets
+# modules for example) can be imported: when not executed from Krita, a
+# minimal `krita` module is declared (see KritaStub)
+#
+# Usage, from repository root:
+#       QT_QPA_PLATFORM=offscreen python benchmarks/<benchmark>.py
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import types
+
+BULIPY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bulipy', 'bulipy')
+
+if 'bulipy' not in sys.modules:
+    # declare plugin package without executing bulipy/__init__.py
+    package = types.ModuleType('bulipy')
+    package.__path__ = [BULIPY_PATH]
+    sys.modules['bulipy'] = package
+
+if BULIPY_PATH not in sys.path:
+    # pktk modules can be imported as a top level package
+    sys.path.insert(0, BULIPY_PATH)
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+class KritaStub:
+    """Minimal Krita API, declared as `krita` module when benchmarks are not
+    executed from Krita
+
+    Only names imported by plugin modules are declared; Krita.instance()
+    provides i18n and no active window, other classes can't be used
+    """
+
+    class Krita:
+        """Krita application"""
+        __instance = None
+
+        @staticmethod
+        def instance():
+            if KritaStub.Krita.__instance is None:
+                KritaStub.Krita.__instance = KritaStub.Krita()
+            return KritaStub.Krita.__instance
+
+        def krita_i18n(self, text):
+            return text
+
+        def activeWindow(self):
+            return None
+
+        def activeDocument(self):
+            return None
+
+    # classes imported by plugin modules, not used by benchmarks
+    NAMES = ('Document', 'InfoObject', 'ManagedColor', 'Node', 'Palette', 'PresetChooser', 'Resource', 'Swatch')
+
+    @staticmethod
+    def declare():
+        """Declare `krita` module if Krita API is not available"""
+        try:
+            import krita
+        except ImportError:
+            module = types.ModuleType('krita')
+            module.Krita = KritaStub.Krita
+            for name in KritaStub.NAMES:
+                setattr(module, name, type(name, (), {}))
+            module.__all__ = ['Krita'] + list(KritaStub.NAMES)
+            sys.modules['krita'] = module
+
+
+KritaStub.declare()
+
+
+def sourceFiles(nbFiles):
+    """Return a list of `nbFiles` python source code (str) from plugin source tree
+
+    Source files are repeated if there's less than `nbFiles` files
+    """
+    fileNames = []
+    for root, dirs, files in os.walk(BULIPY_PATH):
+        dirs.sort()
+        fileNames.extend(os.path.join(root, fileName) for fileName in sorted(files) if fileName.endswith('.py'))
+
+    contents = []
+    for fileName in fileNames:
+        with open(fileName, 'r', encoding='utf-8') as fHandle:
+            contents.append(fHandle.read())
+
+    return [contents[index % len(contents)] for index in range(nbFiles)]
+
+
+def timeit(function, repeat=3):
+    """Execute `function` `repeat` times and return the best duration, in seconds"""
+    durations = []
+    for index in range(repeat):
+        startTime = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - startTime)
+    return min(durations)
+
+
+def report(title, *durations):
+    """Print benchmark durations
+
+    Given `durations` are tuples (label, duration in seconds)
+    """
+    print(title)
+    reference = durations[0][1]
+    for label, duration in durations:
+        print(f"  {label:<40} {duration * 1000:10.2f}ms   x{reference / duration:.2f}")
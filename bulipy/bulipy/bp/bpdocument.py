@@ -39,6 +39,7 @@ from .bplanguagedef import (
         BPCodeEditorHighlightLineRulePython
     )
 from .bpdwcolorpicker import BPDockWidgetColorPicker
+from .bpsyntaxchecker import BPSyntaxChecker
 
 from .bpsettings import (
         BPSettings,
@@ -54,7 +55,10 @@ from ..pktk.modules.strutils import (
         trimLinesRight
     )
 from ..pktk.modules.uitheme import UITheme
-from ..pktk.modules.bytesrw import BytesRW
+from ..pktk.modules.bytesrw import (
+        BytesRW,
+        BytesRecords
+    )
 from ..pktk.widgets.wtabbar import WTabBar
 from ..pktk.widgets.wcodeeditor import WCodeEditor
 from ..pktk.widgets.wmultisplitter import WMultiSplitter
@@ -89,6 +93,7 @@ class WBPDocument(WBPDocumentBase):
     fileExternallyChanged = Signal(WBPDocumentBase)
     textCopyToClipboard = Signal(WBPDocumentBase, str)
     textCutToClipboard = Signal(WBPDocumentBase, str)
+    syntaxChecked = Signal(WBPDocumentBase)
 
     ALERT_FILE_DELETED =        0x01
     ALERT_FILE_MODIFIED =       0x02
@@ -104,6 +109,9 @@ class WBPDocument(WBPDocumentBase):
     ACTION_RELOADAUTO =         0x06
     ACTION_RELOADAUTO_STOP =    0x07
 
+    CACHE_MAGIC = b'BPDC'
+    CACHE_VERSION = 0x0002
+
     def __init__(self, parent=None, languageDef=None, uiController=None):
         def emitFontSizeChanged():
             self.__delayedFontSizeTimer.stop()
@@ -149,6 +157,11 @@ class WBPDocument(WBPDocumentBase):
         self.__codeEditor.textCopyToClipboard.connect(lambda text: self.textCopyToClipboard.emit(self, text))
         self.__codeEditor.textCutToClipboard.connect(lambda text: self.textCutToClipboard.emit(self, text))
 
+        # python syntax is checked in background
+        self.__syntaxChecker = BPSyntaxChecker(self.__codeEditor)
+        self.__syntaxChecker.checked.connect(lambda problems: self.syntaxChecked.emit(self))
+        self.__syntaxChecker.setActive(isinstance(languageDef, BPLanguageDefPython))
+
         # File watcher on document; allows to check if file is modified outside editor
         self.__fsWatcher = QFileSystemWatcher()
         self.__fsWatcher.fileChanged.connect(self.__externalFileModification)
@@ -517,6 +530,8 @@ class WBPDocument(WBPDocumentBase):
     def close(self, deleteCache=True):
         """Close document"""
         self.__stopWatcher()
+        # stop syntax checker worker process
+        self.__syntaxChecker.setActive(False)
 
         try:
             self.__codeEditor.readOnlyModeChanged.disconnect()
@@ -718,23 +733,29 @@ class WBPDocument(WBPDocumentBase):
     def saveCache(self, delayedSave=0):
         """Save current content to cache
 
-        A cache file is a binary file made of:
-            32bits Flags
+        A cache file is a BytesRecords container (magic 'BPDC', content version
+        0x0002) made of records:
+            . a 'DESC' record, document description:
+                . a UInt4 integer (contains flags)
+                . a UInt2 integer (contains new document number)
+                . a UInt4 integer (contains selection position start, from cursor in document)
+                . a UInt4 integer (contains selection position end, from cursor in document; 0 if no selection)
+                . a PStr2 string (contains full path/name of original document, empty if none)
+                . a Float8 timestamp (contain timestamp of last *file* modification, 0 if no file)
+                . a Float8 timestamp (contain timestamp of last *document* modification)
+
+            . a 'TEXT' record, only if document is modified
+                . a Str string (contains document content, record size is string size)
+
+            Flags:
             0000 0000 0000 0000 0000 0000 0000 0001: document has a selection
             0000 0000 0000 0000 0000 0000 0000 0010: document is modified
             0000 0000 0000 0000 0000 0000 0000 0100: document have a file name
             0000 0000 0000 0000 0000 0000 0000 1000: document is read-only mode
             0000 0000 0000 0000 0000 0000 0001 0000: document is in overwrite mode
 
-            . a UInt2 integer (cache file format version = 0x0001)
-            . a UInt4 integer (contains flags)
-            . a UInt2 integer (contains new document number)
-            . a UInt4 integer (contains selection position start, from cursor in document)
-            . a UInt4 integer (contains selection position end, from cursor in document; 0 if no selection)
-            . a PStr2 string (contains full path/name of original document, empty if none)
-            . a Float8 timestamp (contain timestamp of last *file* modification, 0 if no file)
-            . a PStr4 string (contains document content, empty if not modified)
-            . a Float8 timestamp (contain timestamp of last *document* modification)
+        Cache files saved with previous format (content version 0x0001, fields
+        written sequentially) can still be opened
 
         The `delayedSave` value is provided in milliseconds
         If `delayedSave` equal 0, save cache immediately
@@ -768,7 +789,6 @@ class WBPDocument(WBPDocumentBase):
         if self.__codeEditor.overwriteMode():
             flags |= 0b0001_0000
 
-        dataWrite.writeUInt2(0x0001)
         dataWrite.writeUInt4(flags)
         dataWrite.writeUInt2(self.__newDocNumber)
 
@@ -789,44 +809,56 @@ class WBPDocument(WBPDocumentBase):
             dataWrite.writePStr2('')
             dataWrite.writeFloat8(0.0)
 
-        if self.modified():
-            dataWrite.writePStr4(self.__codeEditor.toPlainText())
-        else:
-            dataWrite.writePStr4('')
-
         dataWrite.writeFloat8(self.__lastUpdateTime)
 
+        records = BytesRecords(WBPDocument.CACHE_MAGIC, WBPDocument.CACHE_VERSION)
+        records.addRecord(b'DESC', dataWrite)
+        dataWrite.close()
+
+        if self.modified():
+            records.addRecord(b'TEXT', self.__codeEditor.toPlainText().encode('utf-8'))
+
         try:
-            with open(self.cacheFileName(), "wb") as fHandle:
-                fHandle.write(dataWrite.getvalue())
-            dataWrite.close()
+            records.save(self.cacheFileName())
         except Exception as e:
             Debug.print('[WBPDocument.saveCache] unable to save file {0}: {1}', self.cacheFileName(), str(e))
-            if dataWrite:
-                dataWrite.close()
             return False
 
         return True
 
-    def openCache(self, uuid):
-        """Open content from cache
+    def __readCache(self, data):
+        """Read cache content from given `data`
 
-        Force to modified when opened
+        Return a tuple (flags, newDocNumber, cursorSelStart, cursorSelEnd, fullPathFileName, timestamp, docContent, lastUpdateTime)
+        or None if cache content is not valid
         """
-        self.__documentCacheUuid = uuid
+        if not BytesRecords.isRecords(data, WBPDocument.CACHE_MAGIC):
+            # cache file saved with previous format
+            dataRead = BytesRW(data)
 
-        try:
-            dataRead = None
-            with open(self.cacheFileName(), "rb") as fHandle:
-                dataRead = BytesRW(fHandle.read())
-        except Exception as e:
-            Debug.print('[WBPDocument.openCache] unable to open file {0}: {1}', self.cacheFileName(), str(e))
-            if dataRead:
-                dataRead.close()
-            return False
+            # version, ignore it
+            dataRead.readUInt2()
+
+            flags = dataRead.readUInt4()
+            newDocNumber = dataRead.readUInt2()
 
-        # version, ignore it
-        dataRead.readUInt2()
+            cursorSelStart = dataRead.readUInt4()
+            cursorSelEnd = dataRead.readUInt4()
+
+            fullPathFileName = dataRead.readPStr2()
+            timestamp = dataRead.readFloat8()
+            docContent = dataRead.readPStr4()
+            lastUpdateTime = dataRead.readFloat8()
+
+            dataRead.close()
+            return (flags, newDocNumber, cursorSelStart, cursorSelEnd, fullPathFileName, timestamp, docContent, lastUpdateTime)
+
+        records = BytesRecords(WBPDocument.CACHE_MAGIC)
+        records.fromBytes(data)
+
+        index = records.index(b'DESC')
+        if index == -1 or (dataRead := records.reader(index)) is None:
+            return None
 
         flags = dataRead.readUInt4()
         newDocNumber = dataRead.readUInt2()
@@ -836,11 +868,40 @@ class WBPDocument(WBPDocumentBase):
 
         fullPathFileName = dataRead.readPStr2()
         timestamp = dataRead.readFloat8()
-        docContent = dataRead.readPStr4()
         lastUpdateTime = dataRead.readFloat8()
 
         dataRead.close()
 
+        docContent = ''
+        if flags & 0b0000_0010 == 0b0000_0010:
+            # document content is only needed if document has been modified
+            index = records.index(b'TEXT')
+            if index == -1 or not records.isValid(index):
+                return None
+            docContent = str(records.data(index), 'utf-8')
+
+        return (flags, newDocNumber, cursorSelStart, cursorSelEnd, fullPathFileName, timestamp, docContent, lastUpdateTime)
+
+    def openCache(self, uuid):
+        """Open content from cache
+
+        Force to modified when opened
+        """
+        self.__documentCacheUuid = uuid
+
+        try:
+            with open(self.cacheFileName(), "rb") as fHandle:
+                cacheContent = self.__readCache(fHandle.read())
+        except Exception as e:
+            Debug.print('[WBPDocument.openCache] unable to open file {0}: {1}', self.cacheFileName(), str(e))
+            return False
+
+        if cacheContent is None:
+            Debug.print('[WBPDocument.openCache] invalid cache file {0}', self.cacheFileName())
+            return False
+
+        flags, newDocNumber, cursorSelStart, cursorSelEnd, fullPathFileName, timestamp, docContent, lastUpdateTime = cacheContent
+
         if flags & 0b0000_0100 == 0b0000_0100 and fullPathFileName != '':
             # document name a file name, read file content
             newDocNumber = 0
@@ -949,9 +1010,25 @@ class WBPDocument(WBPDocumentBase):
             # in this case don't want to change the last updateTime of document
             lastUpdateTime = self.__lastUpdateTime
             self.__codeEditor.setLanguageDefinition(languageDef)
+            self.__syntaxChecker.setActive(isinstance(languageDef, BPLanguageDefPython))
             self.__lastUpdateTime = lastUpdateTime
             self.languageDefChanged.emit(self)
 
+    def syntaxProblems(self, lineNumber=None):
+        """Return problems (BPSyntaxCheckerProblem) found by background syntax check
+
+        If `lineNumber` (start from 1) is provided, return only problems for given line
+        """
+        if lineNumber is None:
+            return self.__syntaxChecker.problems()
+        return self.__syntaxChecker.problemsAt(lineNumber)
+
+    def syntaxCheckStatusMessage(self):
+        """Return a description of background syntax check status, or an empty
+        string if syntax check is executed normally
+        """
+        return self.__syntaxChecker.statusMessage()
+
     def lastModificationTime(self):
         """Return last modification time"""
         return self.__lastUpdateTime
@@ -1008,6 +1085,7 @@ class BPDocuments(QObject):
     fileExternallyChanged = Signal(WBPDocumentBase)
     textCopyToClipboard = Signal(WBPDocumentBase, str)
     textCutToClipboard = Signal(WBPDocumentBase, str)
+    syntaxChecked = Signal(WBPDocument)
 
     def __init__(self, uiController, parent=None):
         super(BPDocuments, self).__init__(parent)
@@ -1063,6 +1141,10 @@ class BPDocuments(QObject):
         """language definition document changed"""
         self.languageDefChanged.emit(document)
 
+    def __syntaxChecked(self, document):
+        """document syntax has been checked"""
+        self.syntaxChecked.emit(document)
+
     def __fontSizeChanged(self, document):
         """font size of document changed"""
         self.fontSizeChanged.emit(document)
@@ -1104,6 +1186,7 @@ class BPDocuments(QObject):
         document.fileExternallyChanged.connect(self.__fileExternallyChanged)
         document.textCopyToClipboard.connect(self.__textCopyToClipboard)
         document.textCutToClipboard.connect(self.__textCutToClipboard)
+        document.syntaxChecked.connect(self.__syntaxChecked)
 
         # emit signal the new document has been added
         self.documentAdded.emit(document)
@@ -1147,6 +1230,7 @@ class BPDocuments(QObject):
             document.fontSizeChanged.disconnect()
             document.textCopyToClipboard.disconnect()
             document.textCutToClipboard.disconnect()
+            document.syntaxChecked.disconnect()
             document.close(False)
 
         self.__currentDocument = None
@@ -1320,6 +1404,7 @@ class BPDocuments(QObject):
                     document.fontSizeChanged.disconnect()
                     document.textCopyToClipboard.disconnect()
                     document.textCutToClipboard.disconnect()
+                    document.syntaxChecked.disconnect()
                     document.close()
                     self.documentRemoved.emit(document)
 
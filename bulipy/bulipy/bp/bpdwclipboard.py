@@ -51,7 +51,10 @@ from ..pktk.modules.utils import (
         regExIsValid,
         Debug
     )
-from ..pktk.modules.bytesrw import BytesRW
+from ..pktk.modules.bytesrw import (
+        BytesRW,
+        BytesRecords
+    )
 from ..pktk.widgets.wseparator import WVLine
 from ..pktk.widgets.wdockwidget import WDockWidget
 from ..pktk.widgets.wsearchinput import (
@@ -91,6 +94,9 @@ class BPDockWidgetClipboard(WDockWidget):
     SIZE_MARGINS = QSize(8, 16)
     SIZE_MAXLINES = 8
 
+    CACHE_MAGIC = b'BPCB'
+    CACHE_VERSION = 0x0002
+
     @staticmethod
     def asDocument(text, languageDef, tokens, foundText, foundTextFmt):
         """Return a formatted QTextDocument"""
@@ -129,6 +135,7 @@ class BPDockWidgetClipboard(WDockWidget):
         self.__documents = documents
         self.__filteredFound = None
         self.__fontMetrics = None
+        self.__twClipboardItemDelegate = None
 
         self.__foundTextFmt = QTextCharFormat()
         self.__foundTextFmt.setBackground(QBrush(QColor('#2b961f')))
@@ -277,6 +284,9 @@ class BPDockWidgetClipboard(WDockWidget):
         self.__twClipboard.setColumnWidth(0, self.__twClipboard.width() - sizeDate.width() - 2 * BPDockWidgetClipboard.SIZE_MARGINS.width())
         self.__twClipboard.setColumnWidth(1, sizeDate.width())
 
+        if self.__twClipboardItemDelegate:
+            self.__twClipboardItemDelegate.invalidateCache()
+
         self.setUpdatesEnabled(True)
 
     def __setFontSize(self, value):
@@ -390,6 +400,7 @@ class BPDockWidgetClipboard(WDockWidget):
     def __clipboardClear(self):
         """Remove all items"""
         self.__twClipboard.clear()
+        self.__twClipboardItemDelegate.invalidateCache()
         self.__updateButtons()
 
     def __clipboardRemoveSelected(self):
@@ -470,74 +481,55 @@ class BPDockWidgetClipboard(WDockWidget):
     def __saveCache(self):
         """Save current clipboard to cache file
 
-        A cache file is a binary file made of:
-            32bits Flags (all zero, reserved values)
-                0000 0000 0000 0000 0000 0000 0000 0000
-
-            . a UInt2 integer (cache file format version = 0x0001)
-            . a UInt4 integer (contains flags)
-            . a UInt2 integer (contains number of clipboard content)
-            . clipboard items
-
-        Each clipboard item is:
-            . a UInt2 integer = 0xF999 -- start of clipboard item
+        A cache file is a BytesRecords container (magic 'BPCB', content version
+        0x0002) made of one 'ITEM' record per clipboard item:
             . a PStr2 string (contains date-time as str YYYY-MM-DD HH:MI:SS)
             . a PStr2 string (contains content language first extension)
-            . a PStr4 string (contains clipboard text)
-        """
-        dataWrite = BytesRW()
-
-        flags = 0x00
+            . a Str string (contains clipboard text, until end of record)
 
-        # version
-        dataWrite.writeUInt2(0x0001)
-        # flags
-        dataWrite.writeUInt4(flags)
-        # number of item in clipboard
-        dataWrite.writeUInt2(self.__twClipboard.topLevelItemCount())
+        Cache files saved with previous format (content version 0x0001, items
+        written sequentially) can still be loaded
+        """
+        records = BytesRecords(BPDockWidgetClipboard.CACHE_MAGIC, BPDockWidgetClipboard.CACHE_VERSION)
 
         for index in range(self.__twClipboard.topLevelItemCount()):
-            item = item = self.__twClipboard.topLevelItem(index)
+            item = self.__twClipboard.topLevelItem(index)
             if extension := item.data(0, BPDockWidgetClipboard.ROLE_LANGUAGE).extensions():
                 extension = extension[0]
             else:
                 extension = ''
 
-            dataWrite.writeUInt2(0xF999)
+            dataWrite = BytesRW()
             dataWrite.writePStr2(item.data(1, Qt.DisplayRole))
             dataWrite.writePStr2(extension)
-            dataWrite.writePStr4(item.data(0, BPDockWidgetClipboard.ROLE_RAWTEXT))
+            dataWrite.writeStr(item.data(0, BPDockWidgetClipboard.ROLE_RAWTEXT))
+            records.addRecord(b'ITEM', dataWrite)
+            dataWrite.close()
 
         try:
-            with open(self.__cacheFile, "wb") as fHandle:
-                fHandle.write(dataWrite.getvalue())
-            dataWrite.close()
+            records.save(self.__cacheFile)
         except Exception as e:
             Debug.print('[BPDockWidgetClipboard.saveCache] unable to save file {0}: {1}', self.__cacheFile, str(e))
-            if dataWrite:
-                dataWrite.close()
             return False
 
         return True
 
-    def __loadCache(self):
-        """Load clipboard from cache file"""
-        if not os.path.exists(self.__cacheFile):
-            return False
+    def __loadCacheLegacy(self, data):
+        """Load clipboard from cache content saved with previous format
 
-        self.setUpdatesEnabled(False)
-        self.__twClipboard.clear()
-
-        try:
-            dataRead = None
-            with open(self.__cacheFile, "rb") as fHandle:
-                dataRead = BytesRW(fHandle.read())
-        except Exception as e:
-            Debug.print('[BPDockWidgetClipboard.loadCache] unable to open file {0}: {1}', self.__cacheFile, str(e))
-            if dataRead:
-                dataRead.close()
-            return False
+        A legacy cache file is a binary file made of:
+            . a UInt2 integer (cache file format version = 0x0001)
+            . a UInt4 integer (contains flags, all zero)
+            . a UInt2 integer (contains number of clipboard content)
+            . clipboard items
 
+        Each clipboard item is:
+            . a UInt2 integer = 0xF999 -- start of clipboard item
+            . a PStr2 string (contains date-time as str YYYY-MM-DD HH:MI:SS)
+            . a PStr2 string (contains content language first extension)
+            . a PStr4 string (contains clipboard text)
+        """
+        dataRead = BytesRW(data)
         canRead = True
 
         # version, ignore it
@@ -546,7 +538,7 @@ class BPDockWidgetClipboard(WDockWidget):
         flags = dataRead.readUInt4()
         nbItems = dataRead.readUInt2()
 
-        for index in range(nbItems):
+        for index in range(nbItems or 0):
             soi = dataRead.readUInt2()
             if soi != 0xF999:
                 canRead = False
@@ -556,10 +548,59 @@ class BPDockWidgetClipboard(WDockWidget):
             rawText = dataRead.readPStr4()
             self.__addText(languageExtension, rawText, dateTime)
 
+        dataRead.close()
+        return canRead
+
+    def __loadCache(self):
+        """Load clipboard from cache file
+
+        Items for which record is corrupted are ignored
+        """
+        if not os.path.exists(self.__cacheFile):
+            return False
+
+        try:
+            with open(self.__cacheFile, "rb") as fHandle:
+                data = fHandle.read()
+
+            records = None
+            if BytesRecords.isRecords(data, BPDockWidgetClipboard.CACHE_MAGIC):
+                records = BytesRecords(BPDockWidgetClipboard.CACHE_MAGIC)
+                records.fromBytes(data)
+        except Exception as e:
+            Debug.print('[BPDockWidgetClipboard.loadCache] unable to open file {0}: {1}', self.__cacheFile, str(e))
+            return False
+
+        self.setUpdatesEnabled(False)
+        self.__twClipboard.clear()
+
+        if records is None:
+            canRead = self.__loadCacheLegacy(data)
+        else:
+            canRead = True
+            for index in records.indexes(b'ITEM'):
+                dataRead = records.reader(index)
+                if dataRead is None:
+                    Debug.print('[BPDockWidgetClipboard.loadCache] invalid item {0} in file {1}', index, self.__cacheFile)
+                    canRead = False
+                    continue
+
+                dateTime = dataRead.readPStr2()
+                languageExtension = dataRead.readPStr2()
+                rawText = dataRead.readStr()
+                dataRead.close()
+                self.__addText(languageExtension, rawText, dateTime)
+
         self.__updateButtons()
         self.setUpdatesEnabled(True)
         return canRead
 
+    def changeEvent(self, event):
+        """Palette or style has been modified, rendered items are obsolete"""
+        if event.type() in (QEvent.PaletteChange, QEvent.StyleChange) and self.__twClipboardItemDelegate:
+            self.__twClipboardItemDelegate.invalidateCache()
+        super(BPDockWidgetClipboard, self).changeEvent(event)
+
     def option(self, optionId):
         """Return current option value
 
@@ -670,6 +711,9 @@ class BPDockWidgetClipboard(WDockWidget):
 class BPDockWidgetClipboardItemDelegate(QStyledItemDelegate):
     """Render clipboard item content"""
 
+    # maximum number of rendered items kept in cache
+    RENDER_CACHE_MAXITEMS = 500
+
     def __init__(self, avgLineHeight, font, parent=None):
         super(BPDockWidgetClipboardItemDelegate, self).__init__(parent)
         self.__fontMissingLines = font
@@ -681,6 +725,87 @@ class BPDockWidgetClipboardItemDelegate(QStyledItemDelegate):
         self.__foundTextFmt.setBackground(QBrush(QColor('#2b961f')))
         self.__foundTextFmt.setForeground(QBrush(QColor('#f5eb00')))
 
+        # rendered content, as pixmap
+        #   key = (item hash, height, selected, found text, palette key, font key, pixel ratio)
+        #   value = QPixmap
+        # all cached items are rendered for the same width
+        self.__renderCache = {}
+        self.__renderCacheWidth = None
+
+    def __renderedContent(self, option, index, pixelRatio):
+        """Return a pixmap of formatted content for item
+
+        If pixmap has already been rendered for item, return the cached pixmap
+        otherwise render it and add it to cache
+        """
+        size = option.rect.size()
+        if self.__renderCacheWidth != size.width():
+            # column width has been modified, all rendered content are obsolete
+            self.__renderCache = {}
+            self.__renderCacheWidth = size.width()
+
+        isSelected = (option.state & QStyle.State_Selected) == QStyle.State_Selected
+        foundText = index.data(BPDockWidgetClipboard.ROLE_FOUNDTEXT)
+        if foundText:
+            foundTextKey = tuple(foundText)
+        else:
+            foundTextKey = None
+
+        key = (index.data(BPDockWidgetClipboard.ROLE_HASH),
+               size.height(),
+               isSelected,
+               foundTextKey,
+               option.palette.cacheKey(),
+               option.font.key(),
+               pixelRatio)
+
+        if key in self.__renderCache:
+            # move item at the end of cache, as being the most recently used one
+            pixmap = self.__renderCache.pop(key)
+            self.__renderCache[key] = pixmap
+            return pixmap
+
+        if isSelected:
+            # item selected, no format
+            tokens = None
+            languageDef = None
+        else:
+            # not selected, format content
+            tokens = index.data(BPDockWidgetClipboard.ROLE_TOKENS)
+            languageDef = index.data(BPDockWidgetClipboard.ROLE_LANGUAGE)
+
+        pixmap = QPixmap(round(size.width() * pixelRatio), round(size.height() * pixelRatio))
+        pixmap.setDevicePixelRatio(pixelRatio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter()
+        painter.begin(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(option.palette.color(QPalette.Text)))
+
+        textDocument = BPDockWidgetClipboard.asDocument(index.data(Qt.DisplayRole), languageDef, tokens, foundText, self.__foundTextFmt)
+        textDocument.setDocumentMargin(1)
+        textDocument.setDefaultFont(option.font)
+        textDocument.setPageSize(QSizeF(size))
+        textDocument.drawContents(painter, QRectF())
+        painter.end()
+
+        if len(self.__renderCache) >= BPDockWidgetClipboardItemDelegate.RENDER_CACHE_MAXITEMS:
+            # remove least recently used item
+            self.__renderCache.pop(next(iter(self.__renderCache)))
+        self.__renderCache[key] = pixmap
+
+        return pixmap
+
+    def invalidateCache(self):
+        """Clear rendered content cache
+
+        Need to be called when something that is not part of cache key is modified
+        (clipboard content, theme, ...)
+        """
+        self.__renderCache = {}
+        self.__renderCacheWidth = None
+
     def paint(self, painter, option, index):
         """Paint item"""
         if option.state & QStyle.State_HasFocus == QStyle.State_HasFocus:
@@ -701,29 +826,7 @@ class BPDockWidgetClipboardItemDelegate(QStyledItemDelegate):
             else:
                 painter.fillRect(option.rect, option.backgroundBrush)
 
-            text = index.data(Qt.DisplayRole)
-
-            if (option.state & QStyle.State_Selected) == QStyle.State_Selected:
-                # item selected, no format
-                tokens = None
-                languageDef = None
-            else:
-                # not selected, format content
-                tokens = index.data(BPDockWidgetClipboard.ROLE_TOKENS)
-                languageDef = index.data(BPDockWidgetClipboard.ROLE_LANGUAGE)
-            foundText = index.data(BPDockWidgetClipboard.ROLE_FOUNDTEXT)
-
-            painter.save()
-            painter.setClipRect(option.rect)
-            painter.translate(QPointF(option.rect.topLeft()))
-
-            textDocument = BPDockWidgetClipboard.asDocument(text, languageDef, tokens, foundText, self.__foundTextFmt)
-            textDocument.setDocumentMargin(1)
-            textDocument.setDefaultFont(option.font)
-            textDocument.setPageSize(QSizeF(option.rect.size()))
-            textDocument.drawContents(painter, QRectF())
-
-            painter.restore()
+            painter.drawPixmap(option.rect.topLeft(), self.__renderedContent(option, index, painter.device().devicePixelRatioF()))
 
             missingLines = index.data(BPDockWidgetClipboard.ROLE_MISSING_LINES)
             if missingLines > 0:
@@ -0,0 +1,117 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+from PyQt5.Qt import *
+from PyQt5.QtWidgets import (
+        QTreeWidget
+    )
+from PyQt5.QtCore import (
+        pyqtSignal as Signal
+    )
+from PyQt5.QtGui import (
+        QFont
+    )
+
+from ..pktk.widgets.wdockwidget import WDockWidget
+
+from ..pktk.pktk import *
+
+
+class BPDockWidgetOutline(WDockWidget):
+    """A dock widget to display symbols (classes, functions) declared in current document"""
+
+    # symbol has been clicked, provide line number (start from 1)
+    symbolClicked = Signal(int)
+
+    def __init__(self, parent, documents, name='Outline'):
+        super(BPDockWidgetOutline, self).__init__(name, parent)
+
+        self.__editor = None
+        # outline is rebuilt only when docker is visible
+        self.__outdated = True
+
+        documents.activeDocumentChanged.connect(self.__documentChanged)
+
+        self.__widget = QWidget(self)
+        self.__widget.setMinimumWidth(200)
+
+        self.__layout = QVBoxLayout(self.__widget)
+        self.__layout.setContentsMargins(4, 4, 4, 0)
+        self.__widget.setLayout(self.__layout)
+
+        self.__twSymbols = QTreeWidget(self.__widget)
+        self.__twSymbols.setColumnCount(2)
+        self.__twSymbols.setAllColumnsShowFocus(True)
+        self.__twSymbols.setUniformRowHeights(True)
+        self.__twSymbols.setItemsExpandable(True)
+        self.__twSymbols.setRootIsDecorated(True)
+        self.__twSymbols.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.__twSymbols.setHeaderLabels([i18n('Symbol'),
+                                          i18n('Line')
+                                          ])
+        font = self.__twSymbols.font()
+        font.setStyleHint(QFont.Monospace)
+        font.setFamily('DejaVu Sans Mono, Consolas, Courier New')
+        self.__twSymbols.setFont(font)
+        self.__twSymbols.itemClicked.connect(self.__itemClicked)
+        self.__twSymbols.itemActivated.connect(self.__itemClicked)
+
+        self.__layout.addWidget(self.__twSymbols)
+        self.setWidget(self.__widget)
+
+    def __documentChanged(self, document):
+        """Current document has changed, get current editor"""
+        if self.__editor:
+            self.__editor.symbolsChanged.disconnect(self.__symbolsChanged)
+
+        self.__editor = document.codeEditor()
+        self.__editor.symbolsChanged.connect(self.__symbolsChanged)
+        self.__symbolsChanged()
+
+    def __symbolsChanged(self):
+        """Symbols from current editor have been modified"""
+        self.__outdated = True
+        if self.isVisible():
+            self.__updateSymbols()
+
+    def __updateSymbols(self):
+        """Rebuild outline from current editor symbols"""
+        self.__outdated = False
+        self.__twSymbols.clear()
+        if self.__editor is None:
+            return
+
+        items = {}
+        for symbol in self.__editor.symbols():
+            item = QTreeWidgetItem([f"{symbol.kind()} {symbol.name()}", f"{symbol.lineNumber()}"])
+            item.setData(0, Qt.UserRole, symbol.lineNumber())
+            item.setTextAlignment(1, Qt.AlignRight)
+            item.setToolTip(0, symbol.fullName())
+
+            if symbol.parent() in items:
+                items[symbol.parent()].addChild(item)
+            else:
+                self.__twSymbols.addTopLevelItem(item)
+            items[symbol] = item
+
+        self.__twSymbols.expandAll()
+        self.__twSymbols.resizeColumnToContents(0)
+        self.__twSymbols.resizeColumnToContents(1)
+
+    def __itemClicked(self, item, column):
+        """A symbol has been clicked"""
+        self.symbolClicked.emit(item.data(0, Qt.UserRole))
+
+    def showEvent(self, event):
+        """Docker is visible, update outline if needed"""
+        super(BPDockWidgetOutline, self).showEvent(event)
+        if self.__outdated:
+            self.__updateSymbols()
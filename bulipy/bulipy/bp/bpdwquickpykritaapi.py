@@ -10,7 +10,6 @@
 # -----------------------------------------------------------------------------
 
 import re
-import json
 
 from PyQt5.Qt import *
 from PyQt5.QtGui import (
@@ -24,8 +23,7 @@ from PyQt5.QtGui import (
         QClipboard
     )
 from PyQt5.QtWidgets import (
-        QDockWidget,
-        QTreeWidget
+        QDockWidget
     )
 from PyQt5.QtCore import (
         pyqtSignal as Signal
@@ -40,6 +38,7 @@ from PyQt5.QtGui import (
     )
 
 from .bplanguagedef import BPLanguageDefPython
+from .bpkritaapiref import BPKritaApiRef
 
 from ..pktk.modules.tokenizer import Tokenizer
 from ..pktk.modules.languagedef import LanguageDef
@@ -71,14 +70,19 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
     OPTION_SPLITTER =                0b01000000000_00000
     # available bits:                    <------->
 
-    ROLE_CLASS_NAME = Qt.UserRole + 1
-    ROLE_METHOD_NAME = Qt.UserRole + 2
+    # delay (in milliseconds) after last keystroke before search is applied
+    SEARCH_DELAY = 150
 
     def __init__(self, parent, documents, name='Clipboard'):
         super(BPDockWidgetQuickKritaApi, self).__init__(name, parent)
 
         self.__filteredFound = None
-        self.__pyKritaApiRef = {}
+        self.__pyKritaApiRef = None
+
+        # search is applied few milliseconds after last keystroke
+        self.__delayedSearchTimer = QTimer()
+        self.__delayedSearchTimer.setSingleShot(True)
+        self.__delayedSearchTimer.timeout.connect(lambda: self.__siSearch.applySearch())
 
         self.__tag = None
         self.__tagName = ''
@@ -98,10 +102,14 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
         self.__siSearch.searchActivated.connect(self.__searchActivated)
         self.__siSearch.searchModified.connect(self.__searchModified)
 
-        self.__twPyKritaApi = QTreeWidget(self.__widget)
-        self.__twPyKritaApi.itemSelectionChanged.connect(self.__currentSelectionChanged)
+        self.__model = BPKritaApiModel(self)
+        self.__proxyModel = BPKritaApiFilterModel(self)
+        self.__proxyModel.setSourceModel(self.__model)
+
+        self.__twPyKritaApi = QTreeView(self.__widget)
+        self.__twPyKritaApi.setModel(self.__proxyModel)
+        self.__twPyKritaApi.selectionModel().selectionChanged.connect(self.__currentSelectionChanged)
         self.__twPyKritaApi.expanded.connect(lambda: self.__twPyKritaApi.resizeColumnToContents(0))
-        self.__twPyKritaApi.setColumnCount(2)
         self.__twPyKritaApi.setHeaderHidden(True)
         self.__twPyKritaApi.setAllColumnsShowFocus(True)
         self.__twPyKritaApi.setUniformRowHeights(True)
@@ -128,7 +136,7 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
         self.__btExpandAll.setAutoRaise(True)
         self.__btExpandAll.setIcon(buildIcon('pktk:list_tree_expand'))
         self.__btExpandAll.setToolTip(i18n('Expand all'))
-        self.__btExpandAll.clicked.connect(lambda: self.__twPyKritaApi.expandAll())
+        self.__btExpandAll.clicked.connect(self.__expandAll)
 
         self.__btCollapseAll = QToolButton(self)
         self.__btCollapseAll.setAutoRaise(True)
@@ -148,53 +156,50 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
 
         self.updateStatus()
         self.setWidget(self.__widget)
+
+    def showEvent(self, event):
+        """Docker is displayed, ensure referential is loaded"""
+        super(BPDockWidgetQuickKritaApi, self).showEvent(event)
         self.__buildRef()
 
     def __buildRef(self):
-        """Load referential, build treeview reference"""
-        refFileName = os.path.join(os.path.dirname(__file__), 'resources', 'docs', 'krita.json')
+        """Load referential, build treeview reference
+
+        Referential is loaded only once, the first time docker is displayed
+        """
+        if self.__pyKritaApiRef is not None:
+            return
+
+        refFileName = os.path.join(os.path.dirname(__file__), 'resources', 'docs', 'krita.bin')
         try:
-            with open(refFileName, 'r') as fHandle:
-                self.__pyKritaApiRef = json.loads(fHandle.read())
+            self.__pyKritaApiRef = BPKritaApiRef(refFileName)
         except Exception as e:
             print("Can't load referential")
             print(e)
+            self.__pyKritaApiRef = BPKritaApiRef()
             return
 
-        self.__twPyKritaApi.clear()
-        for className in sorted(self.__pyKritaApiRef['classes'].keys()):
-            classNfo = self.__pyKritaApiRef['classes'][className]
-
-            classItem = QTreeWidgetItem(None, [className, ''])
-            classItem.setFirstColumnSpanned(True)
-            classItem.setData(0, BPDockWidgetQuickKritaApi.ROLE_CLASS_NAME, className)
-            classItem.setData(0, BPDockWidgetQuickKritaApi.ROLE_METHOD_NAME, None)
-
-            for classMethod in sorted(classNfo['methods'], key=lambda m: m['name']):
-                nfo = []
-                if classMethod['isStatic']:
-                    nfo.append(i18n('Static'))
-                if classMethod['isVirtual']:
-                    nfo.append(i18n('Virtual'))
-                if classMethod['isSignal']:
-                    nfo.append(i18n('Signal'))
-                parameters = ''
-                if len(classMethod['parameters']):
-                    parameters = '...'
-
-                classMethodItem = QTreeWidgetItem(classItem, [f"{classMethod['name']}({parameters})", ', '.join(nfo)])
-                classMethodItem.setTextAlignment(1, Qt.AlignRight)
-                classMethodItem.setData(0, BPDockWidgetQuickKritaApi.ROLE_CLASS_NAME, className)
-                classMethodItem.setData(0, BPDockWidgetQuickKritaApi.ROLE_METHOD_NAME, classMethod['name'])
-                classItem.addChild(classMethodItem)
-
-            self.__twPyKritaApi.addTopLevelItem(classItem)
-        self.__twPyKritaApi.resizeColumnToContents(0)
+        self.__model.setReferential(self.__pyKritaApiRef)
+        self.__updateSpannedRows()
 
-        self.__lastTagRef = sorted(self.__pyKritaApiRef['tags'].keys())[-1]
-        self.__tag = self.__pyKritaApiRef['tags'][self.__lastTagRef]
+        self.__lastTagRef = self.__pyKritaApiRef.lastTagRef()
+        self.__tag = self.__pyKritaApiRef.tags()[self.__lastTagRef]
         self.__tagName = f"{int(self.__lastTagRef[0:2])}.{int(self.__lastTagRef[2:4])}.{int(self.__lastTagRef[4:6])}"
 
+        # referential is loaded, apply current search if any
+        self.__siSearch.applySearch()
+
+    def __updateSpannedRows(self):
+        """Classes rows are rendered on all columns"""
+        for row in range(self.__proxyModel.rowCount()):
+            self.__twPyKritaApi.setFirstColumnSpanned(row, QModelIndex(), True)
+        self.__twPyKritaApi.resizeColumnToContents(0)
+
+    def __expandAll(self):
+        """Expand all classes"""
+        self.__model.fetchAll()
+        self.__twPyKritaApi.expandAll()
+
     def __updateNfo(self):
         """Update information"""
         def getTagName(tagRef):
@@ -389,20 +394,19 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
 
             return "\n".join(returned)
 
-        def htmlClass(className):
-            classNfo = self.__pyKritaApiRef['classes'][className]
+        def htmlClass(classId):
+            classNfo = self.__pyKritaApiRef.classNfo(classId)
             return f"""
             <div class='buildFrom'>Build from <a target='_blank' style='text-decoration: none; font-family: consolas, monospace;' href='https://invent.kde.org/graphics/krita/-/blob/{self.__tag['hash']}/libs/libkis/{classNfo["fileName"]}'>{classNfo["fileName"]}</a></div>
             <div class='docRefTags'>{formatRefTags(classNfo["tagRef"])}</div>
             <div class='docString'>{formatDescription(classNfo["description"])}</div>
             """
 
-        def htmlClassMethod(className, methodName):
-            classNfo = self.__pyKritaApiRef['classes'][className]
-
-            for methodNfo in classNfo['methods']:
-                if methodNfo['name'] == methodName:
-                    break
+        def htmlClassMethod(classId, methodId):
+            classNfo = self.__pyKritaApiRef.classNfo(classId)
+            className = classNfo['name']
+            methodNfo = self.__pyKritaApiRef.methodNfo(methodId)
+            methodName = methodNfo['name']
 
             styleMethodParamName = "style='color: #bdc3c7;'"
             styleMethodSep = "style='color: #e83e8c;'"
@@ -451,15 +455,16 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
             <div class='docString'><table width='100%'><tr><td style='border-bottom: 1px dotted #888;'>{fctDef}</td></tr><tr><td>{formatDescription(methodNfo["description"])}</td></tr></table></div>
             """
 
-        item = self.__twPyKritaApi.currentItem()
-        if item:
-            className = item.data(0, BPDockWidgetQuickKritaApi.ROLE_CLASS_NAME)
-            methodName = item.data(0, BPDockWidgetQuickKritaApi.ROLE_METHOD_NAME)
+        index = self.__twPyKritaApi.currentIndex()
+        if index.isValid():
+            className = index.data(BPKritaApiModel.ROLE_CLASS_NAME)
+            classId = index.data(BPKritaApiModel.ROLE_CLASS_ID)
+            methodId = index.data(BPKritaApiModel.ROLE_METHOD_ID)
 
-            if methodName is None:
-                content = htmlClass(className)
+            if methodId is None:
+                content = htmlClass(classId)
             else:
-                content = htmlClassMethod(className, methodName)
+                content = htmlClassMethod(classId, methodId)
 
             html = f"""<!DOCTYPE HTML>
             <html>
@@ -474,7 +479,13 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
             self.__tbNfo.setHtml(html)
 
     def __searchActivated(self, text, options, searchAll=False):
-        """Ask to search for text in clipboard items"""
+        """Ask to search for text in classes and methods names"""
+        self.__delayedSearchTimer.stop()
+
+        if self.__pyKritaApiRef is None:
+            # referential not yet loaded, search will be applied once loaded
+            return
+
         if text != '':
             regEx = text
             if options & SearchOptions.REGEX != SearchOptions.REGEX:
@@ -493,52 +504,37 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
             if not regExIsValid(regEx):
                 return
 
-            self.__filteredFound = 0
-            for index in range(self.__twPyKritaApi.topLevelItemCount()):
-                itemClass = self.__twPyKritaApi.topLevelItem(index)
-                className = itemClass.data(0, Qt.DisplayRole)
+            foundClasses, foundMethods = self.__pyKritaApiRef.search(regEx, flags)
+            self.__filteredFound = len(foundClasses) + sum([len(methods) for methods in foundMethods.values()])
 
-                if matchPattern := re.findall(regEx, className, flags=flags):
-                    itemClass.setExpanded(False)
-                    itemClass.setHidden(False)
-                    for index in range(itemClass.childCount()):
-                        itemClass.child(index).setHidden(False)
-                else:
-                    found = False
-                    for index in range(itemClass.childCount()):
-                        itemClassMethod = itemClass.child(index)
-                        classMethodName = itemClassMethod.data(0, Qt.DisplayRole)
-
-                        if matchPattern := re.findall(regEx, classMethodName, flags=flags):
-                            itemClassMethod.setHidden(False)
-                            found = True
-                        else:
-                            itemClassMethod.setHidden(True)
+            # classes for which methods are found need to be expanded: ensure methods rows are available
+            for classId in foundMethods:
+                if classId not in foundClasses:
+                    self.__model.fetchMore(self.__model.index(classId, 0))
 
-                    if found:
-                        itemClass.setExpanded(True)
-                        itemClass.setHidden(False)
-                    else:
-                        itemClass.setHidden(True)
+            self.__proxyModel.setFilter(foundClasses, foundMethods)
 
+            for row in range(self.__proxyModel.rowCount()):
+                classIndex = self.__proxyModel.index(row, 0)
+                # class name found: collapsed with all methods
+                # otherwise expanded to display found methods
+                self.__twPyKritaApi.setExpanded(classIndex, classIndex.data(BPKritaApiModel.ROLE_CLASS_ID) not in foundClasses)
         else:
             # no filter, display everything
-            for index in range(self.__twPyKritaApi.topLevelItemCount()):
-                itemClass = self.__twPyKritaApi.topLevelItem(index)
-                className = itemClass.data(0, Qt.DisplayRole)
-                itemClass.setHidden(False)
-                for index in range(itemClass.childCount()):
-                    itemClass.child(index).setHidden(False)
+            self.__filteredFound = None
+            self.__proxyModel.setFilter(None, None)
+
+        self.__updateSpannedRows()
 
     def __searchModified(self, text, options):
-        """option have been modified -- refresh search"""
-        self.__searchActivated(text, options)
+        """Search value has been modified -- refresh search after a short delay"""
+        self.__delayedSearchTimer.start(BPDockWidgetQuickKritaApi.SEARCH_DELAY)
 
     def __searchOptionModified(self, text, options):
         """option have been modified -- refresh search"""
         self.__searchActivated(text, options)
 
-    def __currentSelectionChanged(self):
+    def __currentSelectionChanged(self, selected=None, deselected=None):
         """Selected item has changed"""
         self.__updateNfo()
 
@@ -584,3 +580,266 @@ class BPDockWidgetQuickKritaApi(WDockWidget):
             self.__siSearch.setSearchText(value)
         elif optionId & BPDockWidgetQuickKritaApi.OPTION_SPLITTER == BPDockWidgetQuickKritaApi.OPTION_SPLITTER:
             self.__splitter.setSizes(value)
+
+
+class BPKritaApiModelNode:
+    """A node of Krita API model: a class or a class method
+
+    Class nodes children (methods) are created only when needed
+    """
+
+    def __init__(self, row, classId, methodId=None, parent=None):
+        self.__row = row
+        self.__classId = classId
+        self.__methodId = methodId
+        self.__parent = parent
+        # None until children are fetched
+        self.__childs = None
+
+    def row(self):
+        """Return position in parent's children list"""
+        return self.__row
+
+    def parent(self):
+        """Return parent node (None for a class node)"""
+        return self.__parent
+
+    def classId(self):
+        """Return class id"""
+        return self.__classId
+
+    def methodId(self):
+        """Return method id (None for a class node)"""
+        return self.__methodId
+
+    def isFetched(self):
+        """Return True if children have been created"""
+        return self.__childs is not None
+
+    def setChilds(self, childs):
+        """Set children"""
+        self.__childs = childs
+
+    def child(self, row):
+        """Return child at given position"""
+        if self.__childs is None or row < 0 or row >= len(self.__childs):
+            return None
+        return self.__childs[row]
+
+    def childCount(self):
+        """Return number of created children"""
+        if self.__childs is None:
+            return 0
+        return len(self.__childs)
+
+
+class BPKritaApiModel(QAbstractItemModel):
+    """Model to render Krita API referential as a tree classes/methods
+
+    Only classes are created when referential is set; methods rows are created
+    when a class is expanded (or when fetchMore() is explicitly called)
+    """
+
+    COLNUM_NAME = 0
+    COLNUM_FLAGS = 1
+
+    COLNUM_LAST = 1
+
+    ROLE_CLASS_NAME = Qt.UserRole + 1
+    ROLE_METHOD_NAME = Qt.UserRole + 2
+    ROLE_CLASS_ID = Qt.UserRole + 3
+    ROLE_METHOD_ID = Qt.UserRole + 4
+
+    def __init__(self, parent=None):
+        super(BPKritaApiModel, self).__init__(parent)
+        self.__pyKritaApiRef = None
+        self.__classes = []
+
+    def __repr__(self):
+        return '<BPKritaApiModel()>'
+
+    def __node(self, index):
+        """Return node for given index, None for root"""
+        if index is None or not index.isValid():
+            return None
+        return index.internalPointer()
+
+    def columnCount(self, parent=QModelIndex()):
+        """Return total number of column for index"""
+        return BPKritaApiModel.COLNUM_LAST+1
+
+    def rowCount(self, parent=QModelIndex()):
+        """Return total number of rows for index"""
+        if parent.column() > 0:
+            return 0
+
+        node = self.__node(parent)
+        if node is None:
+            return len(self.__classes)
+        return node.childCount()
+
+    def hasChildren(self, parent=QModelIndex()):
+        """Return True if given index has children, even if not yet fetched"""
+        node = self.__node(parent)
+        if node is None:
+            return len(self.__classes) > 0
+        elif node.methodId() is None:
+            return self.__pyKritaApiRef.methodCount(node.classId()) > 0
+        return False
+
+    def canFetchMore(self, parent):
+        """Return True if given index is a class for which methods are not yet created"""
+        node = self.__node(parent)
+        return node is not None and node.methodId() is None and not node.isFetched()
+
+    def fetchMore(self, parent):
+        """Create methods rows for given class index"""
+        if not self.canFetchMore(parent):
+            return
+
+        node = self.__node(parent)
+        nbMethods = self.__pyKritaApiRef.methodCount(node.classId())
+        if nbMethods == 0:
+            node.setChilds([])
+            return
+
+        self.beginInsertRows(parent, 0, nbMethods - 1)
+        node.setChilds([BPKritaApiModelNode(row, node.classId(), self.__pyKritaApiRef.methodId(node.classId(), row), node) for row in range(nbMethods)])
+        self.endInsertRows()
+
+    def fetchAll(self):
+        """Create methods rows for all classes"""
+        for row in range(len(self.__classes)):
+            self.fetchMore(self.index(row, 0))
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Return data for index+role"""
+        node = self.__node(index)
+        if node is None:
+            return None
+
+        if role == Qt.DisplayRole:
+            if node.methodId() is None:
+                if index.column() == BPKritaApiModel.COLNUM_NAME:
+                    return self.__pyKritaApiRef.className(node.classId())
+            else:
+                flags = self.__pyKritaApiRef.methodFlags(node.methodId())
+                if index.column() == BPKritaApiModel.COLNUM_NAME:
+                    parameters = ''
+                    if flags & BPKritaApiRef.FLAG_PARAMETERS:
+                        parameters = '...'
+                    return f"{self.__pyKritaApiRef.methodName(node.methodId())}({parameters})"
+                elif index.column() == BPKritaApiModel.COLNUM_FLAGS:
+                    nfo = []
+                    if flags & BPKritaApiRef.FLAG_STATIC:
+                        nfo.append(i18n('Static'))
+                    if flags & BPKritaApiRef.FLAG_VIRTUAL:
+                        nfo.append(i18n('Virtual'))
+                    if flags & BPKritaApiRef.FLAG_SIGNAL:
+                        nfo.append(i18n('Signal'))
+                    return ', '.join(nfo)
+        elif role == Qt.TextAlignmentRole:
+            if index.column() == BPKritaApiModel.COLNUM_FLAGS:
+                return Qt.AlignRight
+        elif role == BPKritaApiModel.ROLE_CLASS_NAME:
+            return self.__pyKritaApiRef.className(node.classId())
+        elif role == BPKritaApiModel.ROLE_METHOD_NAME:
+            if node.methodId() is not None:
+                return self.__pyKritaApiRef.methodName(node.methodId())
+        elif role == BPKritaApiModel.ROLE_CLASS_ID:
+            return node.classId()
+        elif role == BPKritaApiModel.ROLE_METHOD_ID:
+            return node.methodId()
+
+        return None
+
+    def index(self, row, column, parent=QModelIndex()):
+        """Provide indexes for views and delegates to use when accessing data"""
+        if not isinstance(parent, QModelIndex) or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+
+        node = self.__node(parent)
+        if node is None:
+            child = self.__classes[row]
+        else:
+            child = node.child(row)
+
+        if child:
+            return self.createIndex(row, column, child)
+        else:
+            return QModelIndex()
+
+    def parent(self, index):
+        """return parent (QModelIndex) for given index"""
+        node = self.__node(index)
+        if node is None or node.parent() is None:
+            return QModelIndex()
+
+        return self.createIndex(node.parent().row(), 0, node.parent())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        """Return label for given data section"""
+        return None
+
+    def setReferential(self, pyKritaApiRef):
+        """Set referential (a BPKritaApiRef) to render
+
+        Only classes nodes are created
+        """
+        self.beginResetModel()
+        self.__pyKritaApiRef = pyKritaApiRef
+        self.__classes = [BPKritaApiModelNode(classId, classId) for classId in range(self.__pyKritaApiRef.classCount())]
+        self.endResetModel()
+
+
+class BPKritaApiFilterModel(QSortFilterProxyModel):
+    """Filter Krita API model according to search result
+
+    Filter is defined from BPKritaApiRef.search() result, then rows acceptance
+    is only a lookup
+    """
+
+    def __init__(self, parent=None):
+        super(BPKritaApiFilterModel, self).__init__(parent)
+        self.__classes = None
+        self.__methods = None
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        """Return True if row is accepted by filter
+
+        - Class rows are accepted if class name is found or if at least one
+          method name is found
+        - Method rows are accepted if class name is found or if method name
+          is found
+        """
+        if self.__classes is None:
+            return True
+
+        index = self.sourceModel().index(sourceRow, 0, sourceParent)
+        classId = index.data(BPKritaApiModel.ROLE_CLASS_ID)
+        if classId in self.__classes:
+            return True
+
+        methodId = index.data(BPKritaApiModel.ROLE_METHOD_ID)
+        if methodId is None:
+            return classId in self.__methods
+        return methodId in self.__methods.get(classId, ())
+
+    def setFilter(self, classes, methods):
+        """Set filter
+
+        Given `classes` is a set of class id
+        Given `methods` is a dictionary (key=class id, value=set of method id)
+
+        If None, filter is removed
+        """
+        if classes is None or methods is None:
+            if self.__classes is None:
+                # already no filter, nothing to do
+                return
+            self.__classes = None
+            self.__methods = None
+        else:
+            self.__classes = classes
+            self.__methods = methods
+        self.invalidateFilter()
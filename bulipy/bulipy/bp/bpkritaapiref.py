@@ -0,0 +1,308 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# The bpkritaapiref module provides a compact binary index of Krita API
+# referential
+#
+# Binary index is built from krita.json referential by build_docs.py script
+# and loaded by Quick Krita API docker
+#
+# Module only use python standard library, to be usable from build_docs.py
+# script outside Krita
+#
+# Main class from this module
+#
+# - BPKritaApiRef:
+#       Read/Write Krita API binary index
+#
+# -----------------------------------------------------------------------------
+
+import re
+import json
+import struct
+
+
+class BPKritaApiRef:
+    """Krita API referential, loaded from a compact binary index
+
+    A binary index file is made of (network byte order):
+        . a header
+            4 bytes     magic 'BPKA'
+            UInt2       format version (0x0001)
+            UInt4       number of classes
+            UInt4       number of methods
+            UInt4       string table offset (from start of file)
+            UInt4       string table size
+            UInt4       tags offset (in string table)
+            UInt4       tags size
+
+        . a classes table, one entry per class, sorted by class name
+            UInt4       class name offset (in string table)
+            UInt4       class name size
+            UInt4       class information offset (in string table)
+            UInt4       class information size
+            UInt4       index of first class method in methods table
+            UInt4       number of methods
+
+        . a methods table, one entry per method, sorted by class then method name
+            UInt4       method name offset (in string table)
+            UInt4       method name size
+            UInt4       method information offset (in string table)
+            UInt4       method information size
+            UByte       method flags
+
+        . a string table
+            All strings, utf-8 encoded
+            Tags, class information (without methods) and method information
+            are stored as json strings
+
+    Only header and classes table are decoded when file is loaded; methods
+    and information are decoded on demand
+    """
+    MAGIC = b'BPKA'
+    VERSION = 0x0001
+
+    FLAG_STATIC = 0x01
+    FLAG_VIRTUAL = 0x02
+    FLAG_SIGNAL = 0x04
+    FLAG_PARAMETERS = 0x08
+
+    __STRUCT_HEADER = struct.Struct('!4sHIIIIII')
+    __STRUCT_CLASS = struct.Struct('!IIIIII')
+    __STRUCT_METHOD = struct.Struct('!IIIIB')
+
+    @staticmethod
+    def build(referential):
+        """Build binary index from given referential (krita.json content as a dict)
+
+        Return binary index as bytes
+        """
+        strings = bytearray()
+        classesTable = bytearray()
+        methodsTable = bytearray()
+
+        def addString(value):
+            # add string to string table, return (offset, size)
+            offset = len(strings)
+            strings.extend(value.encode('utf-8'))
+            return (offset, len(strings) - offset)
+
+        def addJson(value):
+            return addString(json.dumps(value, sort_keys=True, separators=(',', ':')))
+
+        nbMethods = 0
+        for className in sorted(referential['classes'].keys()):
+            classNfo = referential['classes'][className]
+            methods = sorted(classNfo['methods'], key=lambda m: m['name'])
+
+            classesTable.extend(BPKritaApiRef.__STRUCT_CLASS.pack(*addString(className),
+                                                                  *addJson({key: value for key, value in classNfo.items() if key != 'methods'}),
+                                                                  nbMethods,
+                                                                  len(methods)))
+
+            for method in methods:
+                flags = 0
+                if method['isStatic']:
+                    flags |= BPKritaApiRef.FLAG_STATIC
+                if method['isVirtual']:
+                    flags |= BPKritaApiRef.FLAG_VIRTUAL
+                if method['isSignal']:
+                    flags |= BPKritaApiRef.FLAG_SIGNAL
+                if len(method['parameters']):
+                    flags |= BPKritaApiRef.FLAG_PARAMETERS
+
+                methodsTable.extend(BPKritaApiRef.__STRUCT_METHOD.pack(*addString(method['name']),
+                                                                       *addJson(method),
+                                                                       flags))
+            nbMethods += len(methods)
+
+        tags = addJson(referential['tags'])
+
+        stringsOffset = BPKritaApiRef.__STRUCT_HEADER.size + len(classesTable) + len(methodsTable)
+        header = BPKritaApiRef.__STRUCT_HEADER.pack(BPKritaApiRef.MAGIC,
+                                                    BPKritaApiRef.VERSION,
+                                                    len(referential['classes']),
+                                                    nbMethods,
+                                                    stringsOffset,
+                                                    len(strings),
+                                                    *tags)
+
+        return b''.join([header, classesTable, methodsTable, strings])
+
+    @staticmethod
+    def save(referential, fileName):
+        """Build binary index from given referential and save it to `fileName`"""
+        with open(fileName, 'wb') as fHandle:
+            fHandle.write(BPKritaApiRef.build(referential))
+
+    def __init__(self, fileName=None):
+        self.__data = None
+        self.__methodsOffset = 0
+        self.__stringsOffset = 0
+        self.__nbMethods = 0
+        self.__tagsRef = (0, 0)
+        self.__tags = None
+
+        # list of tuples (name, infoOffset, infoSize, firstMethod, nbMethods)
+        self.__classes = []
+        # class name -> class id
+        self.__classesId = {}
+        # search index, built on first search
+        # name (class or method) -> list of tuple (class id, method id); method id is None for a class
+        self.__searchIndex = None
+        # last search, as tuple ((regEx, flags), result)
+        self.__lastSearch = None
+
+        if fileName is not None:
+            self.load(fileName)
+
+    def __string(self, offset, size):
+        """Return string from string table"""
+        start = self.__stringsOffset + offset
+        return str(self.__data[start:start + size], 'utf-8')
+
+    def __method(self, methodId):
+        """Return method table entry"""
+        return BPKritaApiRef.__STRUCT_METHOD.unpack_from(self.__data, self.__methodsOffset + methodId * BPKritaApiRef.__STRUCT_METHOD.size)
+
+    def load(self, fileName):
+        """Load binary index from given file
+
+        Raise an exception if file can't be read or is not a valid index
+        """
+        with open(fileName, 'rb') as fHandle:
+            data = memoryview(fHandle.read())
+
+        magic, version, nbClasses, nbMethods, stringsOffset, stringsSize, tagsOffset, tagsSize = BPKritaApiRef.__STRUCT_HEADER.unpack_from(data, 0)
+        if magic != BPKritaApiRef.MAGIC or version != BPKritaApiRef.VERSION:
+            raise ValueError(f"Given file is not a valid Krita API index: {fileName}")
+
+        self.__data = data
+        self.__stringsOffset = stringsOffset
+        self.__methodsOffset = BPKritaApiRef.__STRUCT_HEADER.size + nbClasses * BPKritaApiRef.__STRUCT_CLASS.size
+        self.__nbMethods = nbMethods
+        self.__tagsRef = (tagsOffset, tagsSize)
+        self.__tags = None
+
+        self.__classes = []
+        self.__classesId = {}
+        self.__searchIndex = None
+        self.__lastSearch = None
+        for classId, (nameOffset, nameSize, nfoOffset, nfoSize, firstMethod, nbClassMethods) in enumerate(BPKritaApiRef.__STRUCT_CLASS.iter_unpack(data[BPKritaApiRef.__STRUCT_HEADER.size:self.__methodsOffset])):
+            className = self.__string(nameOffset, nameSize)
+            self.__classes.append((className, nfoOffset, nfoSize, firstMethod, nbClassMethods))
+            self.__classesId[className] = classId
+
+    def tags(self):
+        """Return tags, as a dictionary
+
+        key = normalized tag version
+        value = tag information
+        """
+        if self.__tags is None:
+            if self.__data is None:
+                return {}
+            self.__tags = json.loads(self.__string(*self.__tagsRef))
+        return self.__tags
+
+    def lastTagRef(self):
+        """Return last (most recent) tag reference"""
+        tags = self.tags()
+        if len(tags):
+            return max(tags.keys())
+        return None
+
+    def classCount(self):
+        """Return number of classes"""
+        return len(self.__classes)
+
+    def classId(self, className):
+        """Return class id from given class name, None if not found"""
+        return self.__classesId.get(className)
+
+    def className(self, classId):
+        """Return class name for given class id"""
+        return self.__classes[classId][0]
+
+    def classNfo(self, classId):
+        """Return class information (without methods) for given class id, as a dictionary"""
+        return json.loads(self.__string(self.__classes[classId][1], self.__classes[classId][2]))
+
+    def methodCount(self, classId=None):
+        """Return number of methods for given class id
+
+        If no class id is provided, return total number of methods
+        """
+        if classId is None:
+            return self.__nbMethods
+        return self.__classes[classId][4]
+
+    def methodId(self, classId, row):
+        """Return method id for method at position `row` for given class id"""
+        return self.__classes[classId][3] + row
+
+    def methodName(self, methodId):
+        """Return method name for given method id"""
+        nameOffset, nameSize, nfoOffset, nfoSize, flags = self.__method(methodId)
+        return self.__string(nameOffset, nameSize)
+
+    def methodFlags(self, methodId):
+        """Return method flags for given method id"""
+        return self.__method(methodId)[4]
+
+    def methodNfo(self, methodId):
+        """Return method information for given method id, as a dictionary"""
+        nameOffset, nameSize, nfoOffset, nfoSize, flags = self.__method(methodId)
+        return json.loads(self.__string(nfoOffset, nfoSize))
+
+    def __buildSearchIndex(self):
+        """Build search index
+
+        Many methods names are shared between classes (name(), setName(), ...)
+        then index is built on distinct names: a search only need to check each
+        name once
+        """
+        self.__searchIndex = {}
+        for classId, (className, nfoOffset, nfoSize, firstMethod, nbClassMethods) in enumerate(self.__classes):
+            self.__searchIndex.setdefault(className, []).append((classId, None))
+
+            for methodId in range(firstMethod, firstMethod + nbClassMethods):
+                self.__searchIndex.setdefault(self.methodName(methodId), []).append((classId, methodId))
+
+    def search(self, regEx, flags=0):
+        """Search classes and methods for which name match given regular expression
+
+        Return a tuple (classes, methods)
+        - classes: a set of class id for which class name is matching
+        - methods: a dictionary
+                    key = class id
+                    value = set of method id for which method name is matching
+        """
+        if self.__searchIndex is None:
+            self.__buildSearchIndex()
+
+        if self.__lastSearch is not None and self.__lastSearch[0] == (regEx, flags):
+            return self.__lastSearch[1]
+
+        classes = set()
+        methods = {}
+        compiledRegEx = re.compile(regEx, flags)
+        for name, ids in self.__searchIndex.items():
+            if compiledRegEx.search(name):
+                for classId, methodId in ids:
+                    if methodId is None:
+                        classes.add(classId)
+                    else:
+                        methods.setdefault(classId, set()).add(methodId)
+
+        self.__lastSearch = ((regEx, flags), (classes, methods))
+        return self.__lastSearch[1]
@@ -302,6 +302,13 @@ class BPLanguageDefPython(LanguageDef):
         """Return language file extension as list"""
         return ['.py']
 
+    def symbolTokenTypes(self):
+        """Return token types that declare a symbol"""
+        return {
+                BPLanguageDefPython.ITokenType.DECL_CLASS: 'class',
+                BPLanguageDefPython.ITokenType.DECL_FUNC: 'def'
+            }
+
 
 class BPLanguageDefText(LanguageDef):
     # Empty language definition
@@ -67,7 +67,8 @@ class BPMainWindow(QMainWindow):
     STATUSBAR_POS = 4
     STATUSBAR_SELECTION = 5
     STATUSBAR_INSOVR_MODE = 6
-    STATUSBAR_LASTSECTION = 6
+    STATUSBAR_SYNTAX = 7
+    STATUSBAR_LASTSECTION = 7
 
     dialogShown = pyqtSignal()
 
@@ -125,6 +126,7 @@ class BPMainWindow(QMainWindow):
                 QLabel("000:00000/00000"),                  # Current column:row/total number of rows
                 QLabel("000:00000 - 000:00000 [000000]"),   # Selection start (col:row) - Selection end (col:row) [selection length]
                 QLabel("WWW"),                              # INSert/OVeRwrite
+                WLabelElide(Qt.ElideRight),                 # Syntax problems on current line
             ]
 
         for statusBarItem in self.__statusBarWidgets:
@@ -139,6 +141,7 @@ class BPMainWindow(QMainWindow):
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_POS].setMinimumWidth(fontMetrics.boundingRect("000:00000/00000").width())
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_SELECTION].setMinimumWidth(fontMetrics.boundingRect("000:00000 - 000:00000 [000000]").width())
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_INSOVR_MODE].setMinimumWidth(fontMetrics.boundingRect("INS_").width())
+        self.__statusBarWidgets[BPMainWindow.STATUSBAR_SYNTAX].setMinimumWidth(1)  # can't be 0 (not taken in account)
 
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_POS].setAlignment(Qt.AlignRight)
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_SELECTION].setAlignment(Qt.AlignRight)
@@ -150,6 +153,7 @@ class BPMainWindow(QMainWindow):
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_POS].setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Preferred)
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_SELECTION].setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Preferred)
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_INSOVR_MODE].setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Preferred)
+        self.__statusBarWidgets[BPMainWindow.STATUSBAR_SYNTAX].setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
 
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_RO].setCursor(Qt.PointingHandCursor)
         self.__statusBarWidgets[BPMainWindow.STATUSBAR_POS].setCursor(Qt.PointingHandCursor)
@@ -162,6 +166,7 @@ class BPMainWindow(QMainWindow):
 
         statusBar.addWidget(self.__statusBarWidgets[BPMainWindow.STATUSBAR_MODIFICATIONSTATUS])
         statusBar.addWidget(self.__statusBarWidgets[BPMainWindow.STATUSBAR_FILENAME])
+        statusBar.addWidget(self.__statusBarWidgets[BPMainWindow.STATUSBAR_SYNTAX])
         statusBar.addPermanentWidget(WVLine())
         statusBar.addPermanentWidget(self.__statusBarWidgets[BPMainWindow.STATUSBAR_LANGUAGEDEF])
         statusBar.addPermanentWidget(WVLine())
@@ -408,6 +413,7 @@ class BPMainWindow(QMainWindow):
         self.actionEditOverwriteMode.triggered.connect(lambda: self.__uiController.commandEditOverwriteMode())
         self.actionEditReadOnlyMode.triggered.connect(lambda: self.__uiController.commandEditReadOnlyMode())
         self.actionEditGoToLine.triggered.connect(lambda: self.__uiController.commandEditGoToLine())
+        self.actionEditGoToSymbol.triggered.connect(lambda: self.__uiController.commandEditGoToSymbol())
 
         self.menuEdit.aboutToShow.connect(self.__menuAboutToShow)
 
@@ -437,6 +443,7 @@ class BPMainWindow(QMainWindow):
         self.actionToolsIconsSelector.triggered.connect(self.__uiController.commandToolsDockIconSelectorVisible)
         self.actionToolsDocuments.triggered.connect(self.__uiController.commandToolsDockDocumentsVisible)
         self.actionToolsClipboard.triggered.connect(self.__uiController.commandToolsDockClipboardVisible)
+        self.actionToolsOutline.triggered.connect(self.__uiController.commandToolsDockOutlineVisible)
         self.actionToolsQuickPyKritaAPI.triggered.connect(self.__uiController.commandToolsDockQuickPyKritaApi)
 
         self.actionToolsCopyFullPathFileName.triggered.connect(self.__uiController.commandToolsCopyFullPathFileName)
@@ -515,6 +522,9 @@ class BPMainWindow(QMainWindow):
                     self.__statusBarWidgets[index].setToolTip(i18n("Read-Only mode"))
                 else:
                     self.__statusBarWidgets[index].setToolTip(i18n("Read-Write mode"))
+            elif index == BPMainWindow.STATUSBAR_SYNTAX:
+                # text can be elided, full text is available from tooltip
+                self.__statusBarWidgets[index].setToolTip(text)
 
             if len(text) == 0:
                 self.__statusBarWidgets[index].setToolTipDuration(1)
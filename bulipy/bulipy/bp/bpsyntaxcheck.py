@@ -0,0 +1,109 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# The bpsyntaxcheck module provides python syntax check function executed by
+# BPSyntaxChecker in a worker process
+#
+# Module only use python standard library (and pyflakes when available): it's
+# imported in worker processes started with a python interpreter from PATH,
+# for which PyQt5 and Krita are not available
+#
+# Main class/function from this module
+#
+# - checkSyntax:
+#       Check syntax of a python code
+#
+# - BPSyntaxCheckerProblem:
+#       A problem found by syntax check
+#
+# -----------------------------------------------------------------------------
+
+import ast
+import time
+
+try:
+    # optional, used to report additional problems (unused imports, undefined names, ...) when available
+    import pyflakes.checker as pyflakesChecker
+except Exception:
+    pyflakesChecker = None
+
+
+def checkSyntax(itemIndex, item):
+    """Check syntax of given code
+
+    Executed in a worker process: `item` is a tuple (document revision, code)
+    and only python standard library (and pyflakes) is used
+
+    Function never raise an exception: when code can't be checked (too deeply
+    nested expressions for example), a warning problem is returned
+
+    Return a tuple (document revision, list of BPSyntaxCheckerProblem, check duration in seconds)
+    """
+    revision, code = item
+    startTime = time.perf_counter()
+    problems = []
+
+    try:
+        # parse once, same tree is used for compilation and pyflakes
+        tree = ast.parse(code, '<document>')
+        compile(tree, '<document>', 'exec', dont_inherit=True)
+    except SyntaxError as e:
+        problems.append(BPSyntaxCheckerProblem(e.lineno or 1, e.offset or 1, e.msg, BPSyntaxCheckerProblem.SEVERITY_ERROR))
+    except ValueError as e:
+        # source code contains null bytes
+        problems.append(BPSyntaxCheckerProblem(1, 1, str(e), BPSyntaxCheckerProblem.SEVERITY_ERROR))
+    except Exception as e:
+        # RecursionError, MemoryError, ...: code is too complex (deeply nested
+        # expressions for example) to be checked
+        problems.append(BPSyntaxCheckerProblem(1, 1, f"Syntax check skipped ({e.__class__.__name__}: {e})", BPSyntaxCheckerProblem.SEVERITY_WARNING))
+    else:
+        if pyflakesChecker is not None:
+            try:
+                checker = pyflakesChecker.Checker(tree, '<document>')
+            except Exception as e:
+                problems.append(BPSyntaxCheckerProblem(1, 1, f"Additional checks skipped ({e.__class__.__name__}: {e})", BPSyntaxCheckerProblem.SEVERITY_WARNING))
+            else:
+                for message in sorted(checker.messages, key=lambda message: (message.lineno, message.col)):
+                    problems.append(BPSyntaxCheckerProblem(message.lineno, message.col + 1, message.message % message.message_args, BPSyntaxCheckerProblem.SEVERITY_WARNING))
+
+    return (revision, problems, time.perf_counter() - startTime)
+
+
+class BPSyntaxCheckerProblem:
+    """A problem found by syntax checker"""
+    SEVERITY_WARNING = 0
+    SEVERITY_ERROR = 1
+
+    def __init__(self, lineNumber, column, message, severity):
+        self.__lineNumber = lineNumber
+        self.__column = column
+        self.__message = message
+        self.__severity = severity
+
+    def __repr__(self):
+        return f"<BPSyntaxCheckerProblem({self.__lineNumber}:{self.__column}, {self.__severity}, {self.__message})>"
+
+    def lineNumber(self):
+        """Return line number (start from 1)"""
+        return self.__lineNumber
+
+    def column(self):
+        """Return column (start from 1)"""
+        return self.__column
+
+    def message(self):
+        """Return problem description"""
+        return self.__message
+
+    def severity(self):
+        """Return problem severity"""
+        return self.__severity
@@ -0,0 +1,369 @@
+# -----------------------------------------------------------------------------
+# BuliPy
+# Copyright (C) 2023 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin to write and execute scripts
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# The bpsyntaxchecker module provides a background syntax checker for python
+# documents
+#
+# Main class from this module
+#
+# - BPSyntaxChecker:
+#       Check code editor content in a worker process once user stop typing,
+#       and highlight lines with problems
+#
+# - BPSyntaxCheckerPool:
+#       Worker pool shared by all syntax checkers
+#
+# -----------------------------------------------------------------------------
+
+import time
+from collections import OrderedDict
+
+from PyQt5.Qt import *
+from PyQt5.QtCore import (
+        pyqtSignal as Signal
+    )
+from PyQt5.QtGui import (
+        QColor
+    )
+
+from .bpsyntaxcheck import (
+        checkSyntax,
+        BPSyntaxCheckerProblem
+    )
+
+from ..pktk.modules.utils import Debug
+from ..pktk.modules.workers import WorkerPool
+from ..pktk.widgets.wcodeeditor import WCodeEditorHighlightLineRule
+
+from ..pktk.pktk import *
+
+
+class BPCodeEditorHighlightLineRuleSyntaxCheck(WCodeEditorHighlightLineRule):
+    """Highlight lines for which syntax checker has found problems"""
+
+    RULEID_SYNTAXCHECK = 0x0200
+
+    def __init__(self):
+        # block number (start from 0) -> highest severity
+        self.__lines = {}
+
+    def ruleId(self):
+        """Return rule identifier"""
+        return BPCodeEditorHighlightLineRuleSyntaxCheck.RULEID_SYNTAXCHECK
+
+    def setProblems(self, problems):
+        """Set problems to highlight"""
+        self.__lines = {}
+        for problem in problems:
+            self.__lines[problem.lineNumber() - 1] = max(problem.severity(), self.__lines.get(problem.lineNumber() - 1, problem.severity()))
+
+    def highlight(self, block, tokens, lineNumber, isCurrentLine):
+        """Return highlight properties, or None"""
+        severity = self.__lines.get(lineNumber)
+        if severity is None:
+            return None
+        elif severity == BPSyntaxCheckerProblem.SEVERITY_ERROR:
+            return (BPCodeEditorHighlightLineRuleSyntaxCheck.RULEID_SYNTAXCHECK, QColor('#40ff0000'), True)
+        return (BPCodeEditorHighlightLineRuleSyntaxCheck.RULEID_SYNTAXCHECK, QColor('#30ffaa00'), True)
+
+
+class BPSyntaxCheckerPool(QObject):
+    """Worker pool shared by all syntax checkers
+
+    Checks are executed one at a time, in a single worker process: compile()
+    and pyflakes hold the GIL, in a worker thread UI would be blocked while
+    code is checked
+
+    A checker has at most one pending check: when a new check is submitted,
+    pending outdated one is dropped; a running check can't be interrupted (in a
+    worker process or a worker thread, check function is executed until the
+    end) and its result is ignored by checker
+
+    Worker process is started on first check, and released (without waiting
+    for running check) once there's no more active checker
+
+    If check can't be executed in worker process (python interpreter unable to
+    import plugin modules for example), pool fallback to a worker thread; if
+    check still can't be executed, checks are disabled
+    """
+    statusChanged = Signal()
+
+    STATUS_PROCESS = 0
+    STATUS_THREAD = 1
+    STATUS_FAILED = 2
+
+    __instance = None
+
+    @staticmethod
+    def instance():
+        """Return pool shared by all syntax checkers"""
+        if BPSyntaxCheckerPool.__instance is None:
+            BPSyntaxCheckerPool.__instance = BPSyntaxCheckerPool()
+        return BPSyntaxCheckerPool.__instance
+
+    def __init__(self):
+        super(BPSyntaxCheckerPool, self).__init__()
+
+        self.__status = BPSyntaxCheckerPool.STATUS_PROCESS
+        self.__statusMessage = ''
+
+        # active checkers
+        self.__checkers = set()
+
+        # pending checks, as an ordered dict
+        #   key = checker
+        #   value = tuple (item to check, callback for result)
+        self.__pending = OrderedDict()
+
+        # running check, as tuple (checker, item to check, callback for result, future)
+        # checker is None if check has been cancelled
+        self.__running = None
+
+        self.__pool = None
+
+    def __createPool(self):
+        """Create worker pool according to current status"""
+        if self.__status == BPSyntaxCheckerPool.STATUS_PROCESS:
+            self.__pool = WorkerPool(1, WorkerPool.BACKEND_PROCESS)
+        else:
+            self.__pool = WorkerPool(1, WorkerPool.BACKEND_THREAD)
+        self.__pool.signals.processed.connect(self.__checkProcessed)
+        self.__pool.signals.finished.connect(self.__checkFinished)
+
+    def __releasePool(self):
+        """Release worker pool without waiting for running check"""
+        if self.__pool is not None:
+            self.__pool.signals.processed.disconnect(self.__checkProcessed)
+            self.__pool.signals.finished.disconnect(self.__checkFinished)
+            self.__pool.shutdown(False)
+            self.__pool = None
+        self.__running = None
+
+    def __startNext(self):
+        """Start next pending check, if none is running"""
+        if self.__running is not None or len(self.__pending) == 0 or self.__status == BPSyntaxCheckerPool.STATUS_FAILED:
+            return
+
+        if self.__pool is None:
+            self.__createPool()
+
+        checker, (item, callback) = self.__pending.popitem(last=False)
+        self.__running = (checker, item, callback, self.__pool.submit([item], checkSyntax))
+
+    def __checkProcessed(self, processed):
+        """Check is processed; give result to checker if check has not been cancelled"""
+        if self.__running is not None and self.__running[0] is not None:
+            self.__running[2](processed[1])
+
+    def __checkFinished(self):
+        """Check is finished; start next pending check
+
+        If check has failed, fallback to a worker thread or, if already in a
+        worker thread, disable checks
+        """
+        if self.__running is None:
+            return
+
+        checker, item, callback, future = self.__running
+        self.__running = None
+
+        if future is not None and future.exception() is not None:
+            exception = future.exception()
+            Debug.print('[BPSyntaxCheckerPool.checkFinished] check failed ({0}): {1}', self.__status, str(exception))
+
+            self.__releasePool()
+            if self.__status == BPSyntaxCheckerPool.STATUS_PROCESS:
+                # worker process can't execute check; check again in a worker thread
+                self.__status = BPSyntaxCheckerPool.STATUS_THREAD
+                self.__statusMessage = i18n('Syntax check executed in a thread (worker process failed: {0})').format(exception)
+                if checker is not None and checker not in self.__pending:
+                    self.__pending[checker] = (item, callback)
+                    self.__pending.move_to_end(checker, last=False)
+            else:
+                self.__status = BPSyntaxCheckerPool.STATUS_FAILED
+                self.__statusMessage = i18n('Syntax check unavailable: {0}').format(exception)
+                self.__pending.clear()
+            self.statusChanged.emit()
+
+        self.__startNext()
+
+    def status(self):
+        """Return pool status
+
+        - STATUS_PROCESS: check is executed in a worker process
+        - STATUS_THREAD: check can't be executed in a worker process, and is
+                         executed in a worker thread
+        - STATUS_FAILED: check can't be executed, checks are disabled
+        """
+        return self.__status
+
+    def statusMessage(self):
+        """Return a description of pool status, or an empty string if check is
+        executed normally in a worker process
+        """
+        return self.__statusMessage
+
+    def register(self, checker):
+        """Register an active `checker`"""
+        self.__checkers.add(checker)
+
+    def unregister(self, checker):
+        """Unregister a `checker` that is not active anymore
+
+        Pending check is dropped, result of running check is ignored; when
+        there's no more active checker, worker pool is released
+        """
+        self.__checkers.discard(checker)
+        self.__pending.pop(checker, None)
+        if self.__running is not None and self.__running[0] == checker:
+            self.__running = (None, None, None, self.__running[3])
+
+        if len(self.__checkers) == 0:
+            self.__pending.clear()
+            self.__releasePool()
+
+    def submit(self, checker, item, callback):
+        """Submit a check of `item` (tuple (document revision, code)) for given
+        `checker`; pending check for checker, if any, is replaced
+
+        Given `callback` is called with check result (see checkSyntax())
+        """
+        if self.__status == BPSyntaxCheckerPool.STATUS_FAILED or checker not in self.__checkers:
+            return
+        # pending check is outdated
+        self.__pending.pop(checker, None)
+        self.__pending[checker] = (item, callback)
+        self.__startNext()
+
+
+class BPSyntaxChecker(QObject):
+    """Check syntax of code editor content in background
+
+    Check is started once user stop typing, on a snapshot of document; as
+    Krita API is not used, code is checked in a worker process shared by all
+    checkers (see BPSyntaxCheckerPool)
+
+    If document is modified while a check is running, result is ignored
+    """
+    checked = Signal(list)
+
+    # delay (in milliseconds) after last modification before starting check
+    __CHECK_DELAY = 750
+
+    def __init__(self, codeEditor):
+        super(BPSyntaxChecker, self).__init__(codeEditor)
+
+        self.__codeEditor = codeEditor
+        self.__active = False
+        self.__problems = []
+
+        self.__highlightRule = BPCodeEditorHighlightLineRuleSyntaxCheck()
+
+        self.__pool = BPSyntaxCheckerPool.instance()
+        self.__pool.statusChanged.connect(self.__statusChanged)
+
+        self.__checkTimer = QTimer()
+        self.__checkTimer.setSingleShot(True)
+        self.__checkTimer.setInterval(BPSyntaxChecker.__CHECK_DELAY)
+        self.__checkTimer.timeout.connect(self.__startCheck)
+
+        self.__codeEditor.textChanged.connect(self.__textChanged)
+
+    def __textChanged(self):
+        """Document has been modified, (re)start delay before check"""
+        if self.__active:
+            self.__checkTimer.start()
+
+    def __startCheck(self):
+        """Start check of current document content"""
+        if not self.__active or self.__pool.status() == BPSyntaxCheckerPool.STATUS_FAILED:
+            return
+
+        startTime = time.perf_counter()
+        item = (self.__codeEditor.document().revision(), self.__codeEditor.toPlainText())
+        Debug.print('[BPSyntaxChecker.startCheck] revision {0}, snapshot: {1:.6f}s', item[0], time.perf_counter() - startTime)
+
+        self.__pool.submit(self, item, self.__checkProcessed)
+
+    def __checkProcessed(self, result):
+        """Check is processed; apply result if document has not been modified"""
+        revision, problems, duration = result
+        Debug.print('[BPSyntaxChecker.checkProcessed] revision {0}, {1} problem(s), check: {2:.6f}s', revision, len(problems), duration)
+
+        if not self.__active or revision != self.__codeEditor.document().revision():
+            # outdated result
+            return
+
+        lineNumbers = [problem.lineNumber() for problem in problems]
+        self.__problems = problems
+        self.__highlightRule.setProblems(problems)
+        self.__codeEditor.updateHighlightedLineRule(self.__highlightRule, lineNumbers)
+        self.checked.emit(problems)
+
+    def __statusChanged(self):
+        """Pool status has been modified"""
+        if not self.__active:
+            return
+
+        if self.__pool.status() == BPSyntaxCheckerPool.STATUS_FAILED and len(self.__problems) > 0:
+            self.__problems = []
+            self.__highlightRule.setProblems([])
+            self.__codeEditor.updateHighlightedLineRule(self.__highlightRule)
+        # let status bar be updated
+        self.checked.emit(self.problems())
+
+    def active(self):
+        """Return if checker is active"""
+        return self.__active
+
+    def setActive(self, active):
+        """Set if checker is active
+
+        When inactive, problems are cleared and pending check is dropped
+        (without waiting for running check)
+        """
+        if not isinstance(active, bool):
+            raise EInvalidType("Given `active` must be a <bool>")
+
+        if active == self.__active:
+            return
+
+        self.__active = active
+        if active:
+            self.__pool.register(self)
+            self.__codeEditor.setHighlightedLineRule(self.__highlightRule)
+            self.__startCheck()
+        else:
+            self.__checkTimer.stop()
+            self.__pool.unregister(self)
+            self.__problems = []
+            self.__highlightRule.setProblems([])
+            self.__codeEditor.delHighlightedLineRule(self.__highlightRule)
+            self.checked.emit([])
+
+    def status(self):
+        """Return checker status (see BPSyntaxCheckerPool.status())"""
+        return self.__pool.status()
+
+    def statusMessage(self):
+        """Return a description of checker status, or an empty string if check
+        is executed normally in a worker process
+        """
+        return self.__pool.statusMessage()
+
+    def problems(self):
+        """Return list of problems (BPSyntaxCheckerProblem) found by last check"""
+        return list(self.__problems)
+
+    def problemsAt(self, lineNumber):
+        """Return list of problems (BPSyntaxCheckerProblem) found for given line number (start from 1)"""
+        return [problem for problem in self.__problems if problem.lineNumber() == lineNumber]
@@ -48,6 +48,7 @@ from .bpdwsearchreplace import BPDockWidgetSearchReplace
 from .bpdwquickpykritaapi import BPDockWidgetQuickKritaApi
 from .bpdwdocuments import BPDockWidgetDocuments
 from .bpdwclipboard import BPDockWidgetClipboard
+from .bpdwoutline import BPDockWidgetOutline
 from .bpwopensavedialog import BPWOpenSave
 
 from .bplanguagedef import BPLanguageDefPython
@@ -87,6 +88,7 @@ from ..pktk.widgets.wconsole import WConsoleType
 from ..pktk.widgets.wiodialog import (
         WDialogBooleanInput,
         WDialogIntInput,
+        WDialogComboBoxChoiceInput,
         WDialogRadioButtonChoiceInput
     )
 
@@ -165,6 +167,7 @@ class BPUIController(QObject):
         self.__documents.copyAvailable.connect(self.__invalidateMenu)
         self.__documents.languageDefChanged.connect(self.__documentLanguageDefChanged)
         self.__documents.fontSizeChanged.connect(self.__documentFontSizeChanged)
+        self.__documents.syntaxChecked.connect(self.__updateStatusUiSyntax)
 
         # current active document
         self.__currentDocument = None
@@ -179,6 +182,7 @@ class BPUIController(QObject):
         self.__dwDocuments = None
         self.__dwClipboard = None
         self.__dwQuickPyKritaApi = None
+        self.__dwOutline = None
 
         self.__dwConsoleOutputAction = None
         self.__dwColorPickerAction = None
@@ -187,6 +191,7 @@ class BPUIController(QObject):
         self.__dwDocumentsAction = None
         self.__dwClipboardAction = None
         self.__dwQuickPyKritaApiAction = None
+        self.__dwOutlineAction = None
 
         # -- misc
         # editor/syntax theme
@@ -279,6 +284,14 @@ class BPUIController(QObject):
         self.__dwQuickPyKritaApiAction.toggled.connect(self.commandToolsDockQuickPyKritaApi)
         self.__window.addDockWidget(Qt.RightDockWidgetArea, self.__dwQuickPyKritaApi)
 
+        self.__dwOutline = BPDockWidgetOutline(self.__window, self.__documents, i18n('Outline'))
+        self.__dwOutline.setObjectName('__dwOutline')
+        self.__dwOutline.symbolClicked.connect(lambda lineNumber: self.commandEditGoToLine(lineNumber, None, True))
+        self.__dwOutlineAction = self.__dwOutline.toggleViewAction()
+        self.__dwOutlineAction.setText(i18n("Outline"))
+        self.__dwOutlineAction.toggled.connect(self.commandToolsDockOutlineVisible)
+        self.__window.addDockWidget(Qt.RightDockWidgetArea, self.__dwOutline)
+
         self.__window.setWindowTitle(self.__bpTitle)
         self.__window.show()
         self.__window.activateWindow()
@@ -618,6 +631,17 @@ class BPUIController(QObject):
                 self.__window.setStatusBarText(self.__window.STATUSBAR_SELECTION, f'{position[1].x()}:{position[1].y()} - {position[2].x()}:{position[2].y()} [{position[3]}]')
                 self.__invalidateMenu()
             self.__window.statusBar().setUpdatesEnabled(True)
+            self.__updateStatusUiSyntax(document)
+
+    def __updateStatusUiSyntax(self, document):
+        """Update UI to display syntax problems found on current line of document"""
+        if document == self.__currentDocument:
+            problems = self.__currentDocument.syntaxProblems(self.__currentDocument.codeEditor().cursorPosition()[0].y())
+            if len(problems):
+                self.__window.setStatusBarText(self.__window.STATUSBAR_SYNTAX, " / ".join([f"{problem.column()}: {problem.message()}" for problem in problems]))
+            else:
+                # no problem on current line; display syntax check status if not executed normally
+                self.__window.setStatusBarText(self.__window.STATUSBAR_SYNTAX, self.__currentDocument.syntaxCheckStatusMessage())
 
     def __updateStatusUiFileName(self, document):
         """Update UI to take in account file name of document"""
@@ -1330,6 +1354,42 @@ class BPUIController(QObject):
             if setFocus:
                 self.__currentDocument.setFocus()
 
+    def commandEditGoToSymbol(self, symbolName=None, document=None, setFocus=False):
+        """Move cursor to declaration of given symbol (class, function) in given document
+
+        If no symbol is provided, ask user to choose one from declared symbols;
+        all declarations are proposed (a name can be declared more than once)
+        If a symbol name is provided, cursor is moved to its first declaration
+
+        Return True if symbol has been found, otherwise False
+        """
+        if isinstance(document, WBPDocument):
+            self.__documents.setActiveDocument(document)
+
+        if self.__currentDocument is None:
+            return False
+
+        codeEditor = self.__currentDocument.codeEditor()
+
+        if symbolName is None:
+            symbols = codeEditor.symbols()
+            if len(symbols) == 0:
+                return False
+            choices = [f"{symbol.fullName()} ({i18n('line')} {symbol.lineNumber()})" for symbol in symbols]
+            index = WDialogComboBoxChoiceInput.display(i18n("Go to symbol"), choicesValue=choices, minSize=QSize(450, 0))
+            if index is None:
+                return False
+            self.commandEditGoToLine(symbols[index].lineNumber(), None, setFocus)
+            return True
+
+        if not isinstance(symbolName, str):
+            raise EInvalidType("Given `symbolName` must be <str>")
+
+        if lines := codeEditor.symbolLines(symbolName):
+            self.commandEditGoToLine(lines[0], None, setFocus)
+            return True
+        return False
+
     def commandViewWrapLines(self, active):
         """Set/unset wrap mode for ALL documents"""
         self.__window.actionViewWrapLines.setChecked(active)
@@ -1499,6 +1559,24 @@ class BPUIController(QObject):
         if self.__window:
             self.__window.actionToolsClipboard.setChecked(visible)
 
+    def commandToolsDockOutlineVisible(self, visible=None):
+        """Display/Hide Outline docker"""
+        if visible is None:
+            visible = self.__dwOutlineAction.isChecked()
+        elif not isinstance(visible, bool):
+            raise EInvalidValue('Given `visible` must be a <bool>')
+
+        if self.__dwOutline:
+            if visible:
+                self.__dwOutline.show()
+                self.__dwOutline.setActive()
+            else:
+                self.__dwOutline.hide()
+            self.saveSettings(BPUIController.__DELAYED_SAVESETTINGS_TIMEOUT)
+
+        if self.__window:
+            self.__window.actionToolsOutline.setChecked(visible)
+
     def commandToolsDockQuickPyKritaApi(self, visible=None):
         """Display/Hide Quick PyKrita API docker"""
         if visible is None:
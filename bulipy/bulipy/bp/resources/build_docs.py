@@ -17,6 +17,12 @@
 #           ./build_docs.py -kritaSrc "/home/xxxx/krita"
 #           ```
 #
+# . analysis cache
+#   Header files are read from git objects (no checkout) and analysis results
+#   are stored in a cache file (build_docs.cache.json by default, see --cache
+#   option), keyed by git blob hash: an header file is analysed only once
+#   whatever the number of tags it's used in
+#
 
 import sys
 import os
@@ -26,6 +32,7 @@ import subprocess
 import json
 import hashlib
 import textwrap
+import concurrent.futures
 
 from PyQt5.QtGui import (QTextDocument, QTextCursor)
 
@@ -40,6 +47,8 @@ except Exception:
 from pktk.modules.languagedef import LanguageDef
 from pktk.modules.tokenizer import (Tokenizer, TokenizerRule, Token, Tokens, TokenType)
 from pktk.modules.uitheme import UITheme
+from pktk.modules.timeutils import Stopwatch
+from bp.bpkritaapiref import BPKritaApiRef
 
 
 class LanguageDefCpp(LanguageDef):
@@ -708,14 +717,29 @@ class KritaApiClass:
 class KritaApiAnalysis:
     """Do an analysis of current source code"""
 
-    def __init__(self, kritaSrcLibKisPath):
+    @staticmethod
+    def isHeaderFile(fileName):
+        """Return True if given file name is a header file to analyse"""
+        return re.search(r'\.h$', fileName) is not None and fileName not in ('libkis.h', 'LibKisUtils.h')
+
+    def __init__(self, kritaSrcLibKisPath=None):
+        """Initialise analysis
+
+        If `kritaSrcLibKisPath` is provided, all header files from directory are
+        analysed, otherwise analysis is done by calling processContent()
+        """
         self.__libkisPath = kritaSrcLibKisPath
-        self.__headerFiles = sorted([fileName for fileName in os.listdir(self.__libkisPath) if re.search(r'\.h$', fileName) and fileName not in ('libkis.h', 'LibKisUtils.h')])
 
         self.__languageDef = LanguageDefCpp()
         self.__classes = {}
         self.__tokens = None
 
+        if self.__libkisPath is None:
+            self.__headerFiles = []
+            return
+
+        self.__headerFiles = sorted([fileName for fileName in os.listdir(self.__libkisPath) if KritaApiAnalysis.isHeaderFile(fileName)])
+
         # print(self.__headerFiles)
         totalKo = 0
         for fileName in self.__headerFiles:
@@ -1060,6 +1084,14 @@ class KritaApiAnalysis:
         with open(fullFileName, 'r') as fHandle:
             content = ''.join(fHandle.readlines())
 
+        return self.processContent(fileName, content)
+
+    def processContent(self, fileName, content):
+        """Analyse given header file `content`
+
+        Found classes are added to classes()
+        Return number of invalid classes definitions
+        """
         # print(content)
 
         self.__tokens = self.__languageDef.tokenizer().tokenize(content)
@@ -1081,6 +1113,16 @@ class KritaApiAnalysis:
         return self.__classes
 
 
+def analyseHeaderContent(fileName, content):
+    """Analyse a header file content
+
+    Executed in a worker process; return a tuple (number of invalid classes, list of classes as dict)
+    """
+    analysis = KritaApiAnalysis()
+    nbKo = analysis.processContent(fileName, content)
+    return (nbKo, [classNfo.toDict() for classNfo in analysis.classes().values()])
+
+
 class KritaBuildDoc:
 
     __cssContent = """
@@ -1322,7 +1364,17 @@ class KritaBuildDoc:
         }
     """
 
-    def __init__(self, kritaSrcLibKisPath, pluginPathDocs, updateRepo, showTypes, buildPython, buildHtml):
+    # analysis cache version
+    # to increase each time analysis result is modified (KritaApiAnalysis, LanguageDefCpp, toDict(), ...)
+    ANALYSIS_CACHE_VERSION = 1
+
+    def __init__(self, kritaSrcLibKisPath, pluginPathDocs, updateRepo, showTypes, buildPython, buildHtml, cacheFile=None, jobs=None):
+        self.__cacheFile = cacheFile
+        self.__jobs = jobs
+        # analysed header files
+        #   key = git blob hash
+        #   value = {'nbKo': number of invalid classes, 'classes': list of classes (as dict)}
+        self.__analysisCache = {}
         self.__updateRepo = updateRepo
         self.__showTypes = showTypes
         self.__buildPython = buildPython
@@ -1332,18 +1384,33 @@ class KritaBuildDoc:
                 'tags': {},
                 'classes': {}
             }
+        # methods from referential
+        #   key = tuple (class name, method name)
+        #   value = method (dict from referential)
+        self.__methodsIndex = {}
         self.__jsonFile = os.path.join(pluginPathDocs, 'krita.json')
+        self.__binFile = os.path.join(pluginPathDocs, 'krita.bin')
 
         if not self.__gitTags():
             return
 
         self.__updateGitRepository()
         self.__loadJson()
+        self.__loadAnalysisCache()
         self.__analyseSources()
         self.__saveJson()
+        self.__saveBin()
+
+        Stopwatch.start('stubs')
         self.__buildPythonDoc()
+        Stopwatch.stop('stubs')
+
+        Stopwatch.start('html')
         self.__buildHtmlDoc()
+        Stopwatch.stop('html')
+
         self.__showFoundTypes()
+        self.__showTimes()
 
     def __getTag(self, tagRef):
         """Return tag from given tag ref"""
@@ -1376,6 +1443,42 @@ class KritaBuildDoc:
             print("ERROR: Can't save referential!")
             print(e)
 
+    def __loadAnalysisCache(self):
+        """Load headers analysis cache file"""
+        if self.__cacheFile and os.path.exists(self.__cacheFile):
+            try:
+                print("LOAD ANALYSIS CACHE")
+                with open(self.__cacheFile, 'r') as fHandle:
+                    cache = json.loads(fHandle.read())
+                if cache['version'] == KritaBuildDoc.ANALYSIS_CACHE_VERSION:
+                    self.__analysisCache = cache['blobs']
+                else:
+                    print("Analysis cache is obsolete, ignored")
+            except Exception as e:
+                print("Can't load analysis cache, ignored")
+                print(e)
+
+    def __saveAnalysisCache(self):
+        """Save headers analysis cache file"""
+        if self.__cacheFile:
+            try:
+                print("SAVE ANALYSIS CACHE")
+                with open(self.__cacheFile, 'w') as fHandle:
+                    fHandle.write(json.dumps({'version': KritaBuildDoc.ANALYSIS_CACHE_VERSION,
+                                              'blobs': self.__analysisCache}))
+            except Exception as e:
+                print("ERROR: Can't save analysis cache!")
+                print(e)
+
+    def __saveBin(self):
+        """Save binary index of documentation, used by Quick Krita API docker"""
+        try:
+            print("SAVE REFERENTIAL INDEX")
+            BPKritaApiRef.save(self.__kritaReferential, self.__binFile)
+        except Exception as e:
+            print("ERROR: Can't save referential index!")
+            print(e)
+
     def __gitTags(self):
         """Get, filter & sort git tags to process
 
@@ -1457,8 +1560,20 @@ class KritaBuildDoc:
             except Exception:
                 return False
 
+    def __buildMethodsIndex(self):
+        """Build methods index from current referential"""
+        self.__methodsIndex = {}
+        for className, classNfo in self.__kritaReferential['classes'].items():
+            for method in classNfo['methods']:
+                # when a name is used more than once, keep the first method found
+                self.__methodsIndex.setdefault((className, method['name']), method)
+
     def __updateClasses(self, tagRef, classNfo):
-        """Update self.__kritaReferential classes"""
+        """Update self.__kritaReferential classes
+
+        Methods are retrieved from methods index, then update is linear with
+        number of methods
+        """
         name = classNfo['name']
         if name not in self.__kritaReferential['classes']:
             # class doesn't exist yet in referential, add it
@@ -1468,6 +1583,7 @@ class KritaBuildDoc:
             for updateMethod in self.__kritaReferential['classes'][name]['methods']:
                 updateMethod['tagRef']['available'].append(tagRef)
                 updateMethod['tagRef']['updated'].append(tagRef)
+                self.__methodsIndex.setdefault((name, updateMethod['name']), updateMethod)
             return
 
         # ensure to get last version
@@ -1476,57 +1592,190 @@ class KritaBuildDoc:
         self.__kritaReferential['classes'][name]['sourceCodeLine'] = classNfo['sourceCodeLine']
 
         isUpdated = False
-        currentMethods = self.__kritaReferential['classes'][name]['methods']
         for method in classNfo['methods']:
-            found = False
-            for updateMethod in self.__kritaReferential['classes'][name]['methods']:
-                if updateMethod["name"] == method['name']:
-                    found = True
-                    updateMethod['tagRef']['available'].append(tagRef)
-                    if updateMethod["hash"] != method['hash']:
-                        # method has been modified
-                        # get new one
-                        for property in [k for k in method.keys() if k != 'tagRef']:
-                            updateMethod[property] = method[property]
-
-                        updateMethod['tagRef']['updated'].append(tagRef)
-                    else:
-                        updateMethod['sourceCodeLine'] = method['sourceCodeLine']
+            updateMethod = self.__methodsIndex.get((name, method['name']))
 
-                if found:
-                    break
-
-            if found is False:
+            if updateMethod is None:
                 self.__kritaReferential['classes'][name]['methods'].append(method)
+                self.__methodsIndex[(name, method['name'])] = method
                 method['tagRef']['available'].append(tagRef)
                 method['tagRef']['updated'].append(tagRef)
                 isUpdated = True
+            else:
+                updateMethod['tagRef']['available'].append(tagRef)
+                if updateMethod["hash"] != method['hash']:
+                    # method has been modified
+                    # get new one
+                    for property in [k for k in method.keys() if k != 'tagRef']:
+                        updateMethod[property] = method[property]
+
+                    updateMethod['tagRef']['updated'].append(tagRef)
+                else:
+                    updateMethod['sourceCodeLine'] = method['sourceCodeLine']
 
         if isUpdated:
             self.__kritaReferential['classes'][name]['tagRef']['updated'].append(tagRef)
 
+    def __gitHeaderFiles(self, hash):
+        """Return header files for given commit hash, read from git objects (no checkout)
+
+        Return a list of tuple (file name, blob hash) sorted by file name, or None if
+        tree can't be read
+        """
+        try:
+            cmdResult = subprocess.run(["git",
+                                        "-C", self.__kritaSrcLibKisPath,
+                                        "ls-tree", hash], capture_output=True)
+        except Exception:
+            return None
+
+        if cmdResult.returncode != 0:
+            return None
+
+        returned = []
+        for line in cmdResult.stdout.decode().split("\n"):
+            # <mode> SP <type> SP <object> TAB <file>
+            if result := re.search(r"^\d+\s+blob\s+([0-9a-f]+)\t(.*)$", line):
+                blobHash, fileName = result.groups()
+                if KritaApiAnalysis.isHeaderFile(fileName):
+                    returned.append((fileName, blobHash))
+
+        return sorted(returned)
+
+    def __gitBlobs(self, blobHashes):
+        """Return content of given blobs, read in one git call
+
+        Return a dictionary
+            key = blob hash
+            value = content (str)
+        """
+        returned = {}
+        if len(blobHashes) == 0:
+            return returned
+
+        cmdResult = subprocess.run(["git",
+                                    "-C", self.__kritaSrcLibKisPath,
+                                    "cat-file", "--batch"],
+                                   input="\n".join(blobHashes).encode() + b"\n",
+                                   capture_output=True)
+
+        # output, for each blob:
+        #   <object> SP <type> SP <size> LF
+        #   <contents> LF
+        output = cmdResult.stdout
+        position = 0
+        while position < len(output):
+            eol = output.index(b"\n", position)
+            header = output[position:eol].decode().split(' ')
+            position = eol + 1
+            if len(header) != 3:
+                # <object> SP missing LF
+                continue
+            size = int(header[2])
+            returned[header[0]] = output[position:position + size].decode()
+            position += size + 1
+
+        return returned
+
+    def __analyseBlobs(self, headerFiles):
+        """Analyse given header files not yet in analysis cache
+
+        Given `headerFiles` is a list of tuple (file name, blob hash)
+        Analysis are executed in parallel in worker processes
+        """
+        toAnalyse = {}
+        for fileName, blobHash in headerFiles:
+            if blobHash not in self.__analysisCache and blobHash not in toAnalyse:
+                toAnalyse[blobHash] = fileName
+
+        if len(toAnalyse) == 0:
+            return
+
+        print(f"ANALYSE HEADERS: {len(toAnalyse)} file(s) to analyse")
+        contents = self.__gitBlobs(list(toAnalyse.keys()))
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.__jobs) as executor:
+            futures = {executor.submit(analyseHeaderContent, fileName, contents[blobHash]): blobHash
+                       for blobHash, fileName in toAnalyse.items() if blobHash in contents}
+
+            for future in concurrent.futures.as_completed(futures):
+                blobHash = futures[future]
+                try:
+                    nbKo, classes = future.result()
+                except Exception as e:
+                    print(f"---- Unable to analyse file: {toAnalyse[blobHash]} [{blobHash}]")
+                    print(e)
+                    continue
+                self.__analysisCache[blobHash] = {'nbKo': nbKo, 'classes': classes}
+
     def __analyseSources(self):
         """Loop over tags
 
         if tags hasn't been processed:
-        - checkout tag
-        - do analysis
+        - get tag header files from git objects
+        - do analysis of header files not yet analysed (blob hash not in cache)
         - store results
         """
+        tagsHeaderFiles = {}
         for tagRef in sorted(self.__kritaReferential['tags'].keys()):
             tag = self.__kritaReferential['tags'][tagRef]
             if tag['processed'] is False:
-                print(f"PROCESS TAG: {tag['tag']} [{tag['hash']}]")
-                if self.__gitCheckout(tag['hash']):
-                    buildApiDoc = KritaApiAnalysis(kritaSrcLibKisPath)
-                    for classNfo in [classNfo.toDict() for className, classNfo in buildApiDoc.classes().items()]:
-                        self.__updateClasses(tagRef, classNfo)
-                    tag['processed'] = True
+                headerFiles = self.__gitHeaderFiles(tag['hash'])
+                if headerFiles is None:
+                    print(f"PROCESS TAG: {tag['tag']} [{tag['hash']}]")
+                    print("             ==> Can't read tree!!!")
                 else:
-                    print("             ==> Can't checkout!!!")
+                    tagsHeaderFiles[tagRef] = headerFiles
+
+        Stopwatch.start('analyse')
+        # analyse all header files for all tags at once, to get a better parallelism
+        self.__analyseBlobs([headerFile for headerFiles in tagsHeaderFiles.values() for headerFile in headerFiles])
+        self.__saveAnalysisCache()
+        Stopwatch.stop('analyse')
+
+        Stopwatch.start('merge')
+        self.__buildMethodsIndex()
+        for tagRef, headerFiles in tagsHeaderFiles.items():
+            tag = self.__kritaReferential['tags'][tagRef]
+            print(f"PROCESS TAG: {tag['tag']} [{tag['hash']}]")
+
+            totalKo = 0
+            isValid = True
+            for fileName, blobHash in headerFiles:
+                if blobHash not in self.__analysisCache:
+                    isValid = False
+                    continue
+
+                analysis = self.__analysisCache[blobHash]
+                if analysis['nbKo']:
+                    totalKo += 1
+
+                for classNfo in analysis['classes']:
+                    # referential is updated from class dict: work on a copy, cache must stay unchanged
+                    self.__updateClasses(tagRef, json.loads(json.dumps(classNfo)))
 
-        # switch back to master branch
-        self.__gitCheckout('master')
+            if totalKo > 0:
+                print(f"!!!! WARNING: invalid files({totalKo}/{len(headerFiles)})!")
+
+            if isValid:
+                tag['processed'] = True
+            else:
+                print("             ==> Can't analyse all files!!!")
+
+        Stopwatch.stop('merge')
+
+    def __showTimes(self):
+        """Print duration of build phases"""
+        print("BUILD TIMES:")
+        for phase, label in (('analyse', 'Analyse'),
+                             ('merge', 'Merge'),
+                             ('stubs', 'Stub generation'),
+                             ('html', 'HTML generation')):
+            duration = Stopwatch.duration(phase)
+            if duration is None:
+                print(f"- {label:<16}: -")
+            else:
+                print(f"- {label:<16}: {duration:.3f}s")
 
     def __showFoundTypes(self):
         if self.__showTypes:
@@ -2171,6 +2420,19 @@ if __name__ == '__main__':
                         action='store_true',
                         help='Build krita.html file')
 
+    parser.add_argument('--cache',
+                        dest='cacheFile',
+                        action='store',
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build_docs.cache.json'),
+                        help='Headers analysis cache file')
+
+    parser.add_argument('--jobs',
+                        dest='jobs',
+                        action='store',
+                        type=int,
+                        default=None,
+                        help='Number of parallel analysis (default: number of processors)')
+
     args = parser.parse_args()
     argsVar = vars(args)
 
@@ -2198,7 +2460,7 @@ if __name__ == '__main__':
 
     pluginPathDocs = os.path.join(pluginPath, 'bp', 'resources', 'docs')
     if argsVar['reset'] is True:
-        for file in [fileName for fileName in os.listdir(pluginPathDocs) if re.search(r'\.(html|py|json)$', fileName)]:
+        for file in [fileName for fileName in os.listdir(pluginPathDocs) if re.search(r'\.(html|py|json|bin)$', fileName)]:
             docFile = os.path.join(pluginPathDocs, file)
             if os.path.exists(docFile):
                 try:
@@ -2206,9 +2468,17 @@ if __name__ == '__main__':
                 except Exception:
                     pass
 
+        if os.path.exists(argsVar['cacheFile']):
+            try:
+                os.remove(argsVar['cacheFile'])
+            except Exception:
+                pass
+
     KritaBuildDoc(kritaSrcLibKisPath,
                   pluginPathDocs,
                   argsVar['updateRepo'],
                   argsVar['showTypes'],
                   argsVar['buildPython'],
-                  argsVar['buildHtml'])
+                  argsVar['buildHtml'],
+                  argsVar['cacheFile'],
+                  argsVar['jobs'])
@@ -13,34 +13,74 @@
 # The bytesrw module provides high level methods to read/write packed binary
 # data
 #
-# Main class from this module
+# Main classes from this module
 #
 # - BytesRW:
 #       A class with high level methods to read/write packed binary data
 #
+# - BytesRecords:
+#       A versioned container of binary records, with table of contents and
+#       checksums
+#
+# Pack/unpack use precompiled struct.Struct instances, shared by all BytesRW
+# instances; bulk reads (readArray()) and large strings reads are made through
+# a memoryview on initial content to avoid intermediate copies
+#
 # -----------------------------------------------------------------------------
 
+import os
 import struct
 import io
+import shutil
+import tempfile
+import zlib
 
 from PyQt5.QtCore import QByteArray
 
+from ..pktk import *
+
 
 class BytesRW(io.BytesIO):
     """Provides an easy access to read/write binary data, provided functions
     doing the pack/unpack according to type
 
     """
+    # precompiled struct, shared by all instances
+    # key = (byte order, format)
+    # value = struct.Struct
+    __STRUCTS = {}
+
+    # strings from this size (in bytes) are decoded directly from initial
+    # content; for smaller strings, memoryview slicing cost more than copy
+    __STR_VIEW_SIZE = 0x10000
+
+    @staticmethod
+    def __struct(byteOrder, format):
+        """Return precompiled struct for given byte order and format"""
+        key = (byteOrder, format)
+        returned = BytesRW.__STRUCTS.get(key)
+        if returned is None:
+            returned = struct.Struct(f'{byteOrder}{format}')
+            BytesRW.__STRUCTS[key] = returned
+        return returned
 
     def __init__(self, blob=None):
         if isinstance(blob, QByteArray):
-            super(BytesRW, self).__init__(bytes(blob))
-        elif isinstance(blob, bytes):
+            blob = bytes(blob)
+
+        if isinstance(blob, bytes):
             super(BytesRW, self).__init__(blob)
+            # initial content, while not modified
+            # BytesIO shares initial bytes until content is modified, but
+            # getbuffer() unshare it (whole content is copied): bulk reads use
+            # a memoryview on initial bytes instead
+            self.__blob = memoryview(blob)
         else:
             super(BytesRW, self).__init__()
+            self.__blob = None
 
-        self.__byteOrder = '!'  # network
+        self.__byteOrder = None
+        self.setByteOrder('!')  # network
 
     def byteOrder(self):
         """return current byte order used to pack/unpack data"""
@@ -62,84 +102,113 @@ class BytesRW(io.BytesIO):
             self.__byteOrder = '>'
         elif value == '!' or value == 'n':
             self.__byteOrder = '!'
+        else:
+            return
+
+        self.__structB = BytesRW.__struct(self.__byteOrder, 'B')
+        self.__structb = BytesRW.__struct(self.__byteOrder, 'b')
+        self.__structH = BytesRW.__struct(self.__byteOrder, 'H')
+        self.__structh = BytesRW.__struct(self.__byteOrder, 'h')
+        self.__structI = BytesRW.__struct(self.__byteOrder, 'I')
+        self.__structi = BytesRW.__struct(self.__byteOrder, 'i')
+        self.__structQ = BytesRW.__struct(self.__byteOrder, 'Q')
+        self.__structq = BytesRW.__struct(self.__byteOrder, 'q')
+        self.__structf = BytesRW.__struct(self.__byteOrder, 'f')
+        self.__structd = BytesRW.__struct(self.__byteOrder, 'd')
 
     def readBool(self):
         """Read a boolean value (1 byte)"""
         b = self.read(1)
         if len(b) == 1:
-            return (struct.unpack(f'{self.__byteOrder}B', b)[0] == 1)
+            return (self.__structB.unpack(b)[0] == 1)
         return None
 
     def readShort(self):
         """Read a short signed value (1 byte)"""
         b = self.read(1)
         if len(b) == 1:
-            return struct.unpack(f'{self.__byteOrder}b', b)[0]
+            return self.__structb.unpack(b)[0]
         return None
 
     def readUShort(self):
         """Read a short unsigned value (1 byte)"""
         b = self.read(1)
         if len(b) == 1:
-            return struct.unpack(f'{self.__byteOrder}B', b)[0]
+            return self.__structB.unpack(b)[0]
         return None
 
     def readInt2(self):
         """Read an integer signed value (2 bytes)"""
         b = self.read(2)
         if len(b) == 2:
-            return struct.unpack(f'{self.__byteOrder}h', b)[0]
+            return self.__structh.unpack(b)[0]
         return None
 
     def readUInt2(self):
         """Read a integer unsigned value (2 bytes)"""
         b = self.read(2)
         if len(b) == 2:
-            return struct.unpack(f'{self.__byteOrder}H', b)[0]
+            return self.__structH.unpack(b)[0]
         return None
 
     def readInt4(self):
         """Read an integer signed value (4 bytes)"""
         b = self.read(4)
         if len(b) == 4:
-            return struct.unpack(f'{self.__byteOrder}i', b)[0]
+            return self.__structi.unpack(b)[0]
         return None
 
     def readUInt4(self):
         """Read a integer unsigned value (4 bytes)"""
         b = self.read(4)
         if len(b) == 4:
-            return struct.unpack(f'{self.__byteOrder}I', b)[0]
+            return self.__structI.unpack(b)[0]
         return None
 
     def readInt8(self):
         """Read an integer signed value (8 bytes)"""
         b = self.read(8)
         if len(b) == 8:
-            return struct.unpack(f'{self.__byteOrder}q', b)[0]
+            return self.__structq.unpack(b)[0]
         return None
 
     def readUInt8(self):
         """Read a integer unsigned value (8 bytes)"""
         b = self.read(8)
         if len(b) == 8:
-            return struct.unpack(f'{self.__byteOrder}Q', b)[0]
+            return self.__structQ.unpack(b)[0]
         return None
 
     def readFloat4(self):
         """Read a float signed value (4 bytes)"""
         b = self.read(4)
         if len(b) == 4:
-            return struct.unpack(f'{self.__byteOrder}f', b)[0]
+            return self.__structf.unpack(b)[0]
         return None
 
     def readFloat8(self):
         """Read a float signed value (8 bytes)"""
         b = self.read(8)
         if len(b) == 8:
-            return struct.unpack(f'{self.__byteOrder}d', b)[0]
+            return self.__structd.unpack(b)[0]
         return None
 
+    def __readStr(self, size, encoding, errors):
+        """Read and decode a string of `size` bytes, or until EOF if `size` is None"""
+        if self.__blob is None or (size is not None and size < BytesRW.__STR_VIEW_SIZE):
+            if size is None:
+                return self.read().decode(encoding, errors)
+            return self.read(size).decode(encoding, errors)
+
+        position = self.tell()
+        if size is None:
+            endPosition = len(self.__blob)
+        else:
+            endPosition = min(position + size, len(self.__blob))
+        endPosition = max(position, endPosition)
+        self.seek(endPosition)
+        return str(self.__blob[position:endPosition], encoding, errors)
+
     def readStr(self, size=None, encoding='utf-8', errors='strict'):
         """Read a UTF8 string
 
@@ -148,12 +217,13 @@ class BytesRW(io.BytesIO):
         (https://docs.python.org/3/library/codecs.html#standard-encodings)
 
         If `size` is not provided, read until EOF
+
+        Large strings are decoded from internal buffer, without intermediate
+        copy
         """
         if isinstance(size, int):
-            b = self.read(size)
-        else:
-            b = self.read()
-        return b.decode(encoding, errors)
+            return self.__readStr(size, encoding, errors)
+        return self.__readStr(None, encoding, errors)
 
     def readPStr(self, encoding='utf-8', errors='strict'):
         """Read a UTF8 pascal string (1 byte size)
@@ -164,8 +234,7 @@ class BytesRW(io.BytesIO):
         """
         size = self.readUShort()
         if size > 0:
-            b = self.read(size)
-            return b.decode(encoding, errors)
+            return self.read(size).decode(encoding, errors)
         return ''
 
     def readPStr2(self, encoding='utf-8', errors='strict'):
@@ -177,8 +246,7 @@ class BytesRW(io.BytesIO):
         """
         size = self.readUInt2()
         if size > 0:
-            b = self.read(size)
-            return b.decode(encoding, errors)
+            return self.read(size).decode(encoding, errors)
         return ''
 
     def readPStr4(self, encoding='utf-8', errors='strict'):
@@ -187,13 +255,79 @@ class BytesRW(io.BytesIO):
         Given `encoding` value can be provided to read other type
         of string
         (https://docs.python.org/3/library/codecs.html#standard-encodings)
+
+        Large strings are decoded from internal buffer, without intermediate
+        copy
         """
         size = self.readUInt4()
         if size > 0:
-            b = self.read(size)
-            return b.decode(encoding, errors)
+            return self.__readStr(size, encoding, errors)
         return ''
 
+    def readStruct(self, format):
+        """Read values defined by given struct `format` (without byte order
+        character, current byte order is applied)
+
+        Return a tuple of values, or None if there's not enough bytes available
+        """
+        packer = BytesRW.__struct(self.__byteOrder, format)
+        b = self.read(packer.size)
+        if len(b) == packer.size:
+            return packer.unpack(b)
+        return None
+
+    def readArray(self, format, count):
+        """Read an array of `count` fixed size records, each record defined by
+        given struct `format` (without byte order character, current byte order
+        is applied)
+
+        Records are unpacked directly from initial content or internal buffer,
+        without intermediate copy
+
+        Return a list of tuples, or None if there's not enough bytes available
+        """
+        packer = BytesRW.__struct(self.__byteOrder, format)
+        position = self.tell()
+        endPosition = position + packer.size * count
+
+        if self.__blob is not None:
+            if endPosition <= len(self.__blob):
+                self.seek(endPosition)
+                return list(packer.iter_unpack(self.__blob[position:endPosition]))
+            self.seek(max(position, len(self.__blob)))
+            return None
+
+        # memoryview must be released before any write, as a BytesIO can't be
+        # resized while a memoryview is exported
+        with self.getbuffer() as view:
+            if endPosition <= len(view):
+                self.seek(endPosition)
+                return list(packer.iter_unpack(view[position:endPosition]))
+            self.seek(max(position, len(view)))
+        return None
+
+    def write(self, value):
+        """Write given bytes-like `value`
+
+        Return number of bytes written
+        """
+        # content is modified, initial content can't be used anymore
+        self.__blob = None
+        return super(BytesRW, self).write(value)
+
+    def writelines(self, lines):
+        """Write given list of bytes-like `lines`"""
+        self.__blob = None
+        super(BytesRW, self).writelines(lines)
+
+    def truncate(self, size=None):
+        """Resize content to given `size`, or to current position if None
+
+        Return new size
+        """
+        self.__blob = None
+        return super(BytesRW, self).truncate(size)
+
     def writeBool(self, value):
         """Write a boolean value (1 byte)"""
         if isinstance(value, bool):
@@ -206,71 +340,61 @@ class BytesRW(io.BytesIO):
     def writeShort(self, value):
         """Write a short signed value (1 byte)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}b', value)
-            return self.write(b)
+            return self.write(self.__structb.pack(value))
         return 0
 
     def writeUShort(self, value):
         """Write a short unsigned value (1 byte)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}B', value)
-            return self.write(b)
+            return self.write(self.__structB.pack(value))
         return 0
 
     def writeInt2(self, value):
         """Write an integer signed value (2 bytes)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}h', value)
-            return self.write(b)
+            return self.write(self.__structh.pack(value))
         return 0
 
     def writeUInt2(self, value):
         """Write a integer unsigned value (2 bytes)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}H', value)
-            return self.write(b)
+            return self.write(self.__structH.pack(value))
         return 0
 
     def writeInt4(self, value):
         """Write an integer signed value (4 bytes)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}i', value)
-            return self.write(b)
+            return self.write(self.__structi.pack(value))
         return 0
 
     def writeUInt4(self, value):
         """Write a integer unsigned value (4 bytes)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}I', value)
-            return self.write(b)
+            return self.write(self.__structI.pack(value))
         return 0
 
     def writeInt8(self, value):
         """Write an integer signed value (8 bytes)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}q', value)
-            return self.write(b)
+            return self.write(self.__structq.pack(value))
         return 0
 
     def writeUInt8(self, value):
         """Write a integer unsigned value (8 bytes)"""
         if isinstance(value, int):
-            b = struct.pack(f'{self.__byteOrder}Q', value)
-            return self.write(b)
+            return self.write(self.__structQ.pack(value))
         return 0
 
     def writeFloat4(self, value):
         """Write a float signed value (4 bytes)"""
         if isinstance(value, float):
-            b = struct.pack(f'{self.__byteOrder}f', value)
-            return self.write(b)
+            return self.write(self.__structf.pack(value))
         return 0
 
     def writeFloat8(self, value):
         """Write a float signed value (8 bytes)"""
         if isinstance(value, float):
-            b = struct.pack(f'{self.__byteOrder}d', value)
-            return self.write(b)
+            return self.write(self.__structd.pack(value))
         return 0
 
     def writeStr(self, value, encoding='utf-8'):
@@ -339,3 +463,248 @@ class BytesRW(io.BytesIO):
         if len(b) > 0:
             return self.write(b)+w
         return w
+
+    def writeStruct(self, format, *values):
+        """Write values according to given struct `format` (without byte order
+        character, current byte order is applied)
+
+        Return number of bytes written
+        """
+        return self.write(BytesRW.__struct(self.__byteOrder, format).pack(*values))
+
+    def writeArray(self, format, records):
+        """Write an array of fixed size records, each record defined by given
+        struct `format` (without byte order character, current byte order is
+        applied) and provided as a tuple of values
+
+        Return number of bytes written
+        """
+        packer = BytesRW.__struct(self.__byteOrder, format)
+        buffer = bytearray(packer.size * len(records))
+        position = 0
+        for record in records:
+            packer.pack_into(buffer, position, *record)
+            position += packer.size
+        return self.write(buffer)
+
+
+class BytesRecords:
+    """A versioned container of binary records
+
+    A container is made of (network byte order):
+        . a header
+            4 bytes     magic (defined by container user)
+            UInt2       container format version (0x0001)
+            UInt2       content version (defined by container user)
+            UInt4       number of records
+
+        . a table of contents, one entry per record
+            4 bytes     record tag (defined by container user)
+            UInt4       record offset (from start of container)
+            UInt4       record size
+            UInt4       record CRC32
+
+        . records data
+
+    Table of contents allows to access directly to a record, without reading
+    previous ones; checksums allows to check integrity of a record without
+    deserializing it
+
+    A damaged record (truncated content or checksum mismatch) is not valid,
+    other records can still be read
+    """
+    FORMAT_VERSION = 0x0001
+
+    __STRUCT_HEADER = struct.Struct('!4sHHI')
+    __STRUCT_TOC = struct.Struct('!4sIII')
+
+    # checksum of records for which content is out of container bounds; never match a CRC32
+    __CRC_TRUNCATED = -1
+
+    @staticmethod
+    def isRecords(data, magic):
+        """Return True if given `data` (bytes-like) is a container with given `magic`"""
+        return len(data) >= BytesRecords.__STRUCT_HEADER.size and bytes(data[0:4]) == magic
+
+    def __init__(self, magic, version=0x0001):
+        if not isinstance(magic, bytes) or len(magic) != 4:
+            raise EInvalidValue('Given `magic` must be 4 bytes')
+        if not isinstance(version, int):
+            raise EInvalidType('Given `version` must be an <int>')
+
+        self.__magic = magic
+        self.__version = version
+        # list of tuple (tag, content, crc)
+        # content is a memoryview for loaded records, crc is None for added records
+        # and __CRC_TRUNCATED for truncated loaded records
+        self.__records = []
+
+    def __checkIndex(self, index):
+        """Raise an exception if given record index is not valid"""
+        if not isinstance(index, int) or index < 0 or index >= len(self.__records):
+            raise EInvalidValue('Given `index` is not a valid record index')
+
+    def magic(self):
+        """Return container magic"""
+        return self.__magic
+
+    def version(self):
+        """Return content version"""
+        return self.__version
+
+    def count(self):
+        """Return number of records"""
+        return len(self.__records)
+
+    def tag(self, index):
+        """Return tag for record at given `index`"""
+        self.__checkIndex(index)
+        return self.__records[index][0]
+
+    def indexes(self, tag):
+        """Return list of index of records with given `tag`"""
+        return [index for index, record in enumerate(self.__records) if record[0] == tag]
+
+    def index(self, tag):
+        """Return index of first record with given `tag`, -1 if not found"""
+        for index, record in enumerate(self.__records):
+            if record[0] == tag:
+                return index
+        return -1
+
+    def size(self, index):
+        """Return size (in bytes) of record at given `index`
+
+        For a truncated record, return size of available content
+        """
+        self.__checkIndex(index)
+        return len(self.__records[index][1])
+
+    def isValid(self, index):
+        """Return True if record at given `index` is not truncated and match its checksum"""
+        self.__checkIndex(index)
+        tag, content, crc = self.__records[index]
+        if crc is None:
+            return True
+        elif crc == BytesRecords.__CRC_TRUNCATED:
+            return False
+        return zlib.crc32(content) == crc
+
+    def data(self, index):
+        """Return content of record at given `index`, as a bytes-like object
+
+        Content is not copied
+        """
+        self.__checkIndex(index)
+        return self.__records[index][1]
+
+    def reader(self, index, check=True):
+        """Return a BytesRW to read record at given `index`
+
+        If `check` is True and record doesn't match its checksum, return None
+        """
+        if check and not self.isValid(index):
+            return None
+        return BytesRW(bytes(self.__records[index][1]))
+
+    def addRecord(self, tag, content):
+        """Add a record with given `tag` (4 bytes)
+
+        Given `content` can be a BytesRW or a bytes-like object
+
+        Return index of added record
+        """
+        if not isinstance(tag, bytes) or len(tag) != 4:
+            raise EInvalidValue('Given `tag` must be 4 bytes')
+
+        if isinstance(content, BytesRW):
+            content = content.getvalue()
+        elif isinstance(content, (bytearray, memoryview)):
+            content = bytes(content)
+        elif not isinstance(content, bytes):
+            raise EInvalidType('Given `content` must be a <BytesRW> or <bytes>')
+
+        self.__records.append((tag, content, None))
+        return len(self.__records) - 1
+
+    def clear(self):
+        """Remove all records"""
+        self.__records = []
+
+    def toBytes(self):
+        """Return container as bytes"""
+        nbRecords = len(self.__records)
+        offset = BytesRecords.__STRUCT_HEADER.size + nbRecords * BytesRecords.__STRUCT_TOC.size
+
+        returned = [BytesRecords.__STRUCT_HEADER.pack(self.__magic, BytesRecords.FORMAT_VERSION, self.__version, nbRecords)]
+        for tag, content, crc in self.__records:
+            returned.append(BytesRecords.__STRUCT_TOC.pack(tag, offset, len(content), zlib.crc32(content)))
+            offset += len(content)
+        returned.extend([content for tag, content, crc in self.__records])
+
+        return b''.join(returned)
+
+    def fromBytes(self, data):
+        """Load container from given `data` (bytes-like)
+
+        Only header and table of contents are decoded; records content are
+        referenced from given `data`, without copy
+
+        Records for which content is out of `data` bounds (truncated data) are
+        loaded with available content and are not valid (see isValid())
+
+        Raise an exception if given data is not a valid container (invalid
+        header or truncated table of contents)
+        """
+        data = memoryview(data)
+        if not BytesRecords.isRecords(data, self.__magic):
+            raise EInvalidValue('Given `data` is not a valid container')
+
+        magic, formatVersion, version, nbRecords = BytesRecords.__STRUCT_HEADER.unpack_from(data, 0)
+        tocSize = nbRecords * BytesRecords.__STRUCT_TOC.size
+        if formatVersion != BytesRecords.FORMAT_VERSION or len(data) < BytesRecords.__STRUCT_HEADER.size + tocSize:
+            raise EInvalidValue('Given `data` is not a valid container')
+
+        records = []
+        for tag, offset, size, crc in BytesRecords.__STRUCT_TOC.iter_unpack(data[BytesRecords.__STRUCT_HEADER.size:BytesRecords.__STRUCT_HEADER.size + tocSize]):
+            if offset + size > len(data):
+                # truncated record: other records can still be read
+                crc = BytesRecords.__CRC_TRUNCATED
+            records.append((tag, data[offset:offset + size], crc))
+
+        self.__version = version
+        self.__records = records
+
+    def load(self, fileName):
+        """Load container from given file
+
+        Raise an exception if file can't be read or is not a valid container
+        """
+        with open(fileName, 'rb') as fHandle:
+            self.fromBytes(fHandle.read())
+
+    def save(self, fileName):
+        """Save container to given file
+
+        Container is written in a temporary file in the same directory, that
+        replace given file once fully written: if an error occurs, given file
+        is not modified
+
+        Raise an exception if file can't be written
+        """
+        fileName = os.path.abspath(fileName)
+        fHandle, tmpFileName = tempfile.mkstemp(prefix=f'.{os.path.basename(fileName)}.', suffix='.tmp', dir=os.path.dirname(fileName))
+        try:
+            with os.fdopen(fHandle, 'wb') as fHandle:
+                fHandle.write(self.toBytes())
+                fHandle.flush()
+                os.fsync(fHandle.fileno())
+
+            if os.path.exists(fileName):
+                # temporary file is created with owner only permissions; keep permissions of replaced file
+                shutil.copymode(fileName, tmpFileName)
+            os.replace(tmpFileName, fileName)
+        except BaseException:
+            if os.path.exists(tmpFileName):
+                os.remove(tmpFileName)
+            raise
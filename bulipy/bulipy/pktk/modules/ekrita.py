@@ -35,6 +35,7 @@
 # -----------------------------------------------------------------------------
 
 from enum import Enum
+import math
 import re
 
 from ..pktk import *
@@ -45,11 +46,13 @@ from krita import (
     )
 
 from PyQt5.QtCore import (
+        Qt,
         QByteArray,
         QEventLoop,
         QMimeData,
         QPoint,
         QRect,
+        QSize,
         QTimer,
         QUuid,
     )
@@ -57,6 +60,7 @@ from PyQt5.QtGui import (
         QGuiApplication,
         QKeySequence,
         QImage,
+        QPainter,
         QPixmap,
         qRgb
     )
@@ -1017,6 +1021,12 @@ class EKritaNode:
 
     __projectionMode = ProjectionMode.AUTO
 
+    # default tile size used by tiles(), toQImageScaled(), toQImageScaledSteps()
+    TILE_SIZE = 512
+
+    # number of bytes copied by last toQImage()/fromQImage() call
+    __lastBytesCopied = 0
+
     @staticmethod
     def __sleep(value):
         """Sleep for given number of milliseconds"""
@@ -1053,6 +1063,40 @@ class EKritaNode:
 
         return parentPath(layerNode)
 
+    @staticmethod
+    def lastBytesCopied():
+        """Return number of pixels data bytes copied by last toQImage() or
+        fromQImage() call
+
+        Copies made internally by Krita (to get/set node pixels data) are
+        included, color space conversions made by Krita are not
+        """
+        return EKritaNode.__lastBytesCopied
+
+    @staticmethod
+    def __resolveProjectionMode(layerNode, projectionMode):
+        """Return projection mode (TRUE or FALSE) to use for given `layerNode`"""
+        if projectionMode is None:
+            projectionMode = EKritaNode.__projectionMode
+        if projectionMode == EKritaNode.ProjectionMode.AUTO:
+            childNodes = layerNode.childNodes()
+            # childNodes can return be None!?
+            if childNodes and len(childNodes) == 0:
+                projectionMode = EKritaNode.ProjectionMode.FALSE
+            else:
+                projectionMode = EKritaNode.ProjectionMode.TRUE
+        return projectionMode
+
+    @staticmethod
+    def __hasRGBAPixelData(layerNode):
+        """Return True if pixels data from `layerNode` can be used as QImage ARGB32 data"""
+        # Need to check what todo for:
+        # - masks (8bit/pixels)
+        # - other color space (need to convert to 8bits/rgba...?)
+        return not (layerNode.type() in ('transparencymask', 'filtermask', 'transformmask', 'selectionmask') or
+                    layerNode.colorModel() != 'RGBA' or
+                    layerNode.colorDepth() != 'U8')
+
     @staticmethod
     def toQImage(layerNode, rect=None, projectionMode=None):
         """Return `layerNode` content as a QImage (as ARGB32)
@@ -1092,30 +1136,166 @@ class EKritaNode:
         elif not isinstance(rect, QRect):
             raise EInvalidType("Given `rect` must be a valid Krita <Document>, a <QRect> or None")
 
-        if projectionMode is None:
-            projectionMode = EKritaNode.__projectionMode
-        if projectionMode == EKritaNode.ProjectionMode.AUTO:
-            childNodes = layerNode.childNodes()
-            # childNodes can return be None!?
-            if childNodes and len(childNodes) == 0:
-                projectionMode = EKritaNode.ProjectionMode.FALSE
-            else:
-                projectionMode = EKritaNode.ProjectionMode.TRUE
+        projectionMode = EKritaNode.__resolveProjectionMode(layerNode, projectionMode)
 
-        # Need to check what todo for:
-        # - masks (8bit/pixels)
-        # - other color space (need to convert to 8bits/rgba...?)
-        if (layerNode.type() in ('transparencymask', 'filtermask', 'transformmask', 'selectionmask') or
-           layerNode.colorModel() != 'RGBA' or
-           layerNode.colorDepth() != 'U8'):
+        if not EKritaNode.__hasRGBAPixelData(layerNode):
             # pixelData/projectionPixelData return a 8bits/pixel matrix
             # didn't find how to convert pixel data to QImlage then use thumbnail() function
-            return layerNode.thumbnail(rect.width(), rect.height())
+            returned = layerNode.thumbnail(rect.width(), rect.height())
+            EKritaNode.__lastBytesCopied = returned.sizeInBytes()
+            return returned
         else:
+            # RGBA/U8 pixels data are already in QImage ARGB32 (BGRA) format: no conversion needed
+            # and returned QImage use pixels data buffer, without copy
             if projectionMode == EKritaNode.ProjectionMode.TRUE:
-                return QImage(layerNode.projectionPixelData(rect.left(), rect.top(), rect.width(), rect.height()), rect.width(), rect.height(), QImage.Format_ARGB32)
+                pixelData = layerNode.projectionPixelData(rect.left(), rect.top(), rect.width(), rect.height())
             else:
-                return QImage(layerNode.pixelData(rect.left(), rect.top(), rect.width(), rect.height()), rect.width(), rect.height(), QImage.Format_ARGB32)
+                pixelData = layerNode.pixelData(rect.left(), rect.top(), rect.width(), rect.height())
+            EKritaNode.__lastBytesCopied = pixelData.size()
+            return QImage(pixelData, rect.width(), rect.height(), QImage.Format_ARGB32)
+
+    @staticmethod
+    def tiles(layerNode, rect=None, projectionMode=None, tileSize=None):
+        """Iterate over `layerNode` content by tiles
+
+        Yield tuples (tile rect, tile content as a QImage ARGB32); tile rect is
+        provided in `layerNode` coordinates
+
+        The `rect` value can be:
+        - None, in this case will iterate over all `layerNode` content
+        - A QRect() object, in this case iterate over `layerNode` content reduced to given rectangle bounds
+        - A Krita document, in this case iterate over `layerNode` content reduced to document bounds
+
+        The `tileSize` value define maximum width/height of tiles; if None,
+        EKritaNode.TILE_SIZE is used
+
+        Only one tile is read at a time from `layerNode`, then peak memory is
+        bounded by tile size rather than by `layerNode` size
+
+        Limitation: for nodes for which pixels data can't be read as RGBA
+        (masks, other color spaces), content is not read by tiles; only one
+        tile is yielded, made from a full resolution node thumbnail (see
+        toQImage()): peak memory is then bounded by `rect` size, and Krita
+        thumbnail is always built from whole node content
+        """
+        if layerNode is None:
+            raise EInvalidValue("Given `layerNode` can't be None")
+
+        if rect is None:
+            rect = layerNode.bounds()
+        elif isinstance(rect, Document):
+            rect = rect.bounds()
+        elif not isinstance(rect, QRect):
+            raise EInvalidType("Given `rect` must be a valid Krita <Document>, a <QRect> or None")
+
+        if tileSize is None:
+            tileSize = EKritaNode.TILE_SIZE
+        elif not isinstance(tileSize, int) or tileSize <= 0:
+            raise EInvalidValue("Given `tileSize` must be a positive <int>")
+
+        if rect.isEmpty():
+            return
+
+        if not EKritaNode.__hasRGBAPixelData(layerNode):
+            yield (QRect(rect), EKritaNode.toQImage(layerNode, rect, projectionMode))
+            return
+
+        # resolve projection mode once, not for each tile
+        projectionMode = EKritaNode.__resolveProjectionMode(layerNode, projectionMode)
+
+        for top in range(rect.top(), rect.bottom() + 1, tileSize):
+            for left in range(rect.left(), rect.right() + 1, tileSize):
+                tileRect = QRect(left, top, min(tileSize, rect.right() + 1 - left), min(tileSize, rect.bottom() + 1 - top))
+                yield (tileRect, EKritaNode.toQImage(layerNode, tileRect, projectionMode))
+
+    @staticmethod
+    def toQImageScaled(layerNode, size, rect=None, projectionMode=None, tileSize=None):
+        """Return `layerNode` content as a QImage (as ARGB32), scaled to fit in
+        given `size` (aspect ratio is kept)
+
+        The `rect` value can be:
+        - None, in this case will return all `layerNode` content
+        - A QRect() object, in this case return `layerNode` content reduced to given rectangle bounds
+        - A Krita document, in this case return `layerNode` content reduced to document bounds
+
+        Content is read by tiles (see tiles()), and each tile is downsampled as
+        it arrives: peak memory is bounded by tile size and returned image size,
+        rather than by `layerNode` size
+
+        For nodes for which pixels data can't be read as RGBA (masks, other
+        color spaces), returned image is node thumbnail built by Krita directly
+        at returned image size
+        """
+        returned = QImage()
+        for nbProcessed, nbTiles, returned in EKritaNode.toQImageScaledSteps(layerNode, size, rect, projectionMode, tileSize):
+            pass
+        return returned
+
+    @staticmethod
+    def toQImageScaledSteps(layerNode, size, rect=None, projectionMode=None, tileSize=None):
+        """Same than toQImageScaled(), as a generator: one tile is read and
+        downsampled per iteration
+
+        Yield tuples (number of processed tiles, number of tiles, QImage); yielded
+        QImage is the same for all iterations, and is complete once all tiles
+        are processed
+
+        Allows caller to spread scaled image generation over many event loop
+        iterations (UI stays responsive while a large node is read)
+        """
+        if not isinstance(size, QSize):
+            raise EInvalidType("Given `size` must be a valid <QSize>")
+
+        if rect is None:
+            rect = layerNode.bounds()
+        elif isinstance(rect, Document):
+            rect = rect.bounds()
+        elif not isinstance(rect, QRect):
+            raise EInvalidType("Given `rect` must be a valid Krita <Document>, a <QRect> or None")
+
+        if tileSize is None:
+            tileSize = EKritaNode.TILE_SIZE
+
+        if rect.isEmpty() or size.isEmpty():
+            yield (1, 1, QImage())
+            return
+
+        targetSize = rect.size().scaled(size, Qt.KeepAspectRatio)
+        if not EKritaNode.__hasRGBAPixelData(layerNode):
+            # content can't be read by tiles; let Krita build a thumbnail at
+            # expected size rather than a full resolution one
+            returned = layerNode.thumbnail(targetSize.width(), targetSize.height())
+            EKritaNode.__lastBytesCopied = returned.sizeInBytes()
+            yield (1, 1, returned)
+            return
+        elif targetSize.width() >= rect.width():
+            # no downsampling
+            yield (1, 1, EKritaNode.toQImage(layerNode, rect, projectionMode).scaled(targetSize, Qt.IgnoreAspectRatio, Qt.SmoothTransformation))
+            return
+
+        scaleX = targetSize.width() / rect.width()
+        scaleY = targetSize.height() / rect.height()
+        nbTiles = math.ceil(rect.width() / tileSize) * math.ceil(rect.height() / tileSize)
+
+        returned = QImage(targetSize, QImage.Format_ARGB32)
+        returned.fill(Qt.transparent)
+
+        painter = QPainter()
+        for index, (tileRect, tileImage) in enumerate(EKritaNode.tiles(layerNode, rect, projectionMode, tileSize)):
+            # target bounds are rounded from tile bounds, then adjacent tiles share their edges
+            left = round((tileRect.left() - rect.left()) * scaleX)
+            top = round((tileRect.top() - rect.top()) * scaleY)
+            right = round((tileRect.right() + 1 - rect.left()) * scaleX)
+            bottom = round((tileRect.bottom() + 1 - rect.top()) * scaleY)
+
+            if right > left and bottom > top:
+                # painter is not kept active between iterations: generator may not be iterated until the end
+                painter.begin(returned)
+                painter.setCompositionMode(QPainter.CompositionMode_Source)
+                painter.drawImage(QPoint(left, top), tileImage.scaled(right - left, bottom - top, Qt.IgnoreAspectRatio, Qt.SmoothTransformation))
+                painter.end()
+
+            yield (index + 1, nbTiles, returned)
 
     @staticmethod
     def toQPixmap(layerNode, rect=None, projectionMode=None):
@@ -1138,6 +1318,10 @@ class EKritaNode:
         The `position` value can be:
         - None, in this case, pixmap will be pasted at position (0, 0)
         - A QPoint() object, pixmap will be pasted at defined position
+
+        Image is converted to ARGB32 format only if needed; layer is converted
+        to RGBA/U8 color space (and then back to original color space) only if
+        needed
         """
         # NOTE: layerNode can be a QObject...
         #       that's weird, but document.nodeByUniqueID() return a QObject for a paintlayer (other Nodes seems to be Ok...)
@@ -1176,10 +1360,22 @@ class EKritaNode:
             layerNode.setColorSpace("RGBA", "U8", "sRGB-elle-V2-srgbtrc.icc")
             layerNeedBackConversion = True
 
-        ptr = image.bits()
-        ptr.setsize(image.byteCount())
+        bytesCopied = 0
+        if image.format() != QImage.Format_ARGB32:
+            # setPixelData() expect RGBA/U8 pixels (ARGB32 QImage format), convert image only if needed
+            image = image.convertToFormat(QImage.Format_ARGB32)
+            bytesCopied += image.sizeInBytes()
+
+        ptr = image.constBits()
+        ptr.setsize(image.sizeInBytes())
+
+        # QByteArray.fromRawData() wraps image pixels buffer without copy (a
+        # bytes object from ptr.asstring() would be a full copy); `image` must
+        # not be released nor modified before setPixelData() returns
+        layerNode.setPixelData(QByteArray.fromRawData(ptr), position.x(), position.y(), image.width(), image.height())
+        bytesCopied += image.sizeInBytes()
 
-        layerNode.setPixelData(QByteArray(ptr.asstring()), position.x(), position.y(), image.width(), image.height())
+        EKritaNode.__lastBytesCopied = bytesCopied
 
         if layerNeedBackConversion:
             layerNode.setColorSpace(layerColorModel, layerColorDepth, layerColorProfile)
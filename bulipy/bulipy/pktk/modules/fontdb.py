@@ -17,6 +17,8 @@
 #
 # According to number of font installed on computer, initialization can be a
 # little bit slow...
+# To reduce initialization time, fonts properties are stored in a cache file;
+# only new or modified font files are analyzed
 #
 # Main class from this module
 #
@@ -33,9 +35,11 @@ from PyQt5.QtGui import (
 import sys
 import re
 import os.path
+import json
 
 from .bytesrw import BytesRW
 from .utils import Debug
+from .workers import WorkerPool
 
 from ..pktk import *
 
@@ -50,6 +54,9 @@ class FontDatabase:
 
     __initialized = False
 
+    # fonts cache file format version
+    __CACHE_VERSION = 1
+
     # windows font path
     __WIN_PATHS = [r'c:\windows\fonts']
 
@@ -113,21 +120,103 @@ class FontDatabase:
                 return fullPathFileName
         return None
 
+    @staticmethod
+    def __cacheFileName():
+        """Return file name of fonts cache"""
+        return os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'pktk', 'fontdb.json')
+
+    @staticmethod
+    def __loadCache():
+        """Load fonts cache
+
+        Return a dictionary
+            key = font file name
+            value = dictionary {'size': file size, 'mtime': file modification time, 'font': font cache data or None}
+        """
+        try:
+            with open(FontDatabase.__cacheFileName(), 'r') as fHandle:
+                cache = json.load(fHandle)
+            if cache['version'] == FontDatabase.__CACHE_VERSION:
+                return cache['files']
+        except Exception:
+            # no cache, or invalid cache
+            pass
+        return {}
+
+    @staticmethod
+    def __saveCache(files):
+        """Save fonts cache"""
+        fileName = FontDatabase.__cacheFileName()
+        try:
+            os.makedirs(os.path.dirname(fileName), exist_ok=True)
+            with open(fileName, 'w') as fHandle:
+                json.dump({'version': FontDatabase.__CACHE_VERSION, 'files': files}, fHandle)
+        except Exception as e:
+            Debug.print('[FontDatabase.saveCache] unable to save file {0}: {1}', fileName, str(e))
+
+    @staticmethod
+    def __loadFontFile(index, fileName):
+        """Load font from given file name (called from worker pool)"""
+        font = Font(fileName)
+        if font.type() in (Font.TYPE_NOTREADABLE, Font.TYPE_UNKNOWN):
+            return None
+        return font
+
     @staticmethod
     def __loadFonts():
-        """Initialise database from fonts directories"""
+        """Initialise database from fonts directories
+
+        Fonts for which file size and modification time match cached values are
+        loaded from cache; others are analyzed in parallel
+        """
+        cachedFiles = FontDatabase.__loadCache()
+
         # scan all directories to look for fonts
-        fileList = []
+        # font file name -> {'size': file size, 'mtime': file modification time, 'font': font cache data or None}
+        files = {}
+        # font file name -> Font, or None if font file has to be analyzed
+        fonts = {}
+        # font files to analyze
+        toLoad = []
         for dirName in FontDatabase.__paths:
-            for path, subdirs, files in os.walk(dirName):
-                for name in files:
+            for path, subdirs, fileNames in os.walk(dirName):
+                for name in fileNames:
                     if re.search(r"\.(ttf|ttc|otf|otc|pfb)", name):
-                        # load font file
-                        font = Font(os.path.normpath(os.path.join(path, name)))
-
-                        if font.type() not in (Font.TYPE_NOTREADABLE, Font.TYPE_UNKNOWN):
-                            FontDatabase.__addFontFile(font)
-                            FontDatabase.__addFontName(font)
+                        fileName = os.path.normpath(os.path.join(path, name))
+                        if fileName in files:
+                            continue
+
+                        try:
+                            fileStat = os.stat(fileName)
+                        except Exception:
+                            continue
+
+                        cachedFile = cachedFiles.get(fileName)
+                        if cachedFile is not None and cachedFile['size'] == fileStat.st_size and cachedFile['mtime'] == fileStat.st_mtime:
+                            files[fileName] = cachedFile
+                            if cachedFile['font'] is None:
+                                fonts[fileName] = None
+                            else:
+                                fonts[fileName] = Font.fromCacheData(fileName, cachedFile['font'])
+                        else:
+                            files[fileName] = {'size': fileStat.st_size, 'mtime': fileStat.st_mtime, 'font': None}
+                            fonts[fileName] = None
+                            toLoad.append(fileName)
+
+        if len(toLoad) > 0:
+            for fileName, font in zip(toLoad, WorkerPool().map(toLoad, FontDatabase.__loadFontFile)):
+                fonts[fileName] = font
+                if font is not None:
+                    files[fileName]['font'] = font.cacheData()
+
+        # keep fonts directories scan order
+        for font in fonts.values():
+            if font is not None:
+                FontDatabase.__addFontFile(font)
+                FontDatabase.__addFontName(font)
+
+        if len(toLoad) > 0 or len(files) != len(cachedFiles):
+            FontDatabase.__saveCache(files)
 
     @staticmethod
     def __addFontFile(font):
@@ -670,6 +759,39 @@ class Font:
                 else:
                     self.__propStrings[recordUid[3]] = self.__reader.readStr(fntId_nameRecords[recordUid][Font.__RECORD_LENGTH], 'utf-8', 'ignore').strip()
 
+    @staticmethod
+    def fromCacheData(fileName, data):
+        """Return a Font initialised from given cache `data` (see cacheData())"""
+        propStrings = {}
+        for id, value in data['strings'].items():
+            id = int(id)
+            if id == Font.PROPERTY_COLLECTION_FONTS:
+                value = [Font.fromCacheData(fileName, fontData) for fontData in value]
+            propStrings[id] = value
+
+        return Font(fileName, {
+                '__propFontType': data['type'],
+                '__propEmbeddingState': data['embeddingState'],
+                '__propStrings': propStrings
+            })
+
+    def cacheData(self):
+        """Return font properties as a dictionary that can be serialized in json
+
+        Returned value can be used to initialise Font with fromCacheData()
+        """
+        strings = {}
+        for id, value in self.__propStrings.items():
+            if id == Font.PROPERTY_COLLECTION_FONTS:
+                value = [font.cacheData() for font in value]
+            strings[str(id)] = value
+
+        return {
+                'type': self.__propFontType,
+                'embeddingState': self.__propEmbeddingState,
+                'strings': strings
+            }
+
     def fileName(self):
         """Return font file name"""
         return self.__propFileName
@@ -30,6 +30,12 @@ from math import ceil
 import re
 import pickle
 
+try:
+    # optional, used to speed up some bytes processing when available
+    import numpy
+except Exception:
+    numpy = None
+
 from ..pktk import *
 
 
@@ -351,7 +357,12 @@ def combineChannels(bytesPerChannel, *channels):
         returned byte array will be
         (0xff, 0x03, 0x05,
          0x01, 0xff, 0x06,
-         0x02, 0x06, 0xff)
+         0x02, 0x04, 0xff)
+
+    If `bytesPerChannel` is greater than 1, all bytes of a channel value are
+    copied, in their original order
+
+    NumPy is used if available, otherwise bytearray extended slices are used
     """
     # First, need to ensure that all channels have the same size
     channelSize = None
@@ -361,20 +372,27 @@ def combineChannels(bytesPerChannel, *channels):
         elif channelSize != len(channel):
             raise EInvalidValue("All `channels` must have the same size")
 
-    channelCount = len(channels)
-    offsetTargetInc = channelCount*bytesPerChannel
-    targetSize = channelSize*offsetTargetInc
-    target = bytearray(targetSize)
+    if channelSize is None:
+        return bytearray()
+    elif channelSize % bytesPerChannel != 0:
+        raise EInvalidValue("Size of `channels` must be a multiple of `bytesPerChannel`")
 
-    channelNumber = 0
-    for channel in channels:
-        offsetTarget = channelNumber*bytesPerChannel
-        offsetSource = 0
-        for index in range(channelSize//bytesPerChannel):
-            target[offsetTarget] = channel[offsetSource]
-            offsetTarget += offsetTargetInc
-            offsetSource += bytesPerChannel
-        channelNumber += 1
+    channelCount = len(channels)
+    pixelSize = channelCount*bytesPerChannel
+    target = bytearray(channelSize*channelCount)
+
+    if numpy is not None:
+        # target is seen as an array of pixels, each channel is copied into its columns
+        targetArray = numpy.frombuffer(target, dtype=numpy.uint8).reshape(-1, pixelSize)
+        for channelNumber, channel in enumerate(channels):
+            offsetTarget = channelNumber*bytesPerChannel
+            targetArray[:, offsetTarget:offsetTarget+bytesPerChannel] = numpy.frombuffer(channel, dtype=numpy.uint8).reshape(-1, bytesPerChannel)
+    else:
+        # extended slices assignment: one loop iteration per channel byte instead of one per pixel
+        for channelNumber, channel in enumerate(channels):
+            for byteNumber in range(bytesPerChannel):
+                offsetTarget = channelNumber*bytesPerChannel+byteNumber
+                target[offsetTarget::pixelSize] = channel[byteNumber::bytesPerChannel]
 
     return target
 
@@ -76,6 +76,17 @@ class LanguageDef:
         """Return tokenizer for language"""
         return self.__tokenizer
 
+    def symbolTokenTypes(self):
+        """Return token types that declare a symbol (class, function, ...)
+
+        Returned value is a dictionary
+            key = token type
+            value = symbol kind (str)
+
+        By default, language don't declare symbols
+        """
+        return {}
+
     def setStyles(self, theme, styles):
         """Set styles for a given theme
 
@@ -32,13 +32,18 @@
 #
 # - ManagedResourcesModel
 #       A model for resources; use DBManagedResources to return data
+#       Thumbnails are built on demand for displayed rows, and stored in a disk
+#       cache; cached thumbnails are read in a worker thread
 #
 #
 # -----------------------------------------------------------------------------
 
 from enum import Enum
+import os
 import os.path
+import re
 import sys
+import time
 
 from krita import Resource
 
@@ -56,9 +61,20 @@ from PyQt5.QtSql import (QSqlDatabase, QSqlQuery)
 
 from .imgutils import checkerBoardImage
 from .iconsizes import IconSizes
+from .workers import WorkerPool
 from ..pktk import *
 
 
+def readThumbnailCacheFile(itemIndex, item):
+    """Read a thumbnail from disk cache (see ManagedResource.readThumbnailCacheFile())
+
+    Executed in a worker thread: `item` is a tuple (model generation, row, file name)
+
+    Return a tuple (model generation, row, file name, read thumbnail)
+    """
+    return (item[0], item[1], item[2], ManagedResource.readThumbnailCacheFile(item[2]))
+
+
 class ManagedResourceTypes(Enum):
     """Define identifier of available resources queries"""
     RES_GRADIENTS = "gradient"
@@ -80,13 +96,205 @@ class ManagedResourceTypes(Enum):
 
 
 class ManagedResource(object):
-    """A managed resource item"""
+    """A managed resource item
+
+    Thumbnail is built on first access, and stored in a disk cache (keyed by
+    resource md5 and thumbnail size) to be immediately available next time
+    """
+    # maximum size of thumbnails disk cache, in bytes
+    THUMBNAIL_CACHE_MAXBYTES = 64 * 1024 * 1024
+    # thumbnails not used since this number of days are removed from disk cache
+    THUMBNAIL_CACHE_MAXAGE = 30
+
+    @staticmethod
+    def thumbnailCachePath():
+        """Return path in which thumbnails are cached"""
+        return os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'pktk', 'resources')
+
+    @staticmethod
+    def readThumbnailCacheFile(fileName):
+        """Read thumbnail from given disk cache `fileName`
+
+        Can be executed in a worker thread (QImage only, no QPixmap)
+        File modification time is updated, to keep most recently used
+        thumbnails when cache is pruned (see pruneThumbnailCache())
+
+        Return a tuple (thumbnail as QImage, original image size as QSize)
+        or None if file doesn't exist or is not valid
+        """
+        if not os.path.isfile(fileName):
+            return None
+
+        image = QImage(fileName)
+        if image.isNull():
+            return None
+
+        try:
+            width, height = image.text('originalImgSize').split('x')
+            originalImgSize = QSize(int(width), int(height))
+        except Exception:
+            # invalid cached thumbnail
+            return None
+
+        try:
+            os.utime(fileName)
+        except Exception:
+            pass
+        return (image, originalImgSize)
+
+    @staticmethod
+    def pruneThumbnailCache(maxBytes=None, maxAge=None):
+        """Remove thumbnails from disk cache
+
+        Thumbnails not used since `maxAge` days are removed, then least
+        recently used thumbnails are removed until cache size is lower than
+        `maxBytes`
+
+        If not provided, THUMBNAIL_CACHE_MAXBYTES and THUMBNAIL_CACHE_MAXAGE
+        are used
+
+        Return number of removed files
+        """
+        if maxBytes is None:
+            maxBytes = ManagedResource.THUMBNAIL_CACHE_MAXBYTES
+        if maxAge is None:
+            maxAge = ManagedResource.THUMBNAIL_CACHE_MAXAGE
+
+        files = []
+        try:
+            with os.scandir(ManagedResource.thumbnailCachePath()) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+        except Exception:
+            # no cache
+            return 0
+
+        # most recently used first
+        files.sort(reverse=True)
+
+        minTime = time.time() - maxAge * 86400
+        toRemove = []
+        totalBytes = 0
+        for mtime, size, fileName in files:
+            totalBytes += size
+            if mtime < minTime or totalBytes > maxBytes:
+                toRemove.append(fileName)
+
+        return ManagedResource.__removeThumbnailCacheFiles(toRemove)
+
+    @staticmethod
+    def pruneThumbnailCacheOrphans(resourceType, md5List):
+        """Remove from disk cache thumbnails of given `resourceType` for which
+        resource md5 is not in given `md5List` (resource doesn't exist anymore
+        or has been modified) or thumbnail size is not current one
+
+        Return number of removed files
+        """
+        if not isinstance(resourceType, ManagedResourceTypes):
+            raise EInvalidType("Given `resourceType` must be a <ManagedResourceTypes>")
+
+        md5List = set(md5List)
+        thumbnailSize = str(ManagedResourcesModel.ICON_MAX_SIZE)
+        toRemove = []
+        try:
+            with os.scandir(ManagedResource.thumbnailCachePath()) as entries:
+                for entry in entries:
+                    # file name is "<type>-<md5>-<size>.png" (see thumbnailCacheFileName())
+                    if result := re.match(r"^([a-z]+)-([0-9a-fA-F]+)-(\d+)\.png$", entry.name):
+                        if result.group(1) == resourceType.value and (result.group(2) not in md5List or result.group(3) != thumbnailSize):
+                            toRemove.append(entry.path)
+        except Exception:
+            # no cache
+            return 0
+
+        return ManagedResource.__removeThumbnailCacheFiles(toRemove)
+
+    @staticmethod
+    def __removeThumbnailCacheFiles(fileNames):
+        """Remove given files from disk cache, return number of removed files"""
+        returned = 0
+        for fileName in fileNames:
+            try:
+                os.remove(fileName)
+                returned += 1
+            except Exception:
+                # can't remove file: not a problem, will be removed on next prune
+                pass
+        return returned
+
+    @staticmethod
+    def buildThumbnail(resourceType, resourceImg):
+        """Build normalized thumbnail from given resource image
+
+        Return a tuple (thumbnail as QPixmap, original image size as QSize)
+        or None if `resourceImg` is not valid
+        """
+        if not isinstance(resourceImg, QImage) or resourceImg.isNull():
+            return None
+
+        if resourceType == ManagedResourceTypes.RES_GRADIENTS:
+            # Gradient resources returns a 2048x1 image size
+            # need to:
+            #   - return a 384x192 thumbnail
+            #   - generate a checked background in case gradient has transparent value
+            pixmap = QPixmap(ManagedResourcesModel.ICON_MAX_SIZE << 1, ManagedResourcesModel.ICON_MAX_SIZE)
+
+            imgData = QPixmap.fromImage(resourceImg)
+            originalImgSize = imgData.size()
+            checkerBoard = checkerBoardImage(pixmap.size())
+
+            painter = QPainter(pixmap)
+            painter.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
+            painter.drawPixmap(0, 0, checkerBoard)
+            painter.drawPixmap(QRect(0, 0, pixmap.width(), pixmap.height()), imgData)
+            painter.end()
+        else:
+            # for PATTERNS, PRESET, PALETTE
+            #   - Always return a square pixmap for which dimension is at least 384x384
+            #   - For PATTERNS & PALETTE, if size if less than expected, upscale using nearest neighbor method
+            #   - For PRESET, if size if less than expected, upscale using bilinear method
+            #   - For PATTERNS, set a checkerboard background
+            #   - If thumbnail is not a square, center it
+            imgData = QPixmap.fromImage(resourceImg)
+            originalImgSize = imgData.size()
+
+            minDim = min(originalImgSize.width(), originalImgSize.height())
+            maxDim = max(originalImgSize.width(), originalImgSize.height(), ManagedResourcesModel.ICON_MAX_SIZE)
+
+            pixmap = QPixmap(maxDim, maxDim)
+
+            # ensure pixmap is transparent before starting to paint on it
+            pixmap.fill(Qt.transparent)
+
+            if resourceType == ManagedResourceTypes.RES_PRESETS:
+                imgData = imgData.scaled(pixmap.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                checkerBoard = None
+            else:
+                # need a checkerboard as background
+                imgData = imgData.scaled(pixmap.size(), Qt.KeepAspectRatio, Qt.FastTransformation)
+                checkerBoard = checkerBoardImage(imgData.size())
+
+            pX = (pixmap.width() - imgData.width())//2
+            pY = (pixmap.height() - imgData.height())//2
+
+            painter = QPainter(pixmap)
+            if checkerBoard:
+                painter.drawPixmap(pX, pY, checkerBoard)
+            painter.drawPixmap(pX, pY, imgData)
+            painter.end()
+
+        return (pixmap, originalImgSize)
 
     def __init__(self, value=None):
         """Given `value` can be a resource or a dict"""
         # internal Krita's resource Id
         self.__id = None
 
+        # resource md5, used as thumbnail cache key
+        self.__md5 = ''
+
         # resource name
         self.__name = ''
 
@@ -98,6 +306,8 @@ class ManagedResource(object):
 
         # normalized resource thumbnail (384x384 pixel square)
         self.__thumbnail = None
+        # thumbnail is built on demand
+        self.__thumbnailLoaded = False
 
         # resource native PNG data size
         self.__originalImgSize = QSize()
@@ -125,11 +335,15 @@ class ManagedResource(object):
 
         if isinstance(value, ManagedResource):
             self.__id = value.id()
+            self.__md5 = value.md5()
             self.__name = value.name()
             self.__fileName = value.fileName()
             self.__tooltip = value.tooltip()
-            self.__thumbnail = value.thumbnail()
-            self.__originalImgSize = value.originalImgSize()
+            self.__thumbnailLoaded = value.thumbnailLoaded()
+            if self.__thumbnailLoaded:
+                # if not loaded, don't force to build it now
+                self.__thumbnail = value.thumbnail()
+                self.__originalImgSize = value.originalImgSize()
             self.__tags = value.tags()
             self.__tagsId = value.tagsId()
             self.__resource = value.resource()
@@ -158,15 +372,24 @@ class ManagedResource(object):
             else:
                 self.__tooltip = self.__name
 
-            if 'thumbnail' in value and (isinstance(value['thumbnail'], QPixmap) or value['thumbnail'] is None):
-                self.__thumbnail = value['thumbnail']
-            else:
-                raise EInvalidType("Given `thumbnail` must be provided as a <QPixmap>")
+            if 'md5' in value:
+                if isinstance(value['md5'], str):
+                    self.__md5 = value['md5']
+                else:
+                    raise EInvalidType("Given `md5` must be provided as a <str>")
 
-            if 'originalImgSize' in value and isinstance(value['originalImgSize'], QSize):
-                self.__originalImgSize = value['originalImgSize']
-            else:
-                raise EInvalidType("Given `originalImgSize` must be provided as a <QSize>")
+            # if thumbnail is not provided, it will be built on demand
+            if 'thumbnail' in value:
+                if isinstance(value['thumbnail'], QPixmap) or value['thumbnail'] is None:
+                    self.__thumbnail = value['thumbnail']
+                    self.__thumbnailLoaded = True
+                else:
+                    raise EInvalidType("Given `thumbnail` must be provided as a <QPixmap>")
+
+                if 'originalImgSize' in value and isinstance(value['originalImgSize'], QSize):
+                    self.__originalImgSize = value['originalImgSize']
+                else:
+                    raise EInvalidType("Given `originalImgSize` must be provided as a <QSize>")
 
             if 'tags' in value and isinstance(value['tags'], list):
                 self.__tags = value['tags']
@@ -213,10 +436,44 @@ class ManagedResource(object):
     def __eq__(self, other):
         return other is not None and self.__type == other.__type and self.__id == other.__id
 
+    def __loadThumbnail(self):
+        """Load thumbnail from disk cache, or build it from resource"""
+        self.__thumbnailLoaded = True
+
+        fileName = self.thumbnailCacheFileName()
+        if fileName is not None:
+            if cached := ManagedResource.readThumbnailCacheFile(fileName):
+                self.__thumbnail = QPixmap.fromImage(cached[0])
+                self.__originalImgSize = cached[1]
+                return
+
+        if self.__resource is None:
+            return
+
+        thumbnail = ManagedResource.buildThumbnail(self.__type, self.__resource.image())
+        if thumbnail is None:
+            return
+
+        self.__thumbnail, self.__originalImgSize = thumbnail
+
+        if fileName is not None:
+            image = self.__thumbnail.toImage()
+            image.setText('originalImgSize', f"{self.__originalImgSize.width()}x{self.__originalImgSize.height()}")
+            try:
+                os.makedirs(os.path.dirname(fileName), exist_ok=True)
+                image.save(fileName, 'PNG')
+            except Exception:
+                # can't write cache: not a problem, thumbnail will be built again next time
+                pass
+
     def id(self):
         """return internal Krita's resource Id"""
         return self.__id
 
+    def md5(self):
+        """return resource md5"""
+        return self.__md5
+
     def name(self):
         """return resource name"""
         return self.__name
@@ -232,11 +489,41 @@ class ManagedResource(object):
     def thumbnail(self):
         """return resource thumbnail as a QPixmap
         (or None if is empty resource)
+
+        Thumbnail is built on first call
         """
+        if not self.__thumbnailLoaded:
+            self.__loadThumbnail()
         return self.__thumbnail
 
+    def thumbnailLoaded(self):
+        """return True if thumbnail is already available"""
+        return self.__thumbnailLoaded
+
+    def setThumbnail(self, thumbnail, originalImgSize):
+        """Set thumbnail (a QPixmap) and original image size (a QSize)
+
+        Used when thumbnail has been read from disk cache in a worker thread
+        """
+        if not isinstance(thumbnail, QPixmap):
+            raise EInvalidType("Given `thumbnail` must be a <QPixmap>")
+        if not isinstance(originalImgSize, QSize):
+            raise EInvalidType("Given `originalImgSize` must be a <QSize>")
+
+        self.__thumbnail = thumbnail
+        self.__originalImgSize = originalImgSize
+        self.__thumbnailLoaded = True
+
+    def thumbnailCacheFileName(self):
+        """Return file name of thumbnail in disk cache, None if thumbnail can't be cached"""
+        if self.__md5 == '' or self.__type is None:
+            return None
+        return os.path.join(ManagedResource.thumbnailCachePath(), f"{self.__type.value}-{self.__md5}-{ManagedResourcesModel.ICON_MAX_SIZE}.png")
+
     def originalImgSize(self):
         """return native PNG data size"""
+        if not self.__thumbnailLoaded:
+            self.__loadThumbnail()
         return self.__originalImgSize
 
     def tags(self):
@@ -343,6 +630,7 @@ class DBManagedResources(QObject):
             )
             -- return resources properties, using filtered resource view
             SELECT fr.id,
+                   r.md5sum AS "md5",
                    fr.name,
                    fr.fileName,
                    fr.tooltip,
@@ -519,6 +807,14 @@ class ManagedResourcesModel(QAbstractTableModel):
 
     ICON_MAX_SIZE = 384
 
+    # maximum duration (in milliseconds) of thumbnails generation per event loop iteration
+    THUMB_BUILD_DURATION = 20
+
+    # thumbnails disk cache is pruned once per session
+    __thumbnailCachePruned = False
+    # resource types for which orphan thumbnails have been removed from disk cache
+    __thumbnailCacheOrphansPruned = set()
+
     def __init__(self, parent=None):
         """Initialise list"""
         super(ManagedResourcesModel, self).__init__(parent)
@@ -527,6 +823,113 @@ class ManagedResourcesModel(QAbstractTableModel):
         self.__resourceType = None
         self.__displayName = True
 
+        # rows for which thumbnail has to be built from resource, as an ordered set
+        self.__pendingThumb = {}
+        self.__pendingThumbTimer = QTimer()
+        self.__pendingThumbTimer.setSingleShot(True)
+        self.__pendingThumbTimer.setInterval(0)
+        self.__pendingThumbTimer.timeout.connect(self.__buildPendingThumbnails)
+
+        # rows for which thumbnail has to be read from disk cache
+        #   key = row
+        #   value = True if row has been submitted to worker thread
+        self.__pendingRead = {}
+        self.__readRunning = False
+        # incremented on each model reset; rows read before reset are ignored
+        self.__readGeneration = 0
+        self.__readPool = WorkerPool()
+        self.__readPool.signals.processed.connect(self.__thumbnailRead)
+        self.__readPool.signals.finished.connect(self.__readFinished)
+
+        if not ManagedResourcesModel.__thumbnailCachePruned:
+            ManagedResourcesModel.__thumbnailCachePruned = True
+            ManagedResource.pruneThumbnailCache()
+
+    def __queueThumbnail(self, row):
+        """Queue thumbnail for given `row`
+
+        If thumbnail can be cached, it's read from disk cache in a worker
+        thread; otherwise (or if not found in cache) it's built from resource
+        in main thread, as Krita resources API is not thread safe
+        """
+        if row in self.__pendingThumb or row in self.__pendingRead:
+            return
+
+        if self.__items[row].thumbnailCacheFileName() is None:
+            self.__pendingThumb[row] = None
+            if not self.__pendingThumbTimer.isActive():
+                self.__pendingThumbTimer.start()
+        else:
+            self.__pendingRead[row] = False
+            self.__startRead()
+
+    def __startRead(self):
+        """Read pending thumbnails from disk cache in a worker thread"""
+        if self.__readRunning:
+            # rows will be read once current reading is finished
+            return
+
+        toRead = [(self.__readGeneration, row, self.__items[row].thumbnailCacheFileName()) for row, submitted in self.__pendingRead.items() if not submitted]
+        if len(toRead) == 0:
+            return
+
+        for generation, row, fileName in toRead:
+            self.__pendingRead[row] = True
+
+        self.__readRunning = True
+        self.__readPool.submit(toRead, readThumbnailCacheFile)
+
+    def __thumbnailRead(self, processed):
+        """A thumbnail has been read from disk cache"""
+        generation, row, fileName, cached = processed[1]
+        if generation != self.__readGeneration:
+            # read before model has been reset; row may have been queued again since reset
+            return
+        elif self.__pendingRead.pop(row, None) is None or row >= len(self.__items):
+            return
+
+        item = self.__items[row]
+        if item.thumbnailLoaded() or item.thumbnailCacheFileName() != fileName:
+            return
+        elif cached is None:
+            # not in cache: build it from resource
+            self.__pendingThumb[row] = None
+            if not self.__pendingThumbTimer.isActive():
+                self.__pendingThumbTimer.start()
+            return
+
+        item.setThumbnail(QPixmap.fromImage(cached[0]), cached[1])
+        index = self.index(row, ManagedResourcesModel.COLNUM_ICON)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def __readFinished(self):
+        """Reading of thumbnails from disk cache is finished; read rows queued meanwhile"""
+        self.__readRunning = False
+        self.__startRead()
+
+    def __buildPendingThumbnails(self):
+        """Build pending thumbnails from resources
+
+        Krita resources API is not thread safe: thumbnails are built in main
+        thread from event loop, during a limited time, to let view stay
+        responsive while thumbnails are built
+        """
+        timer = QElapsedTimer()
+        timer.start()
+
+        while len(self.__pendingThumb) > 0 and timer.elapsed() < ManagedResourcesModel.THUMB_BUILD_DURATION:
+            row = next(iter(self.__pendingThumb))
+            self.__pendingThumb.pop(row)
+
+            if row < len(self.__items):
+                # build thumbnail
+                self.__items[row].thumbnail()
+                index = self.index(row, ManagedResourcesModel.COLNUM_ICON)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+        if len(self.__pendingThumb) > 0:
+            self.__pendingThumbTimer.start()
+
     def columnCount(self, parent=QModelIndex()):
         """Return total number of column"""
         return ManagedResourcesModel.COLNUM_LAST+1
@@ -541,8 +944,12 @@ class ManagedResourcesModel(QAbstractTableModel):
         row = index.row()
 
         if role == Qt.DecorationRole:
-            if column == ManagedResourcesModel.COLNUM_ICON and self.__items[row].thumbnail() is not None:
-                return QIcon(self.__items[row].thumbnail())
+            if column == ManagedResourcesModel.COLNUM_ICON:
+                if not self.__items[row].thumbnailLoaded():
+                    # data are asked for displayed rows only: build thumbnail later
+                    self.__queueThumbnail(row)
+                elif self.__items[row].thumbnail() is not None:
+                    return QIcon(self.__items[row].thumbnail())
         elif role == Qt.ToolTipRole:
             txtTag = ''
             txtImg = ''
@@ -576,66 +983,10 @@ class ManagedResourcesModel(QAbstractTableModel):
         return None
 
     def updateResources(self, resourceType=None):
-        """Update resources from database"""
-        def resourceToQPixmap(resourceImg):
-            originalImgSize = None
-            pixmap = None
-            if not isinstance(resourceImg, QImage):
-                return pixmap
-
-            if self.__resourceType == ManagedResourceTypes.RES_GRADIENTS:
-                # Gradient resources returns a 2048x1 image size
-                # need to:
-                #   - return a 384x192 thumbnail
-                #   - generate a checked background in case gradient has transparent value
-                pixmap = QPixmap(ManagedResourcesModel.ICON_MAX_SIZE << 1, ManagedResourcesModel.ICON_MAX_SIZE)
-
-                imgData = QPixmap.fromImage(resourceImg)
-                originalImgSize = imgData.size()
-                checkerBoard = checkerBoardImage(pixmap.size())
-
-                painter = QPainter(pixmap)
-                painter.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
-                painter.drawPixmap(0, 0, checkerBoard)
-                painter.drawPixmap(QRect(0, 0, pixmap.width(), pixmap.height()), imgData)
-                painter.end()
-            else:
-                # for PATTERNS, PRESET, PALETTE
-                #   - Always return a square pixmap for which dimension is at least 384x384
-                #   - For PATTERNS & PALETTE, if size if less than expected, upscale using nearest neighbor method
-                #   - For PRESET, if size if less than expected, upscale using bilinear method
-                #   - For PATTERNS, set a checkerboard background
-                #   - If thumbnail is not a square, center it
-                imgData = QPixmap.fromImage(resourceImg)
-                originalImgSize = imgData.size()
-
-                minDim = min(originalImgSize.width(), originalImgSize.height())
-                maxDim = max(originalImgSize.width(), originalImgSize.height(), ManagedResourcesModel.ICON_MAX_SIZE)
-
-                pixmap = QPixmap(maxDim, maxDim)
-
-                # ensure pixmap is transparent before starting to paint on it
-                pixmap.fill(Qt.transparent)
-
-                if self.__resourceType == ManagedResourceTypes.RES_PRESETS:
-                    imgData = imgData.scaled(pixmap.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    checkerBoard = None
-                else:
-                    # need a checkerboard as background
-                    imgData = imgData.scaled(pixmap.size(), Qt.KeepAspectRatio, Qt.FastTransformation)
-                    checkerBoard = checkerBoardImage(imgData.size())
-
-                pX = (pixmap.width() - imgData.width())//2
-                pY = (pixmap.height() - imgData.height())//2
-
-                painter = QPainter(pixmap)
-                if checkerBoard:
-                    painter.drawPixmap(pX, pY, checkerBoard)
-                painter.drawPixmap(pX, pY, imgData)
-                painter.end()
-
-            return (pixmap, originalImgSize)
+        """Update resources from database
 
+        Thumbnails are not built here, but on demand
+        """
         if isinstance(resourceType, ManagedResourceTypes):
             self.__resourceType = resourceType
         elif resourceType is not None:
@@ -644,7 +995,16 @@ class ManagedResourcesModel(QAbstractTableModel):
         if self.__resourceType is None:
             return
 
+        # stop current reading before model is reset: waiting for workers
+        # process events, and views must not get data while model is reset
+        self.__pendingThumbTimer.stop()
+        self.__readPool.stopProcessing()
+
         self.beginResetModel()
+        # results of current reading (or started while waiting) are ignored
+        self.__readGeneration += 1
+        self.__pendingThumb = {}
+        self.__pendingRead = {}
         # query will return resources with their tags
         query = self.__dbResources.executeQuery(self.__resourceType)
         # get krita resource objects
@@ -665,14 +1025,12 @@ class ManagedResourcesModel(QAbstractTableModel):
                         # sort tags by name
                         tags.sort(key=lambda value: value[1])
 
-                    thumbnail, originalImgSize = resourceToQPixmap(kritaResources[query[1].value('name')].image())
                     self.__items.append(ManagedResource({
                             'id': query[1].value('id'),
+                            'md5': query[1].value('md5') or '',
                             'name': query[1].value('name'),
                             'fileName': query[1].value('fileName'),
                             'tooltip': query[1].value('tooltip'),
-                            'thumbnail': thumbnail,
-                            'originalImgSize': originalImgSize,
                             'tags': tags,
                             'resource': kritaResources[query[1].value('name')],
                             'type': self.__resourceType,
@@ -687,6 +1045,10 @@ class ManagedResourcesModel(QAbstractTableModel):
             print(err.nativeErrorCode())
         self.endResetModel()
 
+        if query[0] and self.__resourceType not in ManagedResourcesModel.__thumbnailCacheOrphansPruned:
+            ManagedResourcesModel.__thumbnailCacheOrphansPruned.add(self.__resourceType)
+            ManagedResource.pruneThumbnailCacheOrphans(self.__resourceType, [item.md5() for item in self.__items])
+
     def displayName(self):
         """Return if name is returned for display"""
         return self.__displayName
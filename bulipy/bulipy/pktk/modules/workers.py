@@ -18,39 +18,222 @@
 # - WorkerPool
 #       main class to manage multithreaded tasks
 #
+# - WorkerPoolFuture
+#       Result of a processing submitted to WorkerPool
+#
 # - Worker:
 #       A single worker that will do something in multithreaded process
 #       Basically, WorkerPool will instanciate one Worker per thread
 #
 # -----------------------------------------------------------------------------
 
+import os
 import re
+import sys
+import time
+import runpy
+import shutil
+import platform
+import threading
+import multiprocessing
+import multiprocessing.spawn
+import concurrent.futures
 
 from PyQt5.Qt import *
 from PyQt5.QtCore import (
         pyqtSignal as Signal,
         QEventLoop,
         QRunnable,
+        QThread,
         QThreadPool,
         QTimer
     )
 
+from .utils import Debug
+from . import workersinit
 from ..pktk import *
-from .timeutils import Timer
+
+
+def processContext():
+    """Return a tuple (multiprocessing context, python executable) to use to
+    start worker processes (WorkerPool.BACKEND_PROCESS), or (None, None) if no
+    context can be used
+
+    A multithreaded Qt application can't be safely forked: 'forkserver' start
+    method is used when available, otherwise 'spawn'
+
+    When embedded in Krita, sys.executable is Krita executable and can't be
+    used to start python worker processes: a python interpreter is searched in
+    PATH and returned executable is not None (see ProcessExecutable)
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+    else:
+        context = multiprocessing.get_context('spawn')
+
+    executable = None
+    if not re.match('python', os.path.basename(sys.executable), re.I):
+        executable = shutil.which('python3') or shutil.which('python')
+        if executable is None:
+            return (None, None)
+
+    return (context, executable)
+
+
+class ProcessExecutable:
+    """Context manager to temporary set python executable used to start
+    processes
+
+    Multiprocessing executable is not defined per context but for the whole
+    application (multiprocessing.spawn.set_executable()); to not impact other
+    plugins or scripts using multiprocessing, executable is restored on exit
+
+    Then, processes have to be started within context manager; 'forkserver'
+    server process is started with executable, and worker processes are forked
+    from it
+    """
+    __lock = threading.Lock()
+
+    def __init__(self, executable):
+        self.__executable = executable
+        self.__previous = None
+
+    def __enter__(self):
+        if self.__executable is not None:
+            ProcessExecutable.__lock.acquire()
+            self.__previous = multiprocessing.spawn.get_executable()
+            multiprocessing.spawn.set_executable(self.__executable)
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        if self.__executable is not None:
+            multiprocessing.spawn.set_executable(self.__previous)
+            ProcessExecutable.__lock.release()
+        return False
+
+
+def processPackages(callback):
+    """Return list of tuple (package name, package path) to declare in worker
+    processes for given `callback` (see workersinit module)
+    """
+    name = callback.__module__.split('.')[0]
+    if name != callback.__module__ and hasattr(sys.modules.get(name), '__path__'):
+        return [(name, list(sys.modules[name].__path__))]
+    return []
+
+
+def processChunk(callback, firstIndex, items, callbackArgv):
+    """Process a chunk of items in a worker process (WorkerPool.BACKEND_PROCESS)
+
+    Return list of results
+    """
+    return [callback(firstIndex + index, item, *callbackArgv) for index, item in enumerate(items)]
 
 
 class WorkerSignals(QObject):
-    processed = Signal(tuple)
+    processed = Signal(tuple)           # a chunk of items has been processed (first item index, list of results)
     finished = Signal()
     started = Signal()
 
 
 class WorkerPoolSignals(QObject):
-    processed = Signal(tuple)           # an item has been processed
+    processed = Signal(tuple)           # an item has been processed (item index, result, number of processed items)
+    progress = Signal(int, int)         # processing progress (number of processed items, total number of items); emitted at most every WorkerPool.PROGRESS_INTERVAL milliseconds
     finished = Signal()                 # pool has finished
     started = Signal()                  # pool has started (all workers started)
 
 
+class WorkerPoolFuture(QObject):
+    """Result of a processing submitted to WorkerPool
+
+    Allows to wait for processing without polling, get results and cancel
+    processing
+    """
+    finished = Signal()
+
+    def __init__(self, pool):
+        super(WorkerPoolFuture, self).__init__()
+        self.__pool = pool
+        self.__event = threading.Event()
+        self.__cancelled = False
+        self.__results = None
+        self.__exception = None
+
+    def _setDone(self, results, cancelled, exception=None):
+        """Called by WorkerPool when processing is finished"""
+        self.__results = results
+        self.__cancelled = cancelled
+        self.__exception = exception
+        self.__event.set()
+        self.finished.emit()
+
+    def done(self):
+        """Return True if processing is finished (or cancelled)"""
+        return self.__event.is_set()
+
+    def cancelled(self):
+        """Return True if processing has been cancelled"""
+        return self.__cancelled
+
+    def exception(self):
+        """Return exception raised by callback while processing items, or None
+
+        When an exception is raised, remaining items are not processed
+        """
+        return self.__exception
+
+    def cancel(self):
+        """Cancel processing
+
+        Workers stop after their current chunk of items
+        """
+        if not self.done():
+            self.__pool.stopProcessing()
+
+    def wait(self, timeout=None):
+        """Wait until processing is finished
+
+        If `timeout` (in milliseconds) is provided, wait at most given time
+
+        When called from main thread, Qt events are processed while waiting
+        (UI stays responsive); otherwise thread is blocked until processing is
+        finished
+
+        Return True if processing is finished, False if timeout occured
+        """
+        if self.__event.is_set():
+            return True
+
+        if QThread.currentThread() != self.thread():
+            if timeout is None:
+                return self.__event.wait()
+            return self.__event.wait(timeout / 1000)
+
+        loop = QEventLoop()
+        self.finished.connect(loop.quit)
+        if timeout is not None:
+            QTimer.singleShot(timeout, loop.quit)
+        # check again: processing may have finished before signal was connected
+        if not self.__event.is_set():
+            loop.exec()
+        self.finished.disconnect(loop.quit)
+        return self.__event.is_set()
+
+    def result(self, timeout=None):
+        """Wait until processing is finished and return results
+
+        Return None if processing is not finished after `timeout` milliseconds
+
+        If callback raised an exception while processing items, exception is
+        raised
+        """
+        if self.wait(timeout):
+            if self.__exception is not None:
+                raise self.__exception
+            return self.__results
+        return None
+
+
 class Worker(QRunnable):
     """"A worker designed to process data from WorkerPool
 
@@ -101,7 +284,12 @@ class Worker(QRunnable):
 
     @pyqtSlot()
     def run(self):
-        """Retrieve items from pool and process it
+        """Retrieve chunks of items from pool and process it
+
+        Chunk size is adapted to get a processing time close to
+        WorkerPool.CHUNK_DURATION: small items are processed by large chunks
+        (less lock contention) while long items are processed by small chunks
+        (stop processing is taken in account quickly)
 
         If there's no more item to process in list, exit
         """
@@ -109,40 +297,95 @@ class Worker(QRunnable):
         self.startEvent()
         self.signals.started.emit()
 
+        chunkSize = 1
         while not self.__pool.stopProcessingAsked():
-            # get next item from ppol
-            itemIndex, item = self.__pool.getNext()
-            if item is None:
+            # get next chunk of items from pool
+            firstIndex, items = self.__pool.getNextChunk(chunkSize)
+            if items is None:
                 # no more item to process
                 break
 
-            # need to understand why without this print statement,
-            # UI is unresponsive when long multi-threaded process is running
-            # :-/
-            #
-            # So a "null" print allow to do a print, without printing
-            print("\0", sep="", end="", flush=True)
+            startTime = time.perf_counter()
+            results = [None] * len(items)
+            try:
+                for index, item in enumerate(items):
+                    itemIndex = firstIndex + index
+                    item = self.processEvent(itemIndex, item)
+
+                    if self.__callback is not None:
+                        results[index] = self.__callback(itemIndex, item, *self.__callbackArgv)
+            except Exception as e:
+                # stop processing, exception is given to WorkerPoolFuture
+                self.__pool.chunkFailed(firstIndex, e)
+                break
+            duration = time.perf_counter() - startTime
+
+            self.__nbProcessed += len(items)
+            self.__pool.chunkProcessed(firstIndex, results)
+            self.signals.processed.emit((firstIndex, results))
 
-            item = self.processEvent(itemIndex, item)
+            # adapt chunk size
+            if duration < WorkerPool.CHUNK_DURATION / 2:
+                chunkSize = min(chunkSize * 2, WorkerPool.CHUNK_SIZE_MAX)
+            elif duration > WorkerPool.CHUNK_DURATION * 2 and chunkSize > 1:
+                chunkSize //= 2
 
-            if self.__callback is not None:
-                result = self.__callback(itemIndex, item, *self.__callbackArgv)
-            self.__nbProcessed += 1
-            self.signals.processed.emit((itemIndex, result))
+            # let other threads (and UI) run
+            QThread.yieldCurrentThread()
 
         self.stopEvent()
         self.signals.finished.emit()
+        self.__pool.workerFinished()
 
 
 class WorkerPool(QObject):
     """A worker pool allows to process data using pyqt multithreading
+
+    Items are given to workers by chunks, results are stored by workers and
+    available through a WorkerPoolFuture
+
+    Two backends are available:
+    - BACKEND_THREAD (default)
+        Items are processed by Worker instances in a QThreadPool
+        Pure python code is serialized by GIL, then this backend is mainly
+        interesting when callback release the GIL (I/O, Qt methods, ...)
+
+    - BACKEND_PROCESS
+        Items are processed in a local process pool; CPU-bound pure python
+        processing scale with number of cores
+        Callback, items, arguments and results must be picklable (callback
+        must be a module level function) and callback can't use Qt/Krita
+        objects; worker class (setWorkerClass()) is not used
+        Results are streamed back to Qt thread as chunks are processed
+        Worker processes are started on first processing, in a thread (UI is
+        not blocked while processes are starting)
+        If worker processes can't be started (see processContext()), pool
+        fallback to BACKEND_THREAD
+
+    If callback raise an exception, remaining items are not processed and
+    exception is available from WorkerPoolFuture (result() raise it)
     """
     __MAP_MODE_OFF = 0
     __MAP_MODE_ALL = 1
     __MAP_MODE_NONONE = 2
     __MAP_MODE_AGGREGATE = 3
 
-    def __init__(self, maxWorkerCount=None):
+    BACKEND_THREAD = 0
+    BACKEND_PROCESS = 1
+
+    # expected duration (in seconds) to process a chunk of items
+    CHUNK_DURATION = 0.01
+    # maximum number of items in a chunk
+    CHUNK_SIZE_MAX = 4096
+    # minimum interval (in milliseconds) between two progress signals
+    PROGRESS_INTERVAL = 100
+    # maximum time (in seconds) to wait for worker processes to start (BACKEND_PROCESS)
+    PROCESS_START_TIMEOUT = 10
+
+    __workersFinished = Signal()
+    __processesFailed = Signal(object, tuple)
+
+    def __init__(self, maxWorkerCount=None, backend=None):
         super(WorkerPool, self).__init__()
         self.__threadpool = QThreadPool()
         # self.__threadpool = QThreadPool.globalInstance()
@@ -158,41 +401,234 @@ class WorkerPool(QObject):
         self.__nbProcessed = 0
         self.__current = 0
         self.__started = 0
-        self.__allStarted = False
         self.__size = 0
         self.__nbWorkers = self.__maxWorkerCount
         self.__workers = []
         self.__stopProcess = False
+        self.__exception = None
         self.__dataList = []
         self.__results = []
+        # filtered results per chunk first item index (__MAP_MODE_NONONE)
+        self.__chunksResults = {}
         self.__mapResults = WorkerPool.__MAP_MODE_OFF
+        self.__processMapResults = WorkerPool.__MAP_MODE_OFF
         self.__workerClass = Worker
         self.__id = QUuid.createUuid().toString()
+        self.__future = None
+        self.__emitProcessed = False
+        self.__lastProgress = 0
+
+        if backend == WorkerPool.BACKEND_PROCESS:
+            self.__backend = WorkerPool.BACKEND_PROCESS
+        else:
+            self.__backend = WorkerPool.BACKEND_THREAD
+        # process pool executor, created on first processing (BACKEND_PROCESS)
+        self.__executor = None
+        # pending chunks futures (BACKEND_PROCESS)
+        self.__chunksFutures = []
+        # pool has been released without waiting (see shutdown())
+        self.__released = False
 
         self.signals = WorkerPoolSignals()
 
-    def __onProcessed(self, processedNfo):
-        """an item has been processed"""
-        self.__nbProcessed += 1
-        if self.__mapResults != WorkerPool.__MAP_MODE_OFF:
-            index, item = processedNfo
-            if self.__mapResults == WorkerPool.__MAP_MODE_ALL and index is not None:
-                self.__results[index] = item
-            elif self.__mapResults == WorkerPool.__MAP_MODE_NONONE and item is not None:
-                self.__results.append(item)
-            elif self.__mapResults == WorkerPool.__MAP_MODE_AGGREGATE and isinstance(item, dict):
-                for key in item:
-                    self.__results[key] += item[key]
-        self.signals.processed.emit((processedNfo[0], processedNfo[1], self.__nbProcessed))
+        self.__workersFinished.connect(self.__onFinished)
+        self.__processesFailed.connect(self.__onProcessesFailed)
 
     def __onFinished(self):
-        """Do something.. ?"""
-        self.__started -= 1
-        if self.__allStarted and self.__started == 0:
-            for worker in self.__workers:
-                worker.cleanupEvent()
-            self.__workers.clear()
-            self.signals.finished.emit()
+        """All workers have finished"""
+        for worker in self.__workers:
+            worker.cleanupEvent()
+        self.__workers.clear()
+
+        self.signals.progress.emit(self.__nbProcessed, self.__size)
+
+        self.__chunksFutures = []
+
+        if self.__processMapResults == WorkerPool.__MAP_MODE_NONONE:
+            # chunks are processed in any order: flatten filtered results in items order
+            for firstIndex in sorted(self.__chunksResults):
+                self.__results.extend(self.__chunksResults[firstIndex])
+            self.__chunksResults = {}
+
+        if isinstance(self.__exception, concurrent.futures.BrokenExecutor) and self.__executor is not None:
+            # a worker process has been terminated abruptly; executor can't be used anymore
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+
+        future = self.__future
+        self.__future = None
+        if future:
+            future._setDone(self.__results, self.__stopProcess, self.__exception)
+        self.signals.finished.emit()
+
+    def __onChunkDone(self, firstIndex, chunkFuture):
+        """A chunk has been processed by worker process (BACKEND_PROCESS)
+
+        Called from executor thread
+        """
+        if not chunkFuture.cancelled():
+            try:
+                results = chunkFuture.result()
+            except Exception as e:
+                self.chunkFailed(firstIndex, e)
+            else:
+                self.chunkProcessed(firstIndex, results)
+
+        self.workerFinished()
+
+    def __onProcessesFailed(self, callback, callbackArgv):
+        """Worker processes can't be started (BACKEND_PROCESS)
+
+        Pool backend is switched to BACKEND_THREAD, and items are processed by
+        workers threads
+        """
+        self.__backend = WorkerPool.BACKEND_THREAD
+        if not self.stopProcessingAsked():
+            self.__startWorkers(callback, callbackArgv)
+        # processes starter has finished
+        self.workerFinished()
+
+    def __createExecutor(self, callback):
+        """Create process pool executor (BACKEND_PROCESS)
+
+        Executed in a thread, to not block UI while processes are starting
+
+        Return None if worker processes can't be started
+        """
+        context, executable = processContext()
+        if context is None:
+            Debug.print('[WorkerPool.createExecutor] No python interpreter available to start worker processes')
+            return None
+
+        executor = None
+        try:
+            with ProcessExecutable(executable):
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.__maxWorkerCount,
+                                                                  mp_context=context,
+                                                                  initializer=runpy.run_path,
+                                                                  initargs=(workersinit.__file__, {'packages': processPackages(callback)}, workersinit.RUN_NAME))
+                # executor start processes on demand, when a task is submitted and no process is idle: as no
+                # process can be idle before first result, submitting one task per process start all processes
+                # while executable is set; results ensure worker processes are started with the same python version
+                pythonVersions = [executor.submit(platform.python_version) for index in range(self.__maxWorkerCount)]
+                pythonVersions = set(pythonVersion.result(WorkerPool.PROCESS_START_TIMEOUT) for pythonVersion in pythonVersions)
+            if pythonVersions == {platform.python_version()}:
+                return executor
+            Debug.print('[WorkerPool.createExecutor] Worker processes python version {0} mismatch {1}', pythonVersions, platform.python_version())
+        except Exception as e:
+            Debug.print('[WorkerPool.createExecutor] Unable to start worker processes: {0}', str(e))
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+        return None
+
+    def __startProcesses(self, callback, callbackArgv):
+        """Start processing with process pool executor (BACKEND_PROCESS)
+
+        Chunks are submitted from a thread, as worker processes have to be
+        started on first processing
+        """
+        # processes starter is counted as a worker, until chunks are submitted
+        self.__started = 1
+        self.__chunksFutures = []
+        threading.Thread(target=self.__submitChunks, args=(callback, callbackArgv), daemon=True).start()
+
+    def __submitChunks(self, callback, callbackArgv):
+        """Submit items to process pool executor (BACKEND_PROCESS)
+
+        Items are split in chunks, each chunk is processed by a process
+
+        Executed in a thread: executor is created if needed; if worker processes
+        can't be started, items are processed by thread workers
+        """
+        if self.__executor is None:
+            executor = self.__createExecutor(callback)
+            if executor is None:
+                self.__processesFailed.emit(callback, callbackArgv)
+                return
+
+            self.__mutex.lock()
+            released = self.__released
+            if not released:
+                self.__executor = executor
+            self.__mutex.unlock()
+
+            if released:
+                # pool has been released while processes were starting
+                executor.shutdown(wait=False)
+                self.workerFinished()
+                return
+
+        # more chunks than processes, to let processes get items until the end
+        chunkSize = max(1, min(WorkerPool.CHUNK_SIZE_MAX, self.__size // (self.__nbWorkers * 4)))
+        chunks = range(0, self.__size, chunkSize)
+
+        chunksFutures = []
+        self.__mutex.lock()
+        try:
+            # stopProcessing() cancel submitted chunks; don't submit anything if asked while processes were starting
+            if not self.__stopProcess:
+                for firstIndex in chunks:
+                    chunksFutures.append((firstIndex, self.__executor.submit(processChunk, callback, firstIndex, self.__dataList[firstIndex:firstIndex + chunkSize], callbackArgv)))
+        except Exception as e:
+            # executor can't be used anymore (BrokenProcessPool)
+            self.__exception = e
+        self.__chunksFutures = [chunkFuture for firstIndex, chunkFuture in chunksFutures]
+        self.__started += len(chunksFutures)
+        self.__mutex.unlock()
+
+        # callback is executed immediately if chunk is already done: add it once mutex is released
+        for firstIndex, chunkFuture in chunksFutures:
+            chunkFuture.add_done_callback(lambda chunkFuture, firstIndex=firstIndex: self.__onChunkDone(firstIndex, chunkFuture))
+
+        # processes starter has finished
+        self.workerFinished()
+
+    def __startWorkers(self, callback, callbackArgv):
+        """Start processing with Worker instances in thread pool (BACKEND_THREAD)"""
+        # initialise workers
+        for index in range(self.__nbWorkers):
+            self.__workers.append(self.__workerClass(self, callback, *callbackArgv))
+            self.__workers[index].setAutoDelete(True)
+
+        self.__mutex.lock()
+        self.__started += self.__nbWorkers
+        self.__mutex.unlock()
+
+        # start workers
+        for index in range(self.__nbWorkers):
+            self.__threadpool.start(self.__workers[index])
+
+    def backend(self):
+        """Return backend used by pool"""
+        return self.__backend
+
+    def shutdown(self, wait=True):
+        """Stop current processing and release worker processes (BACKEND_PROCESS)
+
+        If `wait` is False, return immediately: pending chunks are cancelled
+        and running chunks are finished in background; pool is released and
+        can't be used anymore
+        """
+        if wait:
+            self.stopProcessing()
+        else:
+            self.__mutex.lock()
+            self.__released = True
+            self.__stopProcess = True
+            chunksFutures = self.__chunksFutures
+            executor = self.__executor
+            self.__executor = None
+            self.__mutex.unlock()
+            for chunkFuture in chunksFutures:
+                chunkFuture.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            return
+
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
 
     def setWorkerClass(self, workerClass=None):
         """Set worker class to use
@@ -205,29 +641,118 @@ class WorkerPool(QObject):
             self.__workerClass = workerClass
 
     def stopProcessingAsked(self):
-        return self.__stopProcess
+        """Return True if workers have to stop (processing stopped, or an
+        exception has been raised by callback)
+        """
+        return self.__stopProcess or self.__exception is not None
 
     def getNext(self):
         """Get next item to process"""
+        returnedIndex, items = self.getNextChunk(1)
+        if items is None:
+            return (None, None)
+        return (returnedIndex, items[0])
+
+    def getNextChunk(self, chunkSize):
+        """Get next chunk of items to process
+
+        Given `chunkSize` is the maximum number of items to return; when there's
+        not many items left, returned chunk is smaller to let all workers get
+        items until the end
+
+        Return a tuple (first item index, list of items) or (None, None) if
+        there's no more item to process
+        """
         self.__mutex.lock()
 
-        if self.__current is None:
+        if self.__current >= self.__size:
             self.__mutex.unlock()
             return (None, None)
+
         returnedIndex = self.__current
-        self.__current += 1
+        chunkSize = max(1, min(chunkSize, (self.__size - self.__current) // self.__nbWorkers))
+        self.__current += chunkSize
 
-        if self.__current >= self.__size:
-            self.__current = None
+        self.__mutex.unlock()
+        return (returnedIndex, self.__dataList[returnedIndex:returnedIndex + chunkSize])
 
+    def chunkProcessed(self, firstIndex, results):
+        """Store results for a processed chunk of items
+
+        Called by workers
+        """
+        emitProgress = False
+
+        self.__mutex.lock()
+        if self.__processMapResults == WorkerPool.__MAP_MODE_ALL:
+            self.__results[firstIndex:firstIndex + len(results)] = results
+        elif self.__processMapResults == WorkerPool.__MAP_MODE_NONONE:
+            self.__chunksResults[firstIndex] = [result for result in results if result is not None]
+        elif self.__processMapResults == WorkerPool.__MAP_MODE_AGGREGATE:
+            for result in results:
+                if isinstance(result, dict):
+                    for key in result:
+                        self.__results[key] += result[key]
+
+        nbProcessed = self.__nbProcessed
+        self.__nbProcessed += len(results)
+
+        now = time.monotonic()
+        if (now - self.__lastProgress) * 1000 >= WorkerPool.PROGRESS_INTERVAL:
+            self.__lastProgress = now
+            emitProgress = True
         self.__mutex.unlock()
-        return (returnedIndex, self.__dataList[returnedIndex])
+
+        if self.__emitProcessed:
+            for index, result in enumerate(results):
+                nbProcessed += 1
+                self.signals.processed.emit((firstIndex + index, result, nbProcessed))
+
+        if emitProgress:
+            self.signals.progress.emit(self.__nbProcessed, self.__size)
+
+    def chunkFailed(self, firstIndex, exception):
+        """An exception has been raised while processing a chunk of items
+
+        Called by workers; first exception is kept and remaining items are not
+        processed
+        """
+        Debug.print('[WorkerPool.chunkFailed] chunk {0} failed: {1}', firstIndex, str(exception))
+
+        self.__mutex.lock()
+        if self.__exception is None:
+            self.__exception = exception
+        chunksFutures = self.__chunksFutures
+        self.__mutex.unlock()
+
+        for chunkFuture in chunksFutures:
+            chunkFuture.cancel()
+
+    def workerFinished(self):
+        """Called by workers when they've finished"""
+        self.__mutex.lock()
+        self.__started -= 1
+        allFinished = (self.__started == 0)
+        self.__mutex.unlock()
+
+        if allFinished:
+            self.__workersFinished.emit()
+
+    def submit(self, dataList, callback, *callbackArgv):
+        """Start processing of `dataList` items with `callback` function
+
+        Return a WorkerPoolFuture
+        """
+        return self.startProcessing(dataList, callback, *callbackArgv)
 
     def startProcessing(self, dataList, callback, *callbackArgv):
-        """Start all current thread execution"""
+        """Start all current thread execution
+
+        Return a WorkerPoolFuture, or None if processing can't be started
+        """
         # ensure to stop current processing before creating a new one
-        if self.__stopProcess is True:
-            return
+        if self.__stopProcess is True or self.__released:
+            return None
         else:
             self.stopProcessing()
 
@@ -236,63 +761,72 @@ class WorkerPool(QObject):
 
         self.__size = len(dataList)
 
-        if self.__size == 0:
-            return
-
-        self.__dataList = [v for v in dataList]
-
+        # map mode for current processing; self.__mapResults can be modified while processing is running
+        self.__processMapResults = self.__mapResults
         if self.__mapResults == WorkerPool.__MAP_MODE_ALL:
             self.__results = [None] * self.__size
         elif self.__mapResults != WorkerPool.__MAP_MODE_AGGREGATE:
             # already initialised by aggregate() method
             self.__results = []
+        self.__chunksResults = {}
+
+        self.__future = WorkerPoolFuture(self)
+
+        if self.__size == 0:
+            future = self.__future
+            self.__future = None
+            future._setDone(self.__results, False)
+            return future
+
+        if isinstance(dataList, list):
+            self.__dataList = dataList
+        else:
+            self.__dataList = [v for v in dataList]
 
         # if number of items to process is less than number of possible threads,
         # don't use all threads
         self.__nbWorkers = min(self.__size, self.__maxWorkerCount)
 
         self.__nbProcessed = 0
-        self.__started = 0
         self.__current = 0
+        self.__exception = None
+        self.__lastProgress = time.monotonic()
+        self.__emitProcessed = self.signals.receivers(self.signals.processed) > 0
         self.__workers.clear()
 
         # for test, force to 1 thread only
         # self.__nbWorkers = 1
 
-        self.__allStarted = False
-        # initialise workers
-        for index in range(self.__nbWorkers):
-            self.__workers.append(self.__workerClass(self, callback, *callbackArgv))
-            self.__workers[index].signals.processed.connect(self.__onProcessed)
-            self.__workers[index].signals.finished.connect(self.__onFinished)
-            self.__workers[index].setAutoDelete(True)
-
-        # start workers
-        for index in range(self.__nbWorkers):
-            self.__started += 1
-            self.__threadpool.start(self.__workers[index])
+        future = self.__future
+        if self.__backend == WorkerPool.BACKEND_PROCESS:
+            self.__startProcesses(callback, callbackArgv)
+        else:
+            self.__startWorkers(callback, callbackArgv)
 
-        self.__allStarted = True
         self.signals.started.emit()
-        if self.__started == 0:
-            self.__workers.clear()
-            self.signals.finished.emit()
-            self.__allStarted = False
+        return future
 
     def stopProcessing(self):
-        """Stop all current thread execution"""
-        if self.__started > 0:
+        """Stop all current thread execution
+
+        Workers stop after their current chunk of items
+        """
+        if self.__future is not None:
+            future = self.__future
+            self.__mutex.lock()
             self.__stopProcess = True
-            while self.__started > 0:
-                # check every 5ms if all thread are finished
-                Timer.sleep(5)
+            chunksFutures = self.__chunksFutures
+            self.__mutex.unlock()
+            for chunkFuture in chunksFutures:
+                # pending chunks are cancelled, running chunks are finished
+                chunkFuture.cancel()
+            future.wait()
             self.__stopProcess = False
 
     def waitProcessed(self):
         """Wait until all items in pool are processed"""
-        # why self.__threadpool.waitForDone() don't work??
-        while self.__started > 0:
-            Timer.sleep(1)
+        if self.__future is not None:
+            self.__future.wait()
 
     def map(self, dataList, callback, *callbackArgv):
         """Apply `callback` function to each item `datalist` list and return a list
@@ -304,15 +838,19 @@ class WorkerPool(QObject):
             return []
 
         self.__mapResults = WorkerPool.__MAP_MODE_ALL
-        self.startProcessing(dataList, callback, *callbackArgv)
-        self.waitProcessed()
+        future = self.startProcessing(dataList, callback, *callbackArgv)
         self.__mapResults = WorkerPool.__MAP_MODE_OFF
-        return self.__results
+        if future is None:
+            # processing can't be started (current processing is being stopped)
+            return []
+        return future.result()
 
     def mapNoNone(self, dataList, callback, *callbackArgv):
         """Apply `callback` function to each item `datalist` list and return a list
         If callback return None value, value is not added to result
 
+        Returned list keep `dataList` items order
+
         Similar to python map() method, but for Qt threads
             https://docs.python.org/3/library/multiprocessing.html#multiprocessing.pool.Pool.map
         """
@@ -320,10 +858,12 @@ class WorkerPool(QObject):
             return []
 
         self.__mapResults = WorkerPool.__MAP_MODE_NONONE
-        self.startProcessing(dataList, callback, *callbackArgv)
-        self.waitProcessed()
+        future = self.startProcessing(dataList, callback, *callbackArgv)
         self.__mapResults = WorkerPool.__MAP_MODE_OFF
-        return self.__results
+        if future is None:
+            # processing can't be started (current processing is being stopped)
+            return []
+        return future.result()
 
     def aggregate(self, dataList, returnedStruct, callback, *callbackArgv):
         """Apply `callback` function to each item `datalist` list and return a dictionary with aggregated
@@ -334,7 +874,9 @@ class WorkerPool(QObject):
 
         self.__mapResults = WorkerPool.__MAP_MODE_AGGREGATE
         self.__results = returnedStruct
-        self.startProcessing(dataList, callback, *callbackArgv)
-        self.waitProcessed()
+        future = self.startProcessing(dataList, callback, *callbackArgv)
         self.__mapResults = WorkerPool.__MAP_MODE_OFF
-        return self.__results
+        if future is None:
+            # processing can't be started (current processing is being stopped)
+            return returnedStruct
+        return future.result()
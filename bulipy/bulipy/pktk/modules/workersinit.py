@@ -0,0 +1,51 @@
+# -----------------------------------------------------------------------------
+# PyKritaToolKit
+# Copyright (C) 2019-2022 - Grum999
+# -----------------------------------------------------------------------------
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# https://spdx.org/licenses/GPL-3.0-or-later.html
+# -----------------------------------------------------------------------------
+# A Krita plugin framework
+# -----------------------------------------------------------------------------
+
+# -----------------------------------------------------------------------------
+# The workersinit module is executed in WorkerPool worker processes
+# (BACKEND_PROCESS) before any item is processed
+#
+# Worker processes are not forked: callback module is imported from scratch
+# and its top level package initialisation may need host application (plugin
+# package __init__ needs Krita); in this case package is declared without
+# being initialised, to let callback module be imported
+#
+# Module can't be imported by reference in worker process, as its package is
+# not yet declared: it's executed from its path by runpy.run_path() (picklable
+# by reference, as part of standard library) with a `packages` global
+# variable; then only python standard library must be used here
+# -----------------------------------------------------------------------------
+
+import importlib
+import sys
+import types
+
+# run_name given to runpy.run_path() by WorkerPool
+RUN_NAME = '__pktk_workersinit__'
+
+
+def declarePackages(packages):
+    """Ensure given `packages` can be imported
+
+    Given `packages` is a list of tuple (package name, package path); if a
+    package can't be imported, package is declared without being initialised
+    """
+    for name, path in packages:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            package = types.ModuleType(name)
+            package.__path__ = path
+            sys.modules[name] = package
+
+
+if __name__ == RUN_NAME:
+    declarePackages(packages)
@@ -30,6 +30,7 @@
 # From Qt documentation example "Code Editor"
 #  https://doc.qt.io/qtforpython-5.12/overviews/qtwidgets-widgets-codeeditor-example.html
 
+from bisect import bisect_right
 from math import ceil
 import re
 import time
@@ -60,11 +61,7 @@ from PyQt5.QtGui import (
         QPen,
         QKeySequence
     )
-from ..modules.listutils import (
-        EXTRASELECTION_FILTER_REMOVE,
-        sortExtraSelections,
-        filterExtraSelections
-    )
+from ..modules.listutils import sortExtraSelections
 from ..modules.languagedef import LanguageDef
 from ..modules.uitheme import (
         UITheme,
@@ -132,6 +129,46 @@ class WCodeEditorHighlightLineRule:
         raise EInvalidStatus("Abstract method must be overriden by class")
 
 
+class WCodeEditorSymbol:
+    """A symbol (class, function, ...) declared in editor's document"""
+
+    def __init__(self, name, kind, lineNumber, indent, parent=None):
+        self.__name = name
+        self.__kind = kind
+        self.__lineNumber = lineNumber
+        self.__indent = indent
+        self.__parent = parent
+
+    def __repr__(self):
+        return f"<WCodeEditorSymbol({self.__kind}, {self.fullName()}, {self.__lineNumber})>"
+
+    def name(self):
+        """Return symbol name"""
+        return self.__name
+
+    def fullName(self):
+        """Return symbol name, prefixed with parent scopes names"""
+        if self.__parent is None:
+            return self.__name
+        return f"{self.__parent.fullName()}.{self.__name}"
+
+    def kind(self):
+        """Return symbol kind, as defined by language definition"""
+        return self.__kind
+
+    def lineNumber(self):
+        """Return line number (start from 1) on which symbol is declared"""
+        return self.__lineNumber
+
+    def indent(self):
+        """Return indent of line on which symbol is declared"""
+        return self.__indent
+
+    def parent(self):
+        """Return parent symbol (scope in which symbol is declared), or None"""
+        return self.__parent
+
+
 class WCodeEditorBlockUserData(QTextBlockUserData):
     """Manage specific data linked to blocks"""
 
@@ -139,7 +176,16 @@ class WCodeEditorBlockUserData(QTextBlockUserData):
         super(WCodeEditorBlockUserData, self).__init__()
         self.__extraSelections = []
         self.__tokens = None
+        # block (revision, length) for which tokens have been checked
+        self.__tokensRevision = None
+        # tokens columns, used to search token from a column position
+        self.__tokensColumns = None
         self.__text = ''
+        # symbols declared in block, list of tuple (name, kind)
+        self.__symbols = []
+        # block (revision, length) for which spaces have been calculated
+        self.__spacesRevision = None
+        self.__spaces = (0, 0, 0, 0)
 
     def __del__(self):
         self.__extraSelections = []
@@ -163,6 +209,29 @@ class WCodeEditorBlockUserData(QTextBlockUserData):
     def setTokens(self, tokens):
         """Set tokens for block"""
         self.__tokens = tokens
+        self.__tokensColumns = None
+
+    def tokensRevision(self):
+        """Return block (revision, length) for which tokens are up to date"""
+        return self.__tokensRevision
+
+    def setTokensRevision(self, revision):
+        """Set block (revision, length) for which tokens are up to date"""
+        self.__tokensRevision = revision
+
+    def tokenAt(self, column):
+        """Return token at given `column` (start from 1), or None if there's no token"""
+        if not isinstance(self.__tokens, Tokens):
+            return None
+
+        tokens = self.__tokens.list()
+        if self.__tokensColumns is None:
+            self.__tokensColumns = [token.column() for token in tokens]
+
+        index = bisect_right(self.__tokensColumns, column) - 1
+        if index >= 0 and column < tokens[index].column() + tokens[index].length():
+            return tokens[index]
+        return None
 
     def text(self):
         """Return block text"""
@@ -172,20 +241,57 @@ class WCodeEditorBlockUserData(QTextBlockUserData):
         """Set block text"""
         self.__text = text
 
+    def symbols(self):
+        """Return symbols declared in block, as a list of tuple (name, kind)"""
+        return self.__symbols
+
+    def setSymbols(self, symbols):
+        """Set symbols declared in block"""
+        self.__symbols = symbols
+
+    def spaces(self, block):
+        """Return leading and trailing spaces for given `block`, as a tuple
+
+        0: int  text length
+        1: int  number of leading spaces
+        2: int  position of trailing spaces
+        3: int  number of trailing spaces
+
+        Values are calculated only when block content has been modified
+        """
+        revision = (block.revision(), block.length())
+        if revision != self.__spacesRevision:
+            text = block.text()
+            textLength = len(text)
+            nbSpacesRight = textLength - len(text.rstrip())
+            self.__spaces = (textLength,
+                             textLength - len(text.lstrip()),
+                             textLength - nbSpacesRight,
+                             nbSpacesRight)
+            self.__spacesRevision = revision
+        return self.__spaces
+
 
 class WCodeEditor(QPlainTextEdit):
     """Extended editor with syntax highlighting, autocompletion, line number..."""
 
     __LINENUMBER_PADDING = 3
 
-    __EXTRASELECTIONTYPE_CURRENTLINE =          0x00FF
-    __EXTRASELECTIONTYPE_HIGHLIGHTEDSEARCH =    SearchFromPlainTextEdit.EXTRASELECTIONTYPE_HIGHLIGHTEDSEARCH
-    __EXTRASELECTIONTYPE_CURRENTSEARCH =        SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH
+    # max duration (in ms) of a time slice used to apply highlighted lines rules
+    __LINESRULES_BUILD_DURATION = 20
+
+    # delay (in ms) after last symbol modification before symbolsChanged signal is emitted
+    __SYMBOLS_UPDATE_DELAY = 500
 
     __EXTRASELECTIONPROP_TYPE =                 QTextFormat.UserProperty
     __EXTRASELECTIONPROP_SHOWGUTTER =           QTextFormat.UserProperty + 0x0100
     __EXTRASELECTIONPROP_LINENUMBER =           QTextFormat.UserProperty + 0x0101
 
+    # extra selections layers; layers are rendered from lower to higher value
+    EXTRASELECTIONLAYER_LINESRULES =            0x0100
+    EXTRASELECTIONLAYER_HIGHLIGHTEDSEARCH =     SearchFromPlainTextEdit.EXTRASELECTIONTYPE_HIGHLIGHTEDSEARCH
+    EXTRASELECTIONLAYER_CURRENTSEARCH =         SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH
+
     cursorCoordinatesChanged = Signal(QPoint, QPoint, QPoint, int)  # cursor position, selection start position, selection end position, selection length
     overwriteModeChanged = Signal(bool)     # INS / OVR mode changed
     readOnlyModeChanged = Signal(bool)      # read-only mode changed
@@ -197,6 +303,8 @@ class WCodeEditor(QPlainTextEdit):
     textCopyToClipboard = Signal(str)
     textCutToClipboard = Signal(str)
 
+    symbolsChanged = Signal()               # symbols declared in document have been modified
+
     KEY_INDENT = 'indent'
     KEY_DEDENT = 'dedent'
     KEY_TOGGLE_COMMENT = 'toggleComment'
@@ -242,8 +350,6 @@ class WCodeEditor(QPlainTextEdit):
 
         # token currently under cursor
         self.__cursorToken = None
-        # tokens currently from cursor's row position
-        self.__cursorTokens = None
 
         # current cursor position
         self.__cursorCol = 0
@@ -273,6 +379,10 @@ class WCodeEditor(QPlainTextEdit):
         self.__optionMultiLine = True
 
         self.__optionCommentChar = '#'
+        # precompiled regular expressions for toggle comment action
+        self.__reIsCommented = None
+        self.__reComment = None
+        self.__updateCommentRegEx()
 
         # Gutter colors
         # maybe font size/type/style can be modified
@@ -309,8 +419,55 @@ class WCodeEditor(QPlainTextEdit):
         # allows key bindings
         self.__optionWheelSetFontSize = True
 
+        # extra selections, per layer
+        #   key = layer (EXTRASELECTIONLAYER_*)
+        #   value = list of extra selections
+        self.__extraSelectionsLayers = {}
+        # layers are merged once, when updates are done
+        self.__extraSelectionsTimer = QTimer()
+        self.__extraSelectionsTimer.setSingleShot(True)
+        self.__extraSelectionsTimer.setInterval(0)
+        self.__extraSelectionsTimer.timeout.connect(self.__applyExtraSelections)
+
+        # last updated current line rect, in viewport coordinates
+        # current line is not an extra selection, it's painted by paintEvent()
+        self.__currentLineRect = QRectF()
+
+        # symbols index, built from tokens
+        # token types that declare a symbol, from language definition
+        self.__symbolTokenTypes = {}
+        # symbols, indexed by block user data
+        #   key = id(WCodeEditorBlockUserData)
+        #   value = tuple (QTextCursor, list of tuple (name, kind))
+        self.__symbolsBlocks = {}
+        # symbols names
+        #   key = symbol name
+        #   value = set of keys from self.__symbolsBlocks
+        self.__symbolsNames = {}
+        # number of blocks in document, to detect removed blocks
+        self.__symbolsBlockCount = 1
+        # some blocks have been removed from document, symbols index need to be pruned
+        self.__symbolsPruneNeeded = False
+        # ordered list of WCodeEditorSymbol, built on demand
+        self.__symbolsList = None
+        self.__symbolsTimer = QTimer()
+        self.__symbolsTimer.setSingleShot(True)
+        self.__symbolsTimer.setInterval(WCodeEditor.__SYMBOLS_UPDATE_DELAY)
+        self.__symbolsTimer.timeout.connect(self.__symbolsTimerTimeout)
+
         # rules to highlight some lines
         self.__highlightedLinesRules = []
+        # highlighted lines, indexed by block user data
+        #   key = id(WCodeEditorBlockUserData)
+        #   value = tuple (signature, extra selections list)
+        self.__linesRulesSelections = {}
+        self.__linesRulesSelectionsModified = False
+        # blocks not visible in viewport are processed by time slices
+        self.__linesRulesPendingCursor = None
+        self.__linesRulesPendingTimer = QTimer()
+        self.__linesRulesPendingTimer.setSingleShot(True)
+        self.__linesRulesPendingTimer.setInterval(0)
+        self.__linesRulesPendingTimer.timeout.connect(self.__processPendingLinesRules)
 
         self.__shortCuts = {
             QKeySequence(Qt.Key_Tab): WCodeEditor.KEY_INDENT,
@@ -349,6 +506,7 @@ class WCodeEditor(QPlainTextEdit):
 
         # ---- initialise signals
         self.blockCountChanged.connect(self.__updateLineNumberAreaWidth)
+        self.document().contentsChange.connect(self.__contentsChange)
         self.updateRequest.connect(self.__updateLineNumberArea)
         self.cursorPositionChanged.connect(self.__highlightCurrentLine)
         self.textChanged.connect(self.__updateCurrentPositionAndToken)
@@ -409,11 +567,11 @@ class WCodeEditor(QPlainTextEdit):
             self.__cursorToken = None
             return
 
-        if self.__cursorRow != previousRow or self.__cursorTokens is None or force:
-            self.__cursorTokens = self.__languageDef.tokenizer().tokenize(cursor.block().text())
-
-        # row is always 1 here as tokenized text is only current row
-        self.__cursorToken = self.__cursorTokens.tokenAt(self.__cursorCol + 1, 1)
+        # use tokens from block, only updated if block content has been modified
+        block = cursor.block()
+        userData = self.__blockUserData(block)
+        self.__blockTokens(block, userData)
+        self.__cursorToken = userData.tokenAt(self.__cursorCol + 1)
 
         selectionStart = cursor.selectionStart()
         selectionEnd = cursor.selectionEnd()
@@ -547,60 +705,310 @@ class WCodeEditor(QPlainTextEdit):
             if rect.contains(self.viewport().rect()):
                 self.__updateLineNumberAreaWidth(0)
 
-    def __highlightCurrentLine(self):
-        """When the cursor position changes, highlight the current line (the line containing the cursor)"""
-        # manage
-        extraSelections = self.extraSelections()
-
-        position = 0
-        # remove current selection from extra selection list
-        # => can't clear selection as maybe, there's other extra selection
-        for index, selection in enumerate(extraSelections):
-            if selection.format.property(WCodeEditor.__EXTRASELECTIONPROP_TYPE) == WCodeEditor.__EXTRASELECTIONTYPE_CURRENTLINE:
-                # found, remove it and exit, no need to continue to search there's normaly only
-                # one extra selection like this one
-                extraSelections.remove(selection)
-                position = index
-                break
+    def __currentLineViewportRect(self):
+        """Return rect of current line (the line containing the cursor), in viewport coordinates"""
+        cursor = self.textCursor()
+        block = cursor.block()
+        rect = self.blockBoundingGeometry(block).translated(self.contentOffset())
 
-        if self.__optionMultiLine and not self.isReadOnly():
-            selection = QTextEdit.ExtraSelection()
+        line = block.layout().lineForTextPosition(cursor.positionInBlock())
+        if line.isValid():
+            # with line wrap, only highlight the line on which cursor is
+            return QRectF(0, rect.top() + line.y(), self.viewport().width(), line.height())
+        return QRectF(0, rect.top(), self.viewport().width(), rect.height())
+
+    def __highlightCurrentLine(self):
+        """When the cursor position changes, highlight the current line (the line containing the cursor)
 
-            selection.format.setBackground(self.__optionColorHighlightedLine)
-            selection.format.setProperty(QTextFormat.FullWidthSelection, True)
-            selection.format.setProperty(WCodeEditor.__EXTRASELECTIONPROP_TYPE, WCodeEditor.__EXTRASELECTIONTYPE_CURRENTLINE)
-            selection.cursor = self.textCursor()
+        Current line is painted by paintEvent(), here only previous and new
+        current line areas are updated
+        """
+        if not self.__currentLineRect.isNull():
+            self.viewport().update(self.__currentLineRect.toAlignedRect())
 
-            # insert extra selection to initial position in list
-            extraSelections.insert(position, selection)
+        self.__currentLineRect = self.__currentLineViewportRect()
+        self.viewport().update(self.__currentLineRect.toAlignedRect())
 
-        self.setExtraSelections(extraSelections)
         self.__updateCurrentPositionAndToken(False)
 
+    def __applyExtraSelections(self):
+        """Merge extra selections layers and apply them to editor"""
+        if self.__linesRulesSelectionsModified:
+            self.__applyLinesRulesSelections()
+
+        extraSelections = []
+        for layer in sorted(self.__extraSelectionsLayers.keys()):
+            extraSelections += self.__extraSelectionsLayers[layer]
+        super(WCodeEditor, self).setExtraSelections(extraSelections)
+
+    def __blockUserData(self, block):
+        """Return user data for given `block`, created if not exists"""
+        userData = block.userData()
+        if not userData:
+            userData = WCodeEditorBlockUserData()
+            block.setUserData(userData)
+        return userData
+
+    def __blockTokens(self, block, userData):
+        """Return tokens for given `block`
+
+        Block is tokenized only if its content has been modified since last call
+
+        Block revision is not enough to detect modifications: when content is
+        replaced (setPlainText()), first block is cleared then filled within
+        the same revision, then block length is checked too
+        """
+        revision = (block.revision(), block.length())
+        if userData.tokensRevision() != revision:
+            blockText = block.text()
+            if userData.text() != blockText:
+                if self.__languageDef is None:
+                    return None
+                # text changed, update tokens
+                userData.setTokens(self.__languageDef.tokenizer().tokenize(blockText))
+                userData.setText(blockText)
+            userData.setTokensRevision(revision)
+        return userData.tokens()
+
+    def __updateBlockSymbols(self, block, userData, tokens):
+        """Update symbols index for given block
+
+        Block that starts inside a multiline token (state of previous block set
+        by highlighter, for example a python long string) doesn't declare any
+        symbol
+        """
+        symbols = []
+        if tokens is not None and len(self.__symbolTokenTypes) and block.previous().userState() <= 0:
+            for token in tokens.list():
+                if kind := self.__symbolTokenTypes.get(token.type()):
+                    symbols.append((token.text(), kind))
+
+        key = id(userData)
+        current = self.__symbolsBlocks.get(key)
+        if current is None:
+            if len(symbols) == 0:
+                return
+        elif current[1] == symbols and current[1] is userData.symbols():
+            # symbols unchanged; ensure cursor still reference the block
+            if current[0].block() != block:
+                self.__symbolsBlocks[key] = (QTextCursor(block), current[1])
+                self.__symbolsUpdated()
+            return
+        else:
+            self.__removeBlockSymbols(key)
+
+        userData.setSymbols(symbols)
+        if len(symbols):
+            self.__symbolsBlocks[key] = (QTextCursor(block), symbols)
+            for name, kind in symbols:
+                self.__symbolsNames.setdefault(name, set()).add(key)
+
+        self.__symbolsUpdated()
+
+    def __removeBlockSymbols(self, key):
+        """Remove symbols for given key from symbols index"""
+        if current := self.__symbolsBlocks.pop(key, None):
+            for name, kind in current[1]:
+                if keys := self.__symbolsNames.get(name):
+                    keys.discard(key)
+                    if len(keys) == 0:
+                        self.__symbolsNames.pop(name)
+
+    def __symbolsBlock(self, key):
+        """Return block for given symbols index key
+
+        If block is not valid anymore (removed from document), key is removed
+        from index and None is returned
+        """
+        cursor, symbols = self.__symbolsBlocks[key]
+        block = cursor.block()
+        userData = block.userData()
+        if userData is None or userData.symbols() is not symbols:
+            self.__removeBlockSymbols(key)
+            self.__symbolsUpdated()
+            return None
+        return block
+
+    def __contentsChange(self, position, removed, added):
+        """Called on signal document.contentsChange()
+
+        Only check if number of blocks has changed: line numbers of symbols
+        have to be updated; if blocks have been removed from document (a
+        multi-lines selection has been deleted for example) symbols index is
+        pruned once, when symbols timer is triggered
+        """
+        blockCount = self.document().blockCount()
+        if blockCount != self.__symbolsBlockCount and len(self.__symbolsBlocks):
+            if blockCount < self.__symbolsBlockCount:
+                self.__symbolsPruneNeeded = True
+            self.__symbolsUpdated()
+        self.__symbolsBlockCount = blockCount
+
+    def __pruneSymbols(self):
+        """Remove from symbols index blocks that have been removed from document"""
+        self.__symbolsPruneNeeded = False
+        for key in list(self.__symbolsBlocks.keys()):
+            self.__symbolsBlock(key)
+
+    def __symbolsTimerTimeout(self):
+        """Symbols have been modified, prune index if needed and emit signal"""
+        if self.__symbolsPruneNeeded:
+            self.__pruneSymbols()
+            # pruning restart timer, signal is emitted now
+            self.__symbolsTimer.stop()
+        self.symbolsChanged.emit()
+
+    def __symbolsUpdated(self):
+        """Symbols index has been modified"""
+        self.__symbolsList = None
+        self.__symbolsTimer.start()
+
+    def __visibleBlocks(self):
+        """Return a generator on blocks visible in viewport"""
+        block = self.firstVisibleBlock()
+        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+        bottom = self.viewport().rect().bottom()
+
+        while block.isValid() and top <= bottom:
+            yield block
+            top += self.blockBoundingRect(block).height()
+            block = block.next()
+
     def __rehighlightLinesRules(self):
-        """Re-apply highlight rules"""
-        cursorLine = self.textCursor().block().firstLineNumber()
+        """Re-apply highlight rules
+
+        Blocks visible in viewport are processed immediately, other blocks are
+        processed by time slices
+        """
+        currentBlock = self.textCursor().block()
+        for block in self.__visibleBlocks():
+            self.checkIfHighlighted(block, block == currentBlock)
+
+        self.__linesRulesPendingCursor = QTextCursor(self.document().firstBlock())
+        self.__linesRulesPendingTimer.start()
+
+    def __processPendingLinesRules(self):
+        """Apply highlight rules on pending blocks, until time slice is consumed"""
+        if self.__linesRulesPendingCursor is None:
+            return
 
-        block = self.document().firstBlock()
-        while block.isValid():
-            notCurrentLine = (block.blockNumber() != cursorLine)
-            self.checkIfHighlighted(block, not notCurrentLine)
+        currentBlock = self.textCursor().block()
+        block = self.__linesRulesPendingCursor.block()
+
+        timer = QElapsedTimer()
+        timer.start()
+        while block.isValid() and timer.elapsed() < WCodeEditor.__LINESRULES_BUILD_DURATION:
+            self.checkIfHighlighted(block, block == currentBlock)
             block = block.next()
 
-    def __isEmptyBlock(self, blockNumber):
-        """Check is line for current block is empty or not"""
-        # get block text
-        cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.Start)
-        cursor.movePosition(QTextCursor.NextBlock, n=blockNumber)
-        cursor.movePosition(QTextCursor.StartOfLine)
-        cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.KeepAnchor)
-        text = cursor.selectedText()
-        if text.strip() == "":
-            return True
+        if block.isValid():
+            self.__linesRulesPendingCursor.setPosition(block.position())
+            self.__linesRulesPendingTimer.start()
         else:
+            self.__linesRulesPendingCursor = None
+
+    def __updateBlockLinesRules(self, block, userData, tokens, isCurrentLine):
+        """Apply highlighted lines rules to given block
+
+        Return True if highlighting for block has been modified
+        """
+        key = id(userData)
+        signature = []
+        selections = []
+        lineNumber = block.blockNumber()
+        for rule in self.__highlightedLinesRules:
+            if toApply := rule.highlight(block, tokens, lineNumber, isCurrentLine):
+                selection = QTextEdit.ExtraSelection()
+
+                selection.format.setBackground(toApply[1])
+                selection.format.setProperty(QTextFormat.FullWidthSelection, True)
+                selection.format.setProperty(WCodeEditor.__EXTRASELECTIONPROP_TYPE, toApply[0])
+                selection.format.setProperty(WCodeEditor.__EXTRASELECTIONPROP_SHOWGUTTER, toApply[2])
+                selection.format.setProperty(WCodeEditor.__EXTRASELECTIONPROP_LINENUMBER, lineNumber)
+                selection.cursor = QTextCursor(block)
+
+                signature.append((toApply[0], QColor(toApply[1]).rgba(), toApply[2]))
+                selections.append(selection)
+
+        current = self.__linesRulesSelections.get(key)
+        if current is None:
+            if len(selections) == 0:
+                # nothing before, nothing now
+                return False
+        elif current[0] == signature and current[1] is userData.extraSelections():
+            # highlighting unchanged
             return False
 
+        sortExtraSelections(selections)
+        userData.setExtraSelections(selections)
+
+        if len(selections):
+            self.__linesRulesSelections[key] = (signature, selections)
+        else:
+            self.__linesRulesSelections.pop(key, None)
+
+        self.__linesRulesSelectionsModified = True
+        self.__extraSelectionsTimer.start()
+        return True
+
+    def __updateHighlightedLines(self):
+        """Re-apply highlighted lines rules to lines currently highlighted"""
+        currentBlock = self.textCursor().block()
+        for key in list(self.__linesRulesSelections.keys()):
+            selections = self.__linesRulesSelections[key][1]
+            block = selections[0].cursor.block()
+            userData = block.userData()
+            if userData is None or userData.extraSelections() is not selections:
+                self.__linesRulesSelections.pop(key)
+            else:
+                self.__updateBlockLinesRules(block, userData, userData.tokens(), block == currentBlock)
+
+    def __applyLinesRulesSelections(self):
+        """Rebuild extra selections layer for highlighted lines"""
+        extraSelections = []
+        for key in list(self.__linesRulesSelections.keys()):
+            selections = self.__linesRulesSelections[key][1]
+            # when a block is removed from document, selection cursor is moved to
+            # another block: in this case, selections are not valid anymore
+            userData = selections[0].cursor.block().userData()
+            if userData is None or userData.extraSelections() is not selections:
+                self.__linesRulesSelections.pop(key)
+            else:
+                extraSelections += selections
+
+        sortExtraSelections(extraSelections)
+        self.__extraSelectionsLayers[WCodeEditor.EXTRASELECTIONLAYER_LINESRULES] = extraSelections
+        self.__linesRulesSelectionsModified = False
+        self.__lineNumberArea.update()
+
+    def __updateCommentRegEx(self):
+        """Compile regular expressions used to comment/uncomment lines"""
+        commentChar = re.escape(self.__optionCommentChar)
+        self.__reIsCommented = re.compile(fr'^\s*{commentChar}')
+        self.__reComment = re.compile(fr'({commentChar}+\s*)')
+
+    def __selectedBlocks(self, selectionStart, selectionEnd, forceLastBlock=False):
+        """Return a generator on blocks for given selection
+
+        Blocks are walked once, from first to last selected block
+        Last block is returned only if at least one character is selected on it,
+        or if `forceLastBlock` is True
+        """
+        document = self.document()
+        block = document.findBlock(selectionStart)
+        lastBlock = document.findBlock(selectionEnd)
+        lastBlockNumber = lastBlock.blockNumber()
+
+        if not (forceLastBlock or selectionEnd > lastBlock.position()):
+            # nothing selected on last line, don't process it
+            lastBlockNumber -= 1
+
+        while block.isValid() and block.blockNumber() <= lastBlockNumber:
+            # next block is determined after yield, as caller can modify the
+            # current block content
+            yield block
+            block = block.next()
+
     def __calculateIndent(self, position):
         """Calculate indent to apply according to current position"""
         indentValue = ceil(position/self.__optionIndentWidth)*self.__optionIndentWidth - position
@@ -764,6 +1172,14 @@ class WCodeEditor(QPlainTextEdit):
 
     def paintEvent(self, event):
         """Customize painting"""
+        if self.__optionMultiLine and not self.isReadOnly():
+            # current line is painted before text and extra selections
+            currentLineRect = self.__currentLineViewportRect()
+            if currentLineRect.intersects(QRectF(event.rect())):
+                painter = QPainter(self.viewport())
+                painter.fillRect(currentLineRect, self.__optionColorHighlightedLine)
+                painter.end()
+
         super(WCodeEditor, self).paintEvent(event)
 
         if not(self.__optionRightLimitVisible or self.__optionShowSpaces or self.__optionShowIndentLevel):
@@ -794,17 +1210,15 @@ class WCodeEditor(QPlainTextEdit):
 
         painter.setPen(self.__optionSpacesColor)
         previousIndent = 0
+        # leading spaces of next non empty block, shared by consecutive empty blocks
+        # (None: not yet calculated)
+        nextIndent = None
 
         while block.isValid() and top <= event.rect().bottom():
             # Check if the block is visible in addition to check if it is in the areas viewport
             #   a block can, for example, be hidden by a window placed over the text edit
             if block.isVisible() and bottom >= event.rect().top():
-                result = re.search(r"(\s*)$", block.text())
-                posSpacesRight = 0
-                nbSpacesLeft = len(re.match(r"(\s*)", block.text()).groups()[0])
-                nbSpacesRight = len(result.groups()[0])
-                if nbSpacesRight > 0:
-                    posSpacesRight = result.start()
+                textLength, nbSpacesLeft, posSpacesRight, nbSpacesRight = self.__blockUserData(block).spaces(block)
 
                 left = leftOffset
 
@@ -823,23 +1237,24 @@ class WCodeEditor(QPlainTextEdit):
                     # draw level indent
                     if nbSpacesLeft > 0 or previousIndent > 0:
                         # if spaces or previous indent, check if level indent have to be drawn
-                        if len(block.text()) == 0:
+                        if textLength == 0:
                             # current block is empty (even no spaces)
                             # look forward for next block with level > 0
                             # if found, keep current indent otherwhise, no indent
-                            nBlockText = block.next()
-                            while nBlockText.blockNumber() > -1 and nBlockText.isVisible():
-                                if nBlockText is None:
-                                    break
-                                if len(nBlockText.text()) > 0:
-                                    nNbSpacesLeft = len(re.match(r"(\s*)", nBlockText.text()).groups()[0])
-                                    if nNbSpacesLeft == 0:
-                                        nbSpacesLeft = 0
-                                    else:
-                                        nbSpacesLeft = previousIndent
-                                    break
-                                nBlockText = nBlockText.next()
-                        elif len(block.text().strip()) == 0:
+                            if nextIndent is None:
+                                # look forward only once for consecutive empty blocks
+                                nextIndent = 0
+                                nBlockText = block.next()
+                                while nBlockText.isValid() and nBlockText.isVisible():
+                                    nTextLength, nNbSpacesLeft, nPosSpacesRight, nNbSpacesRight = self.__blockUserData(nBlockText).spaces(nBlockText)
+                                    if nTextLength > 0:
+                                        nextIndent = nNbSpacesLeft
+                                        break
+                                    nBlockText = nBlockText.next()
+
+                            if nextIndent > 0:
+                                nbSpacesLeft = previousIndent
+                        elif nbSpacesLeft == textLength:
                             # current block is only spaces, then draw level indent
                             nbSpacesLeft = max(previousIndent, nbSpacesLeft)
                         else:
@@ -849,11 +1264,14 @@ class WCodeEditor(QPlainTextEdit):
                         nbChar = self.__optionIndentWidth
                         while nbChar < nbSpacesLeft:
                             position = round(self.__fWidth * nbChar) + leftOffset
-                            painter.drawLine(QLineF(position, top, position, top + self.blockBoundingRect(block).height() - 1))
+                            painter.drawLine(QLineF(position, top, position, bottom - 1))
                             nbChar += self.__optionIndentWidth
-                    elif len(block.text().strip()) > 0:
+                    elif nbSpacesLeft < textLength:
                         previousIndent = 0
 
+                if textLength > 0:
+                    nextIndent = None
+
             block = block.next()
             top = bottom
             bottom = top + self.blockBoundingRect(block).height()
@@ -864,6 +1282,8 @@ class WCodeEditor(QPlainTextEdit):
         super(WCodeEditor, self).setReadOnly(value)
 
         if value != ro:
+            # current line highlighting depends on read-only mode
+            self.__highlightCurrentLine()
             self.readOnlyModeChanged.emit(value)
 
     def insertFromMimeData(self, source):
@@ -976,60 +1396,81 @@ class WCodeEditor(QPlainTextEdit):
 
     def checkIfHighlighted(self, block, isCurrentLine):
         """Check if block line have to be highlighted, and update extra selection if needed"""
-        extraSelections = self.extraSelections()
-        newExtraSelection = []
+        userData = self.__blockUserData(block)
+        tokens = self.__blockTokens(block, userData)
 
-        blockText = block.text()
+        if len(self.__symbolTokenTypes) or id(userData) in self.__symbolsBlocks:
+            self.__updateBlockSymbols(block, userData, tokens)
 
-        userData = block.userData()
-        if userData:
-            userDataExtraSelection = userData.extraSelections()
-        else:
-            userDataExtraSelection = []
-            userData = WCodeEditorBlockUserData()
-            block.setUserData(userData)
+        if len(self.__highlightedLinesRules) or id(userData) in self.__linesRulesSelections:
+            self.__updateBlockLinesRules(block, userData, tokens, isCurrentLine)
 
-        if userData.text() == blockText:
-            # text unchanged, use tokens
-            tokens = userData.tokens()
-        elif self.__languageDef is not None:
-            # text changed, update tokens
-            tokens = self.__languageDef.tokenizer().tokenize(blockText)
-            userData.setTokens(tokens)
-            userData.setText(blockText)
-        else:
-            tokens = None
-
-        if len(self.__highlightedLinesRules):
-            updated = False
-            lineNumber = block.blockNumber()
-            for rule in self.__highlightedLinesRules:
-                filterExtraSelections(userDataExtraSelection, lineNumber, EXTRASELECTION_FILTER_REMOVE, WCodeEditor.__EXTRASELECTIONPROP_LINENUMBER, False, True)
-                filterExtraSelections(extraSelections, lineNumber, EXTRASELECTION_FILTER_REMOVE, WCodeEditor.__EXTRASELECTIONPROP_LINENUMBER, False, True)
-
-                if toApply := rule.highlight(block, tokens, lineNumber, isCurrentLine):
-                    selection = QTextEdit.ExtraSelection()
-
-                    selection.format.setBackground(toApply[1])
-                    selection.format.setProperty(QTextFormat.FullWidthSelection, True)
-                    selection.format.setProperty(WCodeEditor.__EXTRASELECTIONPROP_TYPE, toApply[0])
-                    selection.format.setProperty(WCodeEditor.__EXTRASELECTIONPROP_SHOWGUTTER, toApply[2])
-                    selection.format.setProperty(WCodeEditor.__EXTRASELECTIONPROP_LINENUMBER, lineNumber)
-                    selection.cursor = QTextCursor(block)
-
-                    extraSelections.append(selection)
-                    userDataExtraSelection.append(selection)
-                    updated = True
-
-            if updated:
-                sortExtraSelections(userDataExtraSelection)
-                sortExtraSelections(extraSelections)
-                self.setExtraSelections(extraSelections)
-
-                # user data already exists, need to update it
-                userData.setExtraSelections(userDataExtraSelection)
-        # no need - updates made on user are already taken in account
-        # block.setUserData(userData)
+    def extraSelectionsLayer(self, layer):
+        """Return extra selections for given `layer`"""
+        return list(self.__extraSelectionsLayers.get(layer, []))
+
+    def setExtraSelectionsLayer(self, layer, extraSelections):
+        """Set extra selections for given `layer`
+
+        Only the given layer is replaced; layers are merged and applied to editor
+        once all updates are done
+        """
+        if not isinstance(extraSelections, list):
+            raise EInvalidType("Given `extraSelections` must be a <list>")
+
+        if len(extraSelections) == 0 and len(self.__extraSelectionsLayers.get(layer, [])) == 0:
+            # nothing to clear
+            return
+
+        self.__extraSelectionsLayers[layer] = list(extraSelections)
+        self.__extraSelectionsTimer.start()
+
+    def symbols(self):
+        """Return list of symbols (WCodeEditorSymbol) declared in document, ordered by line number
+
+        Parent scope of a symbol is the nearest previous symbol declared with a
+        lower indent
+        """
+        if self.__symbolsList is None:
+            blocks = []
+            for key in list(self.__symbolsBlocks.keys()):
+                if block := self.__symbolsBlock(key):
+                    blocks.append((block.position(), block))
+            blocks.sort(key=lambda item: item[0])
+
+            self.__symbolsList = []
+            scopes = []
+            for position, block in blocks:
+                userData = block.userData()
+                lineNumber = block.blockNumber() + 1
+                indent = userData.spaces(block)[1]
+
+                while len(scopes) and scopes[-1].indent() >= indent:
+                    scopes.pop()
+
+                for name, kind in userData.symbols():
+                    symbol = WCodeEditorSymbol(name, kind, lineNumber, indent, scopes[-1] if len(scopes) else None)
+                    self.__symbolsList.append(symbol)
+                scopes.append(symbol)
+
+        return self.__symbolsList
+
+    def symbolLines(self, name):
+        """Return list of line numbers (start from 1) on which symbol `name` is declared
+
+        Returned list is empty if there's no symbol for given `name`
+        """
+        returned = []
+        for key in list(self.__symbolsNames.get(name, [])):
+            if block := self.__symbolsBlock(key):
+                returned.append(block.blockNumber() + 1)
+        returned.sort()
+        return returned
+
+    def symbolNames(self):
+        """Return list of symbols names declared in document"""
+        self.__pruneSymbols()
+        return sorted(self.__symbolsNames.keys())
 
     def highlightedLineRules(self):
         """Return defined to highlight lines"""
@@ -1050,20 +1491,36 @@ class WCodeEditor(QPlainTextEdit):
             index = self.__highlightedLinesRules.index(rule)
             self.__highlightedLinesRules.pop(index)
 
-            removed = []
-            extraSelections = self.extraSelections()
-            filterExtraSelections(extraSelections, rule.ruleId(), EXTRASELECTION_FILTER_REMOVE, removed=removed)
-            self.setExtraSelections(extraSelections)
+            # only highlighted lines need to be processed
+            self.__updateHighlightedLines()
 
-            for removedSelection in removed:
-                block = removedSelection.cursor.block()
-                if userData := block.userData():
-                    userDataExtraSelection = userData.extraSelections()
-                    filterExtraSelections(userDataExtraSelection, rule.ruleId(), EXTRASELECTION_FILTER_REMOVE)
-                    userData.setExtraSelections(userDataExtraSelection)
-                    block.setUserData(userData)
+            if len(self.__highlightedLinesRules) == 0:
+                self.__linesRulesPendingTimer.stop()
+                self.__linesRulesPendingCursor = None
 
-            self.update()
+            self.__linesRulesSelectionsModified = True
+            self.__extraSelectionsTimer.start()
+
+    def updateHighlightedLineRule(self, rule, lineNumbers=None):
+        """Rule has been modified, re-apply highlighting
+
+        If `lineNumbers` is provided (list of line numbers, starting from 1),
+        only given lines and lines currently highlighted are processed;
+        otherwise all document lines are processed
+        """
+        if rule not in self.__highlightedLinesRules:
+            return
+
+        if lineNumbers is None:
+            self.__rehighlightLinesRules()
+            return
+
+        currentBlock = self.textCursor().block()
+        self.__updateHighlightedLines()
+        for lineNumber in lineNumbers:
+            block = self.document().findBlockByNumber(lineNumber - 1)
+            if block.isValid():
+                self.checkIfHighlighted(block, block == currentBlock)
 
     def doAutoIndent(self):
         """Indent current line to match indent of previous line
@@ -1135,13 +1592,6 @@ class WCodeEditor(QPlainTextEdit):
             cursor.insertText(" " * self.__calculateIndent(positionSol))
             return
 
-        # determinate block numbers
-        cursor.setPosition(selectionStart)
-        startBlock = cursor.blockNumber()
-
-        cursor.setPosition(selectionEnd)
-        endBlock = cursor.blockNumber()
-
         # determinate if last block have to be processed
         # exemple:
         #
@@ -1166,24 +1616,14 @@ class WCodeEditor(QPlainTextEdit):
         #
         #   In this case, the 3 lines are processed
         #
-        processLastBlock = cursor.selectionStart()
-        cursor.movePosition(QTextCursor.StartOfLine)
-        processLastBlock -= cursor.selectionStart()
-        if processLastBlock > 0:
-            processLastBlock = 1
-
-        cursor.movePosition(QTextCursor.Start)
-        cursor.movePosition(QTextCursor.NextBlock, n=startBlock)
-
         cursor.beginEditBlock()
-        for blockNumber in range(startBlock, endBlock+processLastBlock):
-            if not self.__isEmptyBlock(blockNumber):
+        for block in self.__selectedBlocks(selectionStart, selectionEnd):
+            blockText = block.text()
+            strippedText = blockText.lstrip()
+            if strippedText != '':
                 # empty lines are not indented
-                nbChar = len(cursor.block().text()) - len(cursor.block().text().lstrip())
-                cursor.movePosition(QTextCursor.StartOfLine)
-                cursor.insertText(" " * self.__calculateIndent(nbChar))
-
-            cursor.movePosition(QTextCursor.NextBlock)
+                cursor.setPosition(block.position())
+                cursor.insertText(" " * self.__calculateIndent(len(blockText) - len(strippedText)))
         cursor.endEditBlock()
 
     def doDedent(self):
@@ -1193,31 +1633,14 @@ class WCodeEditor(QPlainTextEdit):
         selectionStart = cursor.selectionStart()
         selectionEnd = cursor.selectionEnd()
 
-        # determinate block numbers
-        cursor.setPosition(selectionStart)
-        startBlock = cursor.blockNumber()
-
-        cursor.setPosition(selectionEnd)
-        endBlock = cursor.blockNumber()
-
-        processLastBlock = cursor.selectionStart()
-        cursor.movePosition(QTextCursor.StartOfLine)
-        processLastBlock -= cursor.selectionStart()
-        if processLastBlock > 0 or selectionStart == selectionEnd:
-            processLastBlock = 1
-
-        cursor.movePosition(QTextCursor.Start)
-        cursor.movePosition(QTextCursor.NextBlock, n=startBlock)
-
         cursor.beginEditBlock()
-        for blockNumber in range(startBlock, endBlock + processLastBlock):
-            nbChar = self.__calculateDedent(len(cursor.block().text()) - len(cursor.block().text().lstrip()))
+        for block in self.__selectedBlocks(selectionStart, selectionEnd, selectionStart == selectionEnd):
+            blockText = block.text()
+            nbChar = self.__calculateDedent(len(blockText) - len(blockText.lstrip()))
             if nbChar > 0:
-                cursor.movePosition(QTextCursor.StartOfLine)
-                cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, nbChar)
+                cursor.setPosition(block.position())
+                cursor.setPosition(block.position() + nbChar, QTextCursor.KeepAnchor)
                 cursor.removeSelectedText()
-
-            cursor.movePosition(QTextCursor.NextBlock)
         cursor.endEditBlock()
 
     def doToggleComment(self):
@@ -1231,22 +1654,7 @@ class WCodeEditor(QPlainTextEdit):
         selectionStart = cursor.selectionStart()
         selectionEnd = cursor.selectionEnd()
 
-        # determinate block numbers
-        cursor.setPosition(selectionStart)
-        startBlock = cursor.blockNumber()
-
-        cursor.setPosition(selectionEnd)
-        endBlock = cursor.blockNumber()
-
-        processLastBlock = cursor.selectionStart()
-        cursor.movePosition(QTextCursor.StartOfLine)
-        processLastBlock -= cursor.selectionStart()
-        if processLastBlock > 0 or selectionStart == selectionEnd:
-            processLastBlock = 1
-
-        # True = COMMENT
-        # False = UNCOMMENT
-        hasUncommented = False
+        forceLastBlock = (selectionStart == selectionEnd)
 
         # Work with 2 pass
         # Pass #1
@@ -1257,42 +1665,35 @@ class WCodeEditor(QPlainTextEdit):
         #    Apply COMMENT/UNCOMMENT
 
         # Pass 1
-        cursor.movePosition(QTextCursor.Start)
-        cursor.movePosition(QTextCursor.NextBlock, n=startBlock)
-
-        for blockNumber in range(startBlock, endBlock + processLastBlock):
-            blockText = cursor.block().text()
-
-            if re.match(r'^\s*'+re.escape(self.__optionCommentChar), blockText) is None:
+        # True = COMMENT
+        # False = UNCOMMENT
+        hasUncommented = False
+        for block in self.__selectedBlocks(selectionStart, selectionEnd, forceLastBlock):
+            if self.__reIsCommented.match(block.text()) is None:
                 hasUncommented = True
                 # dont' need to continue to look content, we know that we have to comment selected text
                 break
-            cursor.movePosition(QTextCursor.NextBlock)
 
         # Pass 2
-        cursor.movePosition(QTextCursor.Start)
-        cursor.movePosition(QTextCursor.NextBlock, n=startBlock)
+        commentText = self.__optionCommentChar+' '
 
         cursor.beginEditBlock()
-        for blockNumber in range(startBlock, endBlock + processLastBlock):
-            blockText = cursor.block().text()
+        for block in self.__selectedBlocks(selectionStart, selectionEnd, forceLastBlock):
+            blockText = block.text()
 
-            commentPosition = len(blockText) - len(blockText.lstrip())
-            cursor.movePosition(QTextCursor.StartOfLine)
-            cursor.movePosition(QTextCursor.Right, QTextCursor.MoveAnchor, commentPosition)
+            commentPosition = block.position() + len(blockText) - len(blockText.lstrip())
+            cursor.setPosition(commentPosition)
 
             if hasUncommented:
                 # Comment
-                cursor.insertText(self.__optionCommentChar+' ')
+                cursor.insertText(commentText)
             else:
                 # Uncomment
                 # Remove hashtag and all following spaces
-                hashtag = re.search(fr'({re.escape(self.__optionCommentChar)}+[\s]*)', blockText)
+                hashtag = self.__reComment.match(blockText, commentPosition - block.position())
 
-                cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, len(hashtag.groups()[0]))
+                cursor.setPosition(commentPosition + len(hashtag.groups()[0]), QTextCursor.KeepAnchor)
                 cursor.removeSelectedText()
-
-            cursor.movePosition(QTextCursor.NextBlock)
         cursor.endEditBlock()
 
     def doDuplicateLine(self):
@@ -1494,6 +1895,11 @@ class WCodeEditor(QPlainTextEdit):
                     self.__completerModel.add(autoCompletion[0], rule.type(),  self.__languageDef.style(rule), autoCompletion[1], rule.autoCompletionChar())
             self.__completerModel.sort()
 
+        if self.__languageDef:
+            self.__symbolTokenTypes = self.__languageDef.symbolTokenTypes()
+        else:
+            self.__symbolTokenTypes = {}
+
         if self.__languageDef:
             self.__highlighter = WCESyntaxHighlighter(self.document(), self.__languageDef, self)
             self.__languageDef.tokenizer().setMassUpdate(True)
@@ -1504,6 +1910,11 @@ class WCodeEditor(QPlainTextEdit):
         else:
             self.__highlighter = None
 
+            # no language definition, no symbols
+            self.__symbolsBlocks = {}
+            self.__symbolsNames = {}
+            self.__symbolsUpdated()
+
             cursor = self.textCursor()
             cursor.select(QTextCursor.Document)
             cursor.setCharFormat(QTextCharFormat())
@@ -1532,6 +1943,7 @@ class WCodeEditor(QPlainTextEdit):
         """Set comment character (for toggle comment action)"""
         if isinstance(value, str) and value != self.__optionCommentChar:
             self.__optionCommentChar = value
+            self.__updateCommentRegEx()
 
     def optionGutterText(self):
         """Return current gutter (line number) style (QTextCharFormat)"""
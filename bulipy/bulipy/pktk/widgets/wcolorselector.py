@@ -1833,6 +1833,15 @@ class WColorPalette(QWidget):
         colorOver = Signal(int, Swatch, QColor)             # when mouse is over a color (color index, color swatch, color)
         colorClicked = Signal(int, Swatch, QColor, int)       # when a color has been clicked (color index, color swatch, color, mouse button)
 
+        # rendered grids, shared by all palette grids
+        # key = (palette cache key, cell size, number of colors, number of columns, theme base color)
+        # value = QPixmap
+        __gridCache = {}
+        __GRID_CACHE_MAXSIZE = 64
+
+        # delay (in milliseconds) after last resize before grid is rendered again
+        __RENDER_DELAY = 100
+
         def __init__(self, parent=None):
             super(WColorPalette.WPaletteGrid, self).__init__(parent)
 
@@ -1856,6 +1865,14 @@ class WColorPalette(QWidget):
 
             # rendered grid in a pixmap cache
             self.__cachedGrid = None
+            # key used to share rendered grid with other palette grids; None if not shared
+            self.__cacheKey = None
+
+            # when resized, grid is rendered again once resizing settles
+            self.__renderTimer = QTimer(self)
+            self.__renderTimer.setSingleShot(True)
+            self.__renderTimer.setInterval(WColorPalette.WPaletteGrid.__RENDER_DELAY)
+            self.__renderTimer.timeout.connect(self.__renderDeferred)
 
             # QPen used for mouse over rendering
             self.__qPalette = QApplication.palette()
@@ -1870,12 +1887,17 @@ class WColorPalette(QWidget):
 
         def __renderCache(self):
             """Render current grid in cache"""
-            if self.__palette is None or self.__columns == 0:
+            if self.__palette is None or self.__columns == 0 or self.__cellSize <= 0:
                 self.__cachedGrid = None
                 return
 
+            key = (self.__cacheKey, self.__cellSize, self.__nbColors, self.__columns, self.__qPalette.color(QPalette.Base).rgba())
+            if self.__cacheKey is not None and key in WColorPalette.WPaletteGrid.__gridCache:
+                self.__cachedGrid = WColorPalette.WPaletteGrid.__gridCache[key]
+                return
+
             # generate pixmap cache
-            self.__cachedGrid = QPixmap(self.__idealSize)
+            self.__cachedGrid = QPixmap(self.__columns * (self.__cellSize + 1), self.__rows * (self.__cellSize + 1))
             self.__cachedGrid.fill(self.__qPalette.color(QPalette.Base))
 
             noColorPixMap = checkerBoardImage(self.__cellSize, self.__cellSize)
@@ -1894,8 +1916,22 @@ class WColorPalette(QWidget):
 
             painter.end()
 
-        def invalidate(self):
+            if self.__cacheKey is not None:
+                if len(WColorPalette.WPaletteGrid.__gridCache) >= WColorPalette.WPaletteGrid.__GRID_CACHE_MAXSIZE:
+                    # remove oldest rendered grid
+                    WColorPalette.WPaletteGrid.__gridCache.pop(next(iter(WColorPalette.WPaletteGrid.__gridCache)))
+                WColorPalette.WPaletteGrid.__gridCache[key] = self.__cachedGrid
+
+        def __renderDeferred(self):
+            """Resizing has settled, render grid for current size"""
             self.__cachedGrid = None
+            self.update()
+
+        def __updateGeometry(self):
+            """Calculate cell size and ideal size according to widget width"""
+            if self.__columns == 0:
+                return
+
             # calculate pixel size of a color square
             # total width - number of columns ==> because keep 1 pixel per column
             # as separator
@@ -1910,11 +1946,23 @@ class WColorPalette(QWidget):
             # and set ideal height as minimal height for widget
             self.setMinimumHeight(self.__idealSize.height())
 
-        def resizeEvent(self, event):
-            """Widget is resized, need to invalidate pixmap cache"""
+        def invalidate(self):
+            """Grid need to be rendered again"""
+            self.__renderTimer.stop()
             self.__cachedGrid = None
+            self.__updateGeometry()
+
+        def resizeEvent(self, event):
+            """Widget is resized, update geometry
+
+            Grid is rendered again only when cell size has changed, once
+            resizing settles; meanwhile current grid is scaled
+            """
             super(WColorPalette.WPaletteGrid, self).resizeEvent(event)
-            self.invalidate()
+            cellSize = self.__cellSize
+            self.__updateGeometry()
+            if self.__cellSize != cellSize and self.__cachedGrid is not None:
+                self.__renderTimer.start()
 
         def paintEvent(self, event):
             """refresh widget content"""
@@ -1929,7 +1977,8 @@ class WColorPalette(QWidget):
                     return
 
             painter = QPainter(self)
-            painter.drawPixmap(QPoint(0, 0), self.__cachedGrid)
+            painter.fillRect(QRect(QPoint(0, 0), self.__idealSize), self.__qPalette.color(QPalette.Base))
+            painter.drawPixmap(QRect(0, 0, self.__columns * (self.__cellSize + 1), self.__rows * (self.__cellSize + 1)), self.__cachedGrid)
 
             if self.__overCell is not None:
                 painter.setPen(self.__penOver)
@@ -2050,10 +2099,16 @@ class WColorPalette(QWidget):
 
             return self.colorFromIndex(colorIndex, asQColor)
 
-        def setPalette(self, palette):
-            """Set current palette"""
+        def setPalette(self, palette, cacheKey=None):
+            """Set current palette
+
+            If `cacheKey` is provided (palette name and content signature),
+            rendered grid is shared with other palette grids using the same
+            palette content
+            """
             if isinstance(palette, Palette):
                 self.__palette = palette
+                self.__cacheKey = cacheKey
                 self.__nbColors = self.__palette.colorsCountTotal()
                 self.__columns = self.__palette.columnCount()
                 self.__rows = math.ceil(self.__nbColors/self.__columns)
@@ -2090,8 +2145,10 @@ QScrollArea > QWidget > QScrollBar { background: 0; }
         self.__layout.setContentsMargins(0, 0, 0, 0)
         self.__layout.setSpacing(3)
 
-        # list of palettes (key=palette name / value=Palette())
+        # list of palettes (key=palette name / value=palette resource)
         self.__palettes = {}
+        # palettes objects, created on first selection (key=palette name / value=tuple(Palette(), content signature))
+        self.__palettesObjects = {}
         # current palette (name)
         self.__palette = None
 
@@ -2106,10 +2163,29 @@ QScrollArea > QWidget > QScrollBar { background: 0; }
 
     def __paletteChanged(self, palette):
         """Palette has been changed in list"""
+        if palette not in self.__palettes:
+            return
+
         self.__palette = palette
-        self.__pgPalette.setPalette(self.__palettes[self.__palette])
+        if palette not in self.__palettesObjects:
+            paletteObject = Palette(self.__palettes[palette])
+            self.__palettesObjects[palette] = (paletteObject, self.__paletteSignature(paletteObject))
+        paletteObject, signature = self.__palettesObjects[palette]
+        # palette can be modified in Krita: rendered grid is shared only with palettes having the same content
+        self.__pgPalette.setPalette(paletteObject, (palette, signature))
         self.paletteChanged.emit(palette)
 
+    def __paletteSignature(self, palette):
+        """Return a signature for given `palette` (Palette) content"""
+        colors = []
+        for index in range(palette.colorsCountTotal()):
+            swatch = palette.colorSetEntryByIndex(index)
+            if swatch.isValid():
+                colors.append(swatch.color().toXML())
+            else:
+                colors.append(None)
+        return hash((palette.columnCount(), tuple(colors)))
+
     def __colorOver(self, index, swatch, color):
         """Mouse over a color"""
         self.colorOver.emit(index, swatch, color)
@@ -2141,7 +2217,7 @@ QScrollArea > QWidget > QScrollBar { background: 0; }
 
     def palettes(self):
         """Return a dictionary of palettes resources managed by widget"""
-        return {name: self.__palette}
+        return dict(self.__palettes)
 
     def setPalettes(self, palettes=None):
         """Set list of palettes managed by widgets
@@ -2153,7 +2229,7 @@ QScrollArea > QWidget > QScrollBar { background: 0; }
         allPalettes = Krita.instance().resources("palette")
 
         if palettes is None:
-            self.__palettes = {palette: Palette(allPalettes[palette]) for palette in allPalettes}
+            self.__palettes = dict(allPalettes)
         elif isinstance(palettes, str) and palettes.strip() != '':
             # use the default
             self.setPalettes([palettes])
@@ -2162,13 +2238,17 @@ QScrollArea > QWidget > QScrollBar { background: 0; }
             self.setPalettes(['Default'])
         elif isinstance(palettes, list) and len(palettes) > 1:
             # use the default
-            self.__palettes = {palette: Palette(allPalettes[palette]) for palette in palettes if palette in allPalettes}
+            self.__palettes = {palette: allPalettes[palette] for palette in palettes if palette in allPalettes}
 
             if len(self.__palettes) == 0:
                 # None of given palettes is available??
                 self.setPalettes(['Default'])
 
+        self.__palettesObjects = {key: value for key, value in self.__palettesObjects.items() if key in self.__palettes}
+
         # Initialise combox
+        # signals are blocked while combobox is built, to only create object for selected palette
+        self.__cbPalettes.blockSignals(True)
         self.__cbPalettes.clear()
         for palette in self.__palettes:
             self.__cbPalettes.addItem(palette)
@@ -2178,9 +2258,14 @@ QScrollArea > QWidget > QScrollBar { background: 0; }
         self.__cbPalettes.setVisible(len(self.__palettes) > 1)
 
         if 'Default' in self.__palettes:
-            self.setPalette('Default')
+            palette = 'Default'
         else:
-            self.setPalette(list(self.__palettes.keys())[0])
+            palette = list(self.__palettes.keys())[0]
+        self.__cbPalettes.setCurrentText(palette)
+        self.__cbPalettes.blockSignals(False)
+
+        if palette != self.__palette:
+            self.__paletteChanged(palette)
 
 
 class WColorPicker(QWidget):
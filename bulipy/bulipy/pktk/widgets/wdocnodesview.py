@@ -31,6 +31,7 @@
 # -----------------------------------------------------------------------------
 
 import re
+from collections import OrderedDict
 
 from krita import (
                 Document,
@@ -166,6 +167,17 @@ class DocNodesModel(QAbstractItemModel):
     ICON_SIZE = 16
     THUMB_SIZE = 64
 
+    # thumbnails are stored in cache with this size, should never need higher thumbnail size
+    THUMB_CACHE_SIZE = QSize(256, 256)
+    # maximum memory used by thumbnails cache, in bytes
+    THUMB_CACHE_MAXBYTES = 64 * 1024 * 1024
+    # maximum duration (in milliseconds) of thumbnails generation per event loop iteration
+    THUMB_BUILD_DURATION = 20
+    # interval (in milliseconds) between checks of nodes content modification
+    THUMB_CHECK_INTERVAL = 1000
+    # size of node thumbnail used to detect content modification
+    THUMB_SIGNATURE_SIZE = 32
+
     def __init__(self, document, parent=None):
         """Initialise data model
 
@@ -177,7 +189,41 @@ class DocNodesModel(QAbstractItemModel):
 
         self.__rootItem = None
         self.__document = None
-        self.__cachedThumb = {}
+
+        # uuid -> DocNodeUuid
+        self.__items = {}
+
+        # thumbnails cache (LRU)
+        # key = uuid
+        # value = tuple (thumbnail key, pixmap, size in bytes, content signature)
+        self.__cachedThumb = OrderedDict()
+        self.__cachedThumbBytes = 0
+
+        # uuid of nodes visible in view, for which content modification is checked periodically
+        # None if unknown: all cached thumbnails are checked
+        self.__visibleUuids = None
+        # uuid of cached thumbnails for which content modification is checked on next request
+        self.__uncheckedThumb = set()
+
+        # document modified status on last check of nodes content
+        self.__documentModified = False
+        self.__checkThumbTimer = QTimer()
+        self.__checkThumbTimer.setInterval(DocNodesModel.THUMB_CHECK_INTERVAL)
+        self.__checkThumbTimer.timeout.connect(self.__checkModifiedThumbnails)
+
+        # thumbnails to generate, as an ordered set of uuid
+        self.__pendingThumb = OrderedDict()
+        self.__pendingThumbTimer = QTimer()
+        self.__pendingThumbTimer.setSingleShot(True)
+        self.__pendingThumbTimer.setInterval(0)
+        self.__pendingThumbTimer.timeout.connect(self.__buildPendingThumbnails)
+        # thumbnail currently built, one tile per step
+        # as tuple (uuid, thumbnail key, content signature, EKritaNode.toQImageScaledSteps() generator) or None
+        self.__buildingThumb = None
+
+        # returned while thumbnail is not yet available
+        self.__thumbPlaceholder = QPixmap(DocNodesModel.THUMB_SIZE, DocNodesModel.THUMB_SIZE)
+        self.__thumbPlaceholder.fill(Qt.transparent)
 
         self.setDocument(document)
 
@@ -200,6 +246,194 @@ class DocNodesModel(QAbstractItemModel):
 
         return parentItem.childCount()
 
+    def __node(self, uuid):
+        """Return Krita node for given `uuid`, None if not found
+
+        Node is resolved on each call and must not be kept (see DocNodeUuid)
+        """
+        if self.__document is None:
+            return None
+        return self.__document.nodeByUniqueID(uuid)
+
+    def __thumbKey(self, node):
+        """Return key used to check if a cached thumbnail is still valid for `node`
+
+        Checked each time thumbnail is requested, then only bounds are used;
+        content modification without bounds modification is detected
+        periodically (see checkModifiedThumbnails())
+        """
+        bounds = node.bounds()
+        return (bounds.x(), bounds.y(), bounds.width(), bounds.height())
+
+    def __thumbSignature(self, node):
+        """Return a small thumbnail of `node` content, used to detect content
+        modification
+
+        Thumbnail is built by Krita, that keep it in cache until node content
+        is modified
+        """
+        return node.thumbnail(DocNodesModel.THUMB_SIGNATURE_SIZE, DocNodesModel.THUMB_SIGNATURE_SIZE)
+
+    def __setCachedThumb(self, uuid, key, pixmap, signature):
+        """Store thumbnail in cache, and remove least recently used thumbnails
+        if cache size is exceeded"""
+        if uuid in self.__cachedThumb:
+            self.__cachedThumbBytes -= self.__cachedThumb.pop(uuid)[2]
+
+        if pixmap is None:
+            size = 0
+        else:
+            size = pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+        self.__cachedThumb[uuid] = (key, pixmap, size, signature)
+        self.__cachedThumbBytes += size
+
+        self.__uncheckedThumb.discard(uuid)
+
+        while self.__cachedThumbBytes > DocNodesModel.THUMB_CACHE_MAXBYTES and len(self.__cachedThumb) > 1:
+            removedUuid, removed = self.__cachedThumb.popitem(last=False)
+            self.__cachedThumbBytes -= removed[2]
+            self.__uncheckedThumb.discard(removedUuid)
+
+    def __buildPendingThumbnails(self):
+        """Build pending thumbnails
+
+        Thumbnails are built from event loop, during a limited time: view stay
+        responsive while thumbnails are built
+
+        Node content is read by tiles, and duration is checked after each tile:
+        thumbnail of a large node is built over many event loop iterations
+        """
+        timer = QElapsedTimer()
+        timer.start()
+
+        while timer.elapsed() < DocNodesModel.THUMB_BUILD_DURATION:
+            if self.__buildingThumb is None:
+                if len(self.__pendingThumb) == 0:
+                    break
+
+                uuid, dummy = self.__pendingThumb.popitem(last=False)
+                node = self.__node(uuid)
+                if node is None:
+                    continue
+
+                # signature is taken before content is read: a modification made while thumbnail is built is detected later
+                self.__buildingThumb = (uuid, self.__thumbKey(node), self.__thumbSignature(node), EKritaNode.toQImageScaledSteps(node, DocNodesModel.THUMB_CACHE_SIZE))
+
+            uuid, key, signature, steps = self.__buildingThumb
+
+            # node may have been removed or modified since previous iteration
+            node = self.__node(uuid)
+            if node is None:
+                self.__buildingThumb = None
+                continue
+            elif self.__thumbKey(node) != key:
+                # bounds have been modified, build thumbnail again
+                self.__buildingThumb = None
+                self.__pendingThumb[uuid] = None
+                self.__pendingThumb.move_to_end(uuid, last=False)
+                continue
+
+            nbProcessed, nbTiles, image = next(steps)
+            if nbProcessed < nbTiles:
+                continue
+            self.__buildingThumb = None
+
+            if image is None or image.isNull():
+                pixmap = None
+            else:
+                pixmap = QPixmap.fromImage(image)
+            self.__setCachedThumb(uuid, key, pixmap, signature)
+
+            item = self.__items.get(uuid)
+            if item is not None:
+                index = self.createIndex(item.row(), DocNodesModel.COLNUM_THUMB, item)
+                self.dataChanged.emit(index, index, [DocNodesModel.ROLE_NODE_THUMB])
+
+        if len(self.__pendingThumb) > 0 or self.__buildingThumb is not None:
+            self.__pendingThumbTimer.start()
+
+    def __checkModifiedThumbnail(self, uuid, node):
+        """Invalidate cached thumbnail of given node if node content has been
+        modified (obsolete thumbnail is returned until new one is built)
+
+        Return True if thumbnail has been invalidated
+        """
+        cached = self.__cachedThumb[uuid]
+        if cached[0] is None or self.__thumbSignature(node) == cached[3]:
+            return False
+
+        # keep position in LRU cache
+        self.__cachedThumb[uuid] = (None, cached[1], cached[2], cached[3])
+        return True
+
+    def __checkModifiedThumbnails(self):
+        """Check if content of visible nodes for which a thumbnail is cached
+        has been modified
+
+        Executed periodically, while document is modified (Krita's document
+        modified status stay True until document is saved): Krita API doesn't
+        provide any modification signal or counter for nodes, content
+        signatures are compared
+
+        Only visible nodes are checked; other cached thumbnails are checked
+        when requested by view
+
+        Cached thumbnails of modified nodes are invalidated and thumbnails of
+        nodes that don't exist anymore are removed
+        """
+        if self.__document is None:
+            return
+
+        modified = self.__document.modified()
+        if not (modified or self.__documentModified):
+            # document not modified since last check
+            return
+        self.__documentModified = modified
+
+        if self.__visibleUuids is None:
+            uuids = list(self.__cachedThumb)
+        else:
+            uuids = [uuid for uuid in self.__visibleUuids if uuid in self.__cachedThumb]
+            self.__uncheckedThumb.update(uuid for uuid in self.__cachedThumb if uuid not in self.__visibleUuids)
+
+        for uuid in uuids:
+            node = self.__node(uuid)
+            if node is None:
+                self.__cachedThumbBytes -= self.__cachedThumb.pop(uuid)[2]
+                self.__uncheckedThumb.discard(uuid)
+            elif self.__checkModifiedThumbnail(uuid, node):
+                item = self.__items.get(uuid)
+                if item is not None:
+                    # view request thumbnail again, new one is built if node is visible
+                    index = self.createIndex(item.row(), DocNodesModel.COLNUM_THUMB, item)
+                    self.dataChanged.emit(index, index, [DocNodesModel.ROLE_NODE_THUMB])
+
+    def __thumbnail(self, uuid, node):
+        """Return thumbnail for given node
+
+        If there's no valid thumbnail in cache, thumbnail generation is queued
+        and a placeholder (or the obsolete thumbnail) is returned
+        """
+        cached = self.__cachedThumb.get(uuid)
+        if cached is not None:
+            self.__cachedThumb.move_to_end(uuid)
+            if uuid in self.__uncheckedThumb:
+                self.__uncheckedThumb.discard(uuid)
+                if self.__checkModifiedThumbnail(uuid, node):
+                    cached = self.__cachedThumb[uuid]
+            if cached[0] == self.__thumbKey(node):
+                return cached[1]
+
+        if uuid not in self.__pendingThumb and (self.__buildingThumb is None or self.__buildingThumb[0] != uuid):
+            self.__pendingThumb[uuid] = None
+            if not self.__pendingThumbTimer.isActive():
+                self.__pendingThumbTimer.start()
+
+        if cached is not None:
+            return cached[1]
+        return self.__thumbPlaceholder
+
     def data(self, index, role=Qt.DisplayRole):
         """Return data for index+role"""
         if not index.isValid():
@@ -209,7 +443,7 @@ class DocNodesModel(QAbstractItemModel):
         if role == DocNodesModel.ROLE_NODE_ID:
             return kraDocNodeUuid.uuid()
 
-        item = self.__document.nodeByUniqueID(kraDocNodeUuid.uuid())
+        item = self.__node(kraDocNodeUuid.uuid())
         if item is None:
             return None
 
@@ -262,18 +496,7 @@ class DocNodesModel(QAbstractItemModel):
         elif role == DocNodesModel.ROLE_NODE_THUMB:
             # returned thumbnail doesn't respect ratio...
             # return QPixmap.fromImage(item.thumbnail(DocNodesModel.THUMB_SIZE, DocNodesModel.THUMB_SIZE))
-            uid = item.uniqueId()
-            if uid not in self.__cachedThumb:
-                pixmap = EKritaNode.toQPixmap(item)
-                if pixmap:
-                    if pixmap.isNull():
-                        self.__cachedThumb[uid] = None
-                    else:
-                        # store in cache a pixmap of 256x256 pixel, should never need higher thumbnail size
-                        self.__cachedThumb[uid] = pixmap.scaled(QSize(256, 256), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                else:
-                    self.__cachedThumb[uid] = None
-            return self.__cachedThumb[uid]
+            return self.__thumbnail(kraDocNodeUuid.uuid(), item)
         elif role == DocNodesModel.ROLE_NODE_COLORINDEX:
             return item.colorLabel()
         elif role == DocNodesModel.ROLE_NODE_COLLAPSED:
@@ -321,12 +544,39 @@ class DocNodesModel(QAbstractItemModel):
         """Return label for given data section"""
         return None
 
+    def setVisibleNodes(self, uuids):
+        """Set uuid of nodes visible in view
+
+        Only content of visible nodes is checked periodically; if None, content
+        of all nodes for which a thumbnail is cached is checked
+        """
+        if uuids is None:
+            self.__visibleUuids = None
+        else:
+            self.__visibleUuids = set(uuids)
+
     def setDocument(self, document):
         """Add a document to model"""
+        def mapItems(item):
+            self.__items[item.uuid()] = item
+            for child in item.childs():
+                mapItems(child)
+
+        self.__pendingThumbTimer.stop()
+        self.__pendingThumb.clear()
+        self.__buildingThumb = None
+        self.__cachedThumb.clear()
+        self.__cachedThumbBytes = 0
+        self.__uncheckedThumb.clear()
+        self.__items = {}
+
         self.__document = document
+        self.__documentModified = document.modified()
         self.__rootItem = DocNodeUuid(document)
+        mapItems(self.__rootItem)
         self.modelReset.emit()
-        self.__cachedThumb = {}
+
+        self.__checkThumbTimer.start()
 
 
 class WDocNodesView(QTreeView):
@@ -489,6 +739,29 @@ class WDocNodesView(QTreeView):
         """When section is resized, update rows height"""
         self.__delegate.setThumbSize(self.__thumbSize.value())
 
+    def __visibleNodes(self):
+        """Return list of uuid of nodes visible in viewport"""
+        returned = []
+        viewportHeight = self.viewport().height()
+        index = self.indexAt(QPoint(0, 0))
+        while index.isValid() and self.visualRect(index).top() < viewportHeight:
+            returned.append(index.data(DocNodesModel.ROLE_NODE_ID))
+            index = self.indexBelow(index)
+        return returned
+
+    def paintEvent(self, event):
+        """Viewport is painted, update nodes visible in model"""
+        if self.__model is not None:
+            # viewport is painted when scrolled, resized or when nodes are expanded/collapsed
+            self.__model.setVisibleNodes(self.__visibleNodes())
+        super(WDocNodesView, self).paintEvent(event)
+
+    def hideEvent(self, event):
+        """View is hidden, no node is visible"""
+        if self.__model is not None:
+            self.__model.setVisibleNodes([])
+        super(WDocNodesView, self).hideEvent(event)
+
     def wheelEvent(self, event):
         """Manage zoom level through mouse wheel"""
         if event.modifiers() & Qt.ControlModifier:
@@ -552,22 +552,25 @@ class SearchFromPlainTextEdit:
                 SearchFromPlainTextEdit.COLOR_SEARCH_CURRENT_FG:    QColor("#ffff00")
             }
 
-    def __getExtraSelections(self, filteredOn, stopOnFirst):
-        """Return extra selection from self.__plainTextEdit, without `filteredOn` extra selection"""
-        # get a copy of extra selection from plaintext edit on which cleanup have to be made
-        extraSelections = self.__plainTextEdit.extraSelections()
-        filterExtraSelections(extraSelections, filteredOn, EXTRASELECTION_FILTER_REMOVE, stopOnFirst=stopOnFirst)
-        return extraSelections
+    def __setExtraSelections(self, extraSelectionType, extraSelections, stopOnFirst=False):
+        """Replace extra selections of given `extraSelectionType` in self.__plainTextEdit
+
+        If plain text edit manage extra selections per layer (WCodeEditor), only
+        layer for `extraSelectionType` is updated; otherwise editor's extra
+        selections are filtered and updated
+        """
+        if hasattr(self.__plainTextEdit, 'setExtraSelectionsLayer'):
+            self.__plainTextEdit.setExtraSelectionsLayer(extraSelectionType, extraSelections)
+        else:
+            # get a copy of extra selection from plaintext edit on which cleanup have to be made
+            editorExtraSelections = self.__plainTextEdit.extraSelections()
+            filterExtraSelections(editorExtraSelections, extraSelectionType, EXTRASELECTION_FILTER_REMOVE, stopOnFirst=stopOnFirst)
+            self.__plainTextEdit.setExtraSelections(editorExtraSelections + extraSelections)
 
     def clearCurrent(self):
         """Clear current found selection"""
         if self.__extraSelectionsFoundCurrent:
-            extraSelections = self.__plainTextEdit.extraSelections()
-            for extraSelection in extraSelections:
-                if extraSelection.format.property(QTextFormat.UserProperty) == SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH:
-                    extraSelections.remove(extraSelection)
-                    self.__plainTextEdit.setExtraSelections(extraSelections)
-                    break
+            self.__setExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH, [], True)
             self.__extraSelectionsFoundCurrent = None
 
     def searchAll(self, text, options=0):
@@ -584,7 +587,6 @@ class SearchFromPlainTextEdit:
 
         Return list of cursors
         """
-        extraSelections = self.__getExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_HIGHLIGHTEDSEARCH, False)
         extraSelectionsFoundAll = []
 
         if options & SearchOptions.REGEX == SearchOptions.REGEX:
@@ -595,7 +597,7 @@ class SearchFromPlainTextEdit:
         if (text is None or text == '') and options & SearchOptions.HIGHLIGHT == SearchOptions.HIGHLIGHT:
             # clear current selections
             self.__extraSelectionsFoundAll = []
-            self.__plainTextEdit.setExtraSelections(extraSelections)
+            self.__setExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_HIGHLIGHTEDSEARCH, [])
             return self.__extraSelectionsFoundAll
 
         findFlags = 0
@@ -625,11 +627,10 @@ class SearchFromPlainTextEdit:
 
         if options & SearchOptions.HIGHLIGHT == SearchOptions.HIGHLIGHT:
             self.__extraSelectionsFoundAll = extraSelectionsFoundAll
-            extraSelections += self.__extraSelectionsFoundAll
         else:
             self.__extraSelectionsFoundAll = []
 
-        self.__plainTextEdit.setExtraSelections(extraSelections)
+        self.__setExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_HIGHLIGHTEDSEARCH, self.__extraSelectionsFoundAll)
 
         return extraSelectionsFoundAll
 
@@ -648,10 +649,9 @@ class SearchFromPlainTextEdit:
 
         Return a cursor or None
         """
-        extraSelections = self.__getExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH, True)
         if (text is None or text == '') and options & SearchOptions.HIGHLIGHT == SearchOptions.HIGHLIGHT:
             self.__extraSelectionsFoundCurrent = None
-            self.__plainTextEdit.setExtraSelections(extraSelections)
+            self.__setExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH, [], True)
             return self.__extraSelectionsFoundCurrent
 
         findFlags = 0
@@ -720,11 +720,10 @@ class SearchFromPlainTextEdit:
             self.__extraSelectionsFoundCurrent.format.setForeground(QBrush(self.__searchColors[SearchFromPlainTextEdit.COLOR_SEARCH_CURRENT_FG]))
             self.__extraSelectionsFoundCurrent.format.setProperty(QTextFormat.UserProperty, SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH)
             self.__extraSelectionsFoundCurrent.cursor = found
-            extraSelections.append(self.__extraSelectionsFoundCurrent)
+            self.__setExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH, [self.__extraSelectionsFoundCurrent], True)
         else:
             self.__extraSelectionsFoundCurrent = None
-
-        self.__plainTextEdit.setExtraSelections(extraSelections)
+            self.__setExtraSelections(SearchFromPlainTextEdit.EXTRASELECTIONTYPE_CURRENTSEARCH, [], True)
 
         if self.__extraSelectionsFoundCurrent is not None:
             cursor = QTextCursor(self.__extraSelectionsFoundCurrent.cursor)
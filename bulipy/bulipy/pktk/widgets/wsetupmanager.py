@@ -14,6 +14,7 @@ import json
 import re
 import os.path
 import sys
+import time
 import datetime
 from pathlib import Path
 
@@ -34,7 +35,8 @@ from PyQt5.QtWidgets import (
         QWidget
     )
 
-from ..modules.utils import (loadXmlUi, replaceLineEditClearButton, JsonQObjectEncoder, JsonQObjectDecoder)
+from ..modules.utils import (loadXmlUi, replaceLineEditClearButton, JsonQObjectEncoder, JsonQObjectDecoder, Debug)
+from ..modules.bytesrw import BytesRecords
 from ..modules.strutils import (stripHtml, wildcardToRegEx)
 from ..modules.iconsizes import IconSizes
 from ..modules.imgutils import (buildIcon, QUriIcon, QIconPickable)
@@ -62,14 +64,21 @@ class SetupManagerBase(QObject):
     KEY_DATE_CREATED = 'dateCreated'
     KEY_DATE_MODIFIED = 'dateModified'
 
+    __DEFAULT_ICON_URI = 'pktk:brush_tune'
+    # default icon, built once and shared by items (QIcon is implicitly shared)
+    __defaultIcon = None
+
     def __init__(self, parent=None):
         super(SetupManagerBase, self).__init__(None)
+        if SetupManagerBase.__defaultIcon is None:
+            SetupManagerBase.__defaultIcon = buildIcon(SetupManagerBase.__DEFAULT_ICON_URI)
+
         self.__uuid = QUuid.createUuid().toString().strip("{}")
         self.__emitUpdated = 0
         self.__position = 999999
         self.__node = None
-        self.__iconUri = 'pktk:brush_tune'
-        self.__icon = buildIcon(self.__iconUri)
+        self.__iconUri = SetupManagerBase.__DEFAULT_ICON_URI
+        self.__icon = SetupManagerBase.__defaultIcon
         self.__name = ''
         self.__comments = ''
         self.__dateCreated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -208,11 +217,19 @@ class SetupManagerSetup(SetupManagerBase):
 
     KEY_DATA = 'data'
 
+    # keys exported in record
+    RECORD_KEYS = (SetupManagerBase.KEY_ICON_URI, SetupManagerBase.KEY_ICON, KEY_DATA)
+
     def __init__(self, initFrom=None):
         super(SetupManagerSetup, self).__init__(None)
 
         self.__data = None
 
+        # record (bytes-like) from which icon & data are loaded, decoded on first access
+        # kept while setup is not modified, to be saved without being encoded again
+        self.__record = None
+        self.__recordLoaded = True
+
         if isinstance(initFrom, SetupManagerSetup):
             # clone setup definition
             self.importData(initFrom.exportData())
@@ -222,6 +239,69 @@ class SetupManagerSetup(SetupManagerBase):
     def __repr__(self):
         return f"<SetupManagerSetup({self.id()}, {self.name()})>"
 
+    def __loadRecord(self):
+        """Decode record content if not already done"""
+        if not self.__recordLoaded:
+            self.__recordLoaded = True
+            record = self.__record
+            try:
+                self.importData(json.loads(bytes(record).decode()))
+            except Exception as e:
+                print("Unable to import setup record:", e)
+            # setup is not modified by record import
+            self.__record = record
+
+    def applyUpdate(self, property):
+        if property in ('iconUri', 'data', '*'):
+            # record content is not valid anymore
+            self.__record = None
+        super(SetupManagerSetup, self).applyUpdate(property)
+
+    def iconUri(self):
+        """Return icon uri"""
+        self.__loadRecord()
+        return super(SetupManagerSetup, self).iconUri()
+
+    def setIconUri(self, uri, icon=None):
+        """Set item image uri"""
+        self.__loadRecord()
+        super(SetupManagerSetup, self).setIconUri(uri, icon)
+
+    def icon(self):
+        self.__loadRecord()
+        return super(SetupManagerSetup, self).icon()
+
+    def setRecord(self, record):
+        """Set record (bytes-like object) from which icon and data are loaded
+
+        Record is decoded on first access to icon or data
+        """
+        self.__record = record
+        self.__recordLoaded = False
+
+    def exportRecord(self):
+        """Export icon and data as a record (bytes-like object)
+
+        If setup has not been modified since record has been set, record is
+        returned as is
+        """
+        if self.__record is not None:
+            return self.__record
+
+        data = self.exportData()
+        return json.dumps({key: data[key] for key in SetupManagerSetup.RECORD_KEYS}, cls=JsonQObjectEncoder).encode()
+
+    def exportIndexData(self):
+        """Export setup definition without record content (icon and data) as dictionary"""
+        return {
+                SetupManagerBase.KEY_UUID: self.id(),
+                SetupManagerBase.KEY_NAME: self.name(),
+                SetupManagerBase.KEY_COMMENTS: self.comments(),
+                SetupManagerBase.KEY_POSITION: self.position(),
+                SetupManagerBase.KEY_DATE_CREATED: self.dateCreated(),
+                SetupManagerBase.KEY_DATE_MODIFIED: self.dateModified()
+            }
+
     def exportData(self):
         """Export setup definition as dictionary"""
         icon = ''
@@ -249,6 +329,7 @@ class SetupManagerSetup(SetupManagerBase):
         if not isinstance(value, dict):
             return False
 
+        self.__loadRecord()
         self.beginUpdateCreated()
         try:
             if SetupManagerBase.KEY_UUID in value:
@@ -292,6 +373,7 @@ class SetupManagerSetup(SetupManagerBase):
 
         Format is not known, can be anything
         """
+        self.__loadRecord()
         return self.__data
 
     def setData(self, data):
@@ -299,6 +381,7 @@ class SetupManagerSetup(SetupManagerBase):
 
         Format is not known, can be anything
         """
+        self.__loadRecord()
         if data != self.__data:
             self.__data = data
             self.applyUpdate('data')
@@ -450,6 +533,10 @@ class SetupManagerNode(QStandardItem):
 
         # Initialise node childs
         self.__childNodes = []
+        # cache of child rows, built on demand
+        # key = id(child node)
+        # value = row
+        self.__childRows = None
 
         self.setData(data)
         self.setParentNode(parent)
@@ -476,6 +563,7 @@ class SetupManagerNode(QStandardItem):
             self.__inUpdate = 0
         elif self.__inUpdate == 0:
             self.__childNodes.sort(key=lambda item: item.data().position())
+            self.__childRows = None
             # need to recalculate position properly;
             for index, child in enumerate(self.__childNodes):
                 child.data().setPosition((index + 1) * 100)
@@ -501,6 +589,7 @@ class SetupManagerNode(QStandardItem):
             raise EInvalidType("Given `childNode` must be a <SetupManagerNode>")
         elif isinstance(childNode.data(), self.__dataNode.acceptedChild()):
             self.__childNodes.append(childNode)
+            self.__childRows = None
             self.beginUpdateCreated()
             childNode.beginUpdateCreated()
             childNode.setParentNode(self)
@@ -532,6 +621,7 @@ class SetupManagerNode(QStandardItem):
             except Exception:
                 returned = None
 
+            self.__childRows = None
             self.endUpdateCreated()
             return returned
 
@@ -543,6 +633,7 @@ class SetupManagerNode(QStandardItem):
                 row = i - 1
                 break
         self.__childNodes.insert(row, childNode)
+        self.__childRows = None
         childNode.beginUpdateCreated()
         childNode.data().setPosition(position)
         childNode.setParentNode(self)
@@ -558,6 +649,7 @@ class SetupManagerNode(QStandardItem):
         """Remove all childs"""
         self.beginUpdateCreated()
         self.__childNodes = []
+        self.__childRows = None
         self.endUpdateCreated()
 
     def childCount(self):
@@ -576,10 +668,9 @@ class SetupManagerNode(QStandardItem):
 
         If node is not found, return -1
         """
-        try:
-            return self.__childNodes.index(node)
-        except Exception:
-            return -1
+        if self.__childRows is None:
+            self.__childRows = {id(childNode): row for row, childNode in enumerate(self.__childNodes)}
+        return self.__childRows.get(id(node), -1)
 
     def columnCount(self):
         """Return number of column for item"""
@@ -691,49 +782,44 @@ class SetupManagerModel(QAbstractItemModel):
                                                               }))
 
         # maintain an index for Id
-        self.__idIndexes = {}
+        # key = id
+        # value = SetupManagerNode
+        self.__idNodes = {}
 
         # massive updates
         self.__inMassiveUpdate = 0
 
     def __getIdIndex(self, id):
-        def getIdIndexes(id, parent, modelIndexParent):
-            for childRow in range(parent.childCount()):
-                child = parent.child(childRow)
-                data = child.data()
+        """Return index for given id
 
-                currentIndex = self.index(childRow, 0, modelIndexParent)
+        If id is not found, return an invalid index
+        """
+        node = self.__idNodes.get(id)
+        if node is None or node.parentNode() is None:
+            return QModelIndex()
+        return self.createIndex(node.row(), 0, node)
 
-                if data.id() == id:
-                    return currentIndex
+    def __indexNode(self, node):
+        """Add given node and all its children to internal dictionnary of id"""
+        self.__idNodes[node.data().id()] = node
+        for child in node.childs():
+            self.__indexNode(child)
 
-                returned = getIdIndexes(id, child, currentIndex)
-                if returned.isValid():
-                    return returned
-            return QModelIndex()
-        returned = getIdIndexes(id, self.__rootNode, QModelIndex())
-        return returned
+    def __unindexNode(self, node):
+        """Remove given node and all its children from internal dictionnary of id"""
+        self.__idNodes.pop(node.data().id(), None)
+        for child in node.childs():
+            self.__unindexNode(child)
 
     def __updateIdIndex(self):
-        """Build internal dictionnary of all setups/groups id
+        """Rebuild internal dictionnary of all setups/groups id
 
         key = id
-        value = index
+        value = node
         """
-        def getIdIndexes(parent):
-            for childRow in range(parent.childCount()):
-                child = parent.child(childRow)
-                data = child.data()
-
-                if isinstance(data, SetupManagerSetup):
-                    self.__idIndexes[data.id()] = SetupManagerModel.TYPE_SETUP
-                else:
-                    self.__idIndexes[data.id()] = SetupManagerModel.TYPE_GROUP
-
-                getIdIndexes(child)
-
-        self.__idIndexes = {}
-        getIdIndexes(self.__rootNode)
+        self.__idNodes = {}
+        for child in self.__rootNode.childs():
+            self.__indexNode(child)
 
     def __beginUpdate(self):
         """Start a massive update"""
@@ -743,7 +829,6 @@ class SetupManagerModel(QAbstractItemModel):
         """Start a massive update"""
         self.__inMassiveUpdate -= 1
         if self.__inMassiveUpdate == 0:
-            self.__updateIdIndex()
             self.updateWidth.emit()
 
     def flags(self, index):
@@ -828,6 +913,7 @@ class SetupManagerModel(QAbstractItemModel):
 
             self.beginInsertRows(targetParentIndex, row, row)
             targetParentNode.insertChild(newPosition, itemNode)
+            self.__indexNode(itemNode)
             self.endInsertRows()
 
             row += positionUpdate
@@ -948,6 +1034,7 @@ class SetupManagerModel(QAbstractItemModel):
             index = self.createIndex(row, 0, node)
             self.beginRemoveRows(self.parent(index), row, row)
             node.parentNode().removeChild(row)
+            self.__unindexNode(node)
             self.endRemoveRows()
 
     def insertNode(self, node, parentNode):
@@ -958,6 +1045,7 @@ class SetupManagerModel(QAbstractItemModel):
 
             self.beginInsertRows(parentIndex, row, row)
             parentNode.appendChild(node)
+            self.__indexNode(node)
             self.endInsertRows()
 
     def headerData(self, section, orientation, role=Qt.DisplayRole):
@@ -1003,20 +1091,18 @@ class SetupManagerModel(QAbstractItemModel):
         if not isinstance(options['asIndex'], bool):
             raise EInvalidType("Given `option['asIndex'] must be a <bool>")
 
-        self.__updateIdIndex()
-
         if not (options['setups'] or options['groups']):
             # nonsense but...
             return {}
         elif options['setups'] and options['groups']:
             # return everything
-            returned = [id for id in self.__idIndexes]
+            returned = [id for id in self.__idNodes]
         elif options['setups']:
             # return setups
-            returned = [id for id in self.__idIndexes if self.__idIndexes[id] == SetupManagerModel.TYPE_SETUP]
+            returned = [id for id in self.__idNodes if isinstance(self.__idNodes[id].data(), SetupManagerSetup)]
         elif options['groups']:
             # return groups
-            returned = [id for id in self.__idIndexes if self.__idIndexes[id] == SetupManagerModel.TYPE_GROUP]
+            returned = [id for id in self.__idNodes if isinstance(self.__idNodes[id].data(), SetupManagerGroup)]
         else:
             # should not occurs
             return {}
@@ -1024,7 +1110,7 @@ class SetupManagerModel(QAbstractItemModel):
         if options['asIndex']:
             return {id: self.__getIdIndex(id) for id in returned}
         else:
-            return {id: self.__idIndexes[id] for id in returned}
+            return {id: SetupManagerModel.TYPE_SETUP if isinstance(self.__idNodes[id].data(), SetupManagerSetup) else SetupManagerModel.TYPE_GROUP for id in returned}
 
     def getFromId(self, id, asIndex=True):
         """Return setup/group from given Id
@@ -1050,26 +1136,24 @@ class SetupManagerModel(QAbstractItemModel):
         """
         returned = []
         node = None
-        self.__updateIdIndex()
 
         if groupId is None:
             node = self.__rootNode
         elif isinstance(groupId, str):
-            index = self.__getIdIndex(groupId)
-            if index.isValid():
-                data = self.data(index, SetupManagerModel.ROLE_DATA)
-                if isinstance(data, SetupManagerGroup) and data.id() == groupId:
-                    node = self.data(index, SetupManagerModel.ROLE_NODE)
+            node = self.__idNodes.get(groupId)
+            if node is not None and not isinstance(node.data(), SetupManagerGroup):
+                node = None
         elif isinstance(groupId, SetupManagerGroup):
             return self.getGroupItems(groupId.id(), asIndex)
 
         if node is not None:
-            # get all data, maybe not ordered
-            returned = [childNode.data() for childNode in node.childs()]
-            returned.sort(key=lambda item: item.position())
+            # get all nodes, maybe not ordered
+            returned = sorted(node.childs(), key=lambda childNode: childNode.data().position())
 
             if asIndex:
-                returned = [self.__getIdIndex(item.id()) for item in returned]
+                returned = [self.createIndex(childNode.row(), 0, childNode) for childNode in returned]
+            else:
+                returned = [childNode.data() for childNode in returned]
         return returned
 
     def clear(self):
@@ -1079,6 +1163,7 @@ class SetupManagerModel(QAbstractItemModel):
 
         self.__beginUpdate()
         self.__rootNode.clear()
+        self.__idNodes = {}
         self.__endUpdate()
 
         if self.__inMassiveUpdate == 0:
@@ -1235,6 +1320,7 @@ class SetupManagerModel(QAbstractItemModel):
             nodes = list(tmpIdIndex.keys())
 
         addNodes(nodes, self.__rootNode)
+        self.__updateIdIndex()
         self.__endUpdate()
         self.endResetModel()
 
@@ -1793,15 +1879,12 @@ class WSetupManagerOpenSavePreview(WDialogFile.WSubWidget):
             return False
         else:
             try:
-                with open(fileName, 'r') as fhandle:
-                    jsonData = fhandle.read()
+                data = WSetupManager.readPkTkSMFile(fileName)
             except Exception as e:
                 print("Unable to import setup manager definition:", e)
                 self.__model.clear()
                 return False
 
-            data = json.loads(jsonData)
-
             isValid, message = WSetupManager.isValidPkTkSMContent(data, self.__storedDataFormatIdentifier)
             if isValid:
                 self.__model.importData(data[WSetupManager.FILE_KEY_PKTKSM][WSetupManager.FILE_KEY_PKTKSM_DATA])
@@ -1849,15 +1932,12 @@ class WSetupManagerSaveSettings(WDialogFile.WSubWidget):
         """When fileName is provided, update image preview content"""
         if os.path.isfile(fileName):
             try:
-                with open(fileName, 'r') as fhandle:
-                    jsonData = fhandle.read()
+                data = WSetupManager.readPkTkSMFile(fileName, True)
             except Exception as e:
                 print("Unable to import setup manager definition:", e)
                 self.__teDescription.setPlainText('')
                 return True
 
-            data = json.loads(jsonData)
-
             isValid, message = WSetupManager.isValidPkTkSMContent(data, self.__storedDataFormatIdentifier)
             if isValid:
                 self.__teDescription.setHtml(data[WSetupManager.FILE_KEY_PKTKSM][WSetupManager.FILE_KEY_PKTKSM_DESCRIPTION])
@@ -1911,15 +1991,12 @@ class WSetupManagerOpenSettings(WDialogFile.WSubWidget):
         """When fileName is provided, update description content"""
         if os.path.isfile(fileName):
             try:
-                with open(fileName, 'r') as fhandle:
-                    jsonData = fhandle.read()
+                data = WSetupManager.readPkTkSMFile(fileName, True)
             except Exception as e:
                 print("Unable to import setup manager definition:", e)
                 self.__teDescription.setPlainText('')
                 return False
 
-            data = json.loads(jsonData)
-
             isValid, message = WSetupManager.isValidPkTkSMContent(data, self.__storedDataFormatIdentifier)
             if isValid:
                 self.__teDescription.setHtml(data[WSetupManager.FILE_KEY_PKTKSM][WSetupManager.FILE_KEY_PKTKSM_DESCRIPTION])
@@ -1943,12 +2020,21 @@ class WSetupManagerOpenSettings(WDialogFile.WSubWidget):
 class WSetupManager(QWidget):
     """A widget to browse configuration setups"""
 
-    __INTERNAL_FORMAT_VERSION = '1.00'
+    __INTERNAL_FORMAT_VERSION = '2.00'
+
+    # setups file is a BytesRecords container
+    # - one record per setup (icon & data)
+    # - one header record (setups file properties, groups, setups index & hierarchy)
+    __FILE_MAGIC = b'PKSM'
+    __FILE_VERSION = 0x0001
+    __FILE_RECORD_HEADER = b'HEAD'
+    __FILE_RECORD_SETUP = b'SETP'
 
     FILE_KEY_PKTKSM = 'pktk-sm'
     FILE_KEY_PKTKSM_VERSION = 'version'
     FILE_KEY_PKTKSM_DESCRIPTION = 'description'
     FILE_KEY_PKTKSM_DATA = 'data'
+    FILE_KEY_PKTKSM_RECORD = 'record'
     FILE_KEY_STOREDD_FMT = 'storedDataFormat'
     FILE_KEY_STOREDD_FMT_ID = 'identifier'
     FILE_KEY_STOREDD_FMT_VERSION = 'version'
@@ -2001,6 +2087,52 @@ class WSetupManager(QWidget):
 
         return (False, f"Not a readable file")
 
+    @staticmethod
+    def readPkTkSMFile(fileName, headerOnly=False):
+        """Read content of given setups file
+
+        Return content as a dictionary
+        Setups are returned as SetupManagerSetup for which icon and data are
+        decoded on first access
+
+        If `headerOnly` is True, setups records are not read and setups are
+        returned as dictionaries with lightweight properties only
+
+        Files saved as a single json document (format 1.00) can be read too
+
+        Raise an exception if file can't be read
+        """
+        with open(fileName, 'rb') as fHandle:
+            content = fHandle.read()
+
+        if not BytesRecords.isRecords(content, WSetupManager.__FILE_MAGIC):
+            return json.loads(content.decode())
+
+        records = BytesRecords(WSetupManager.__FILE_MAGIC)
+        records.fromBytes(content)
+
+        headerIndex = records.index(WSetupManager.__FILE_RECORD_HEADER)
+        if headerIndex == -1 or not records.isValid(headerIndex):
+            raise EInvalidValue(f"Invalid setups file header: {fileName}")
+
+        data = json.loads(bytes(records.data(headerIndex)).decode())
+        if not headerOnly and WSetupManager.isValidPkTkSMContent(data)[0]:
+            setupsData = data[WSetupManager.FILE_KEY_PKTKSM][WSetupManager.FILE_KEY_PKTKSM_DATA]
+            setups = []
+            for setupNfo in setupsData['setups']:
+                setup = SetupManagerSetup(setupNfo)
+
+                recordIndex = setupNfo.get(WSetupManager.FILE_KEY_PKTKSM_RECORD)
+                if isinstance(recordIndex, int) and recordIndex >= 0 and recordIndex < records.count() and records.isValid(recordIndex):
+                    setup.setRecord(records.data(recordIndex))
+                else:
+                    print(f"Unable to read setup record: {fileName}", setup.id())
+
+                setups.append(setup)
+            setupsData['setups'] = setups
+
+        return data
+
     def __init__(self, parent=None):
         super(WSetupManager, self).__init__(parent)
 
@@ -2096,19 +2228,13 @@ class WSetupManager(QWidget):
 
     def __loadSetupsFile(self, fileName, settingsNfo):
         """Load a setups file"""
+        startTime = time.perf_counter()
         try:
-            with open(fileName, 'r') as fHandle:
-                jsonData = fHandle.read()
+            data = WSetupManager.readPkTkSMFile(fileName)
         except Exception as e:
             print(f"Unable to read file: {fileName}", e)
             return False
 
-        try:
-            data = json.loads(jsonData)
-        except Exception as e:
-            print(f"Unable to parse file: {fileName}", e)
-            return False
-
         isValid, message = WSetupManager.isValidPkTkSMContent(data, self.__storedDataFormatIdentifier)
         if isValid:
             try:
@@ -2122,21 +2248,41 @@ class WSetupManager(QWidget):
                 return False
 
             self.__updateUi()
+            Debug.print('[WSetupManager.loadSetupsFile] {0}: {1} setups loaded in {2:.4f}s', fileName,
+                        len(data[WSetupManager.FILE_KEY_PKTKSM][WSetupManager.FILE_KEY_PKTKSM_DATA]['setups']),
+                        time.perf_counter() - startTime)
             return True
         return False
 
     def __saveSetupsFile(self, fileName, settingsNfo):
-        """Save setups to a file"""
+        """Save setups to a file
+
+        Setups not modified since they have been loaded are saved without
+        being encoded again
+        """
+        startTime = time.perf_counter()
         if settingsNfo['saveMode'] == 'all':
             data = self.__model.exportData()
         else:
             data = self.__model.exportData([item.id() for item in self.tvSetups.selectedItems()])
 
+        records = BytesRecords(WSetupManager.__FILE_MAGIC, WSetupManager.__FILE_VERSION)
+
+        setupsNfo = []
+        for setup in data['setups']:
+            setupNfo = setup.exportIndexData()
+            setupNfo[WSetupManager.FILE_KEY_PKTKSM_RECORD] = records.addRecord(WSetupManager.__FILE_RECORD_SETUP, setup.exportRecord())
+            setupsNfo.append(setupNfo)
+
         exportedData = {
                 WSetupManager.FILE_KEY_PKTKSM: {
                     WSetupManager.FILE_KEY_PKTKSM_VERSION: WSetupManager.__INTERNAL_FORMAT_VERSION,
                     WSetupManager.FILE_KEY_PKTKSM_DESCRIPTION: settingsNfo['description'],
-                    WSetupManager.FILE_KEY_PKTKSM_DATA: data
+                    WSetupManager.FILE_KEY_PKTKSM_DATA: {
+                        'setups': setupsNfo,
+                        'groups': data['groups'],
+                        'nodes': data['nodes']
+                    }
                 },
                 WSetupManager.FILE_KEY_STOREDD_FMT: {
                     WSetupManager.FILE_KEY_STOREDD_FMT_ID: self.__storedDataFormatIdentifier,
@@ -2144,14 +2290,14 @@ class WSetupManager(QWidget):
                 }
             }
 
-        jsonData = json.dumps(exportedData, cls=JsonQObjectEncoder)
+        records.addRecord(WSetupManager.__FILE_RECORD_HEADER, json.dumps(exportedData, cls=JsonQObjectEncoder).encode())
 
         try:
-            with open(fileName, 'w') as fHandle:
-                fHandle.write(jsonData)
+            records.save(fileName)
             self.__setSetupFile(fileName, settingsNfo['description'])
             self.__setModified(False)
             self.setupFileSaved.emit(fileName)
+            Debug.print('[WSetupManager.saveSetupsFile] {0}: {1} setups saved in {2:.4f}s', fileName, len(setupsNfo), time.perf_counter() - startTime)
             return True
         except Exception as e:
             print("Unable to save file:", fileName, e)